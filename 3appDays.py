@@ -1,13 +1,12 @@
 import streamlit as st
-import requests
 import pandas as pd
-from datetime import datetime, timedelta, timezone
 import json
 import os
 import time
 import sys
 from pathlib import Path
-from github import Github
+
+import sniper_engine as engine
 
 # ==========================================
 # CONFIGURAZIONE ARAB SNIPER V24.1 MULTI-DAY WEB
@@ -16,787 +15,41 @@ from github import Github
 # - BOOST
 # - GOLD
 # + rolling snapshot 5 giorni
+# Front-end Streamlit: scan, scoring e pubblicazione stanno in sniper_engine.py
 # ==========================================
-BASE_DIR = Path(__file__).resolve().parent
-DB_FILE = str(BASE_DIR / "arab_sniper_database.json")
-SNAP_FILE = str(BASE_DIR / "arab_snapshot_database.json")
-CONFIG_FILE = str(BASE_DIR / "nazioni_config.json")
-DETAILS_FILE = str(BASE_DIR / "match_details.json")
-
-DEFAULT_EXCLUDED = ["Thailand", "Indonesia", "India", "Kenya", "Morocco", "Rwanda", "Nigeria", "Oman", "Algeria", "UAE"]
-LEAGUE_BLACKLIST = ["u19", "u20", "youth", "women", "friendly", "carioca", "paulista", "mineiro"]
-ROLLING_SNAPSHOT_HORIZONS = [1, 2, 3, 4, 5]
-
-REMOTE_MAIN_FILE = "data.json"
-REMOTE_DAY_FILES = {
-    1: "data_day1.json",
-    2: "data_day2.json",
-    3: "data_day3.json",
-    4: "data_day4.json",
-    5: "data_day5.json",
-}
-REMOTE_DETAILS_FILES = {
-    1: "details_day1.json",
-    2: "details_day2.json",
-    3: "details_day3.json",
-    4: "details_day4.json",
-    5: "details_day5.json",
-}
-
-try:
-    from zoneinfo import ZoneInfo
-    ROME_TZ = ZoneInfo("Europe/Rome")
-except Exception:
-    ROME_TZ = None
-
-
-def now_rome():
-    return datetime.now(ROME_TZ) if ROME_TZ else datetime.now()
-
-
-def fixture_dt_rome(fixture_obj):
-    """
-    Converte la data fixture in Europe/Rome in modo robusto.
-    Usa timestamp se disponibile, altrimenti prova con il campo date ISO.
-    """
-    try:
-        ts = fixture_obj.get("timestamp")
-        if ts:
-            dt_utc = datetime.fromtimestamp(int(ts), tz=timezone.utc)
-            return dt_utc.astimezone(ROME_TZ) if ROME_TZ else dt_utc
-    except Exception:
-        pass
-
-    try:
-        raw = str(fixture_obj.get("date", "")).strip()
-        if raw:
-            raw = raw.replace("Z", "+00:00")
-            dt = datetime.fromisoformat(raw)
-            if dt.tzinfo is None:
-                dt = dt.replace(tzinfo=timezone.utc)
-            return dt.astimezone(ROME_TZ) if ROME_TZ else dt
-    except Exception:
-        pass
-
-    return None
-
-
 st.set_page_config(page_title="ARAB SNIPER V24.1 MULTI-DAY WEB", layout="wide")
 
-# ==========================================
-# GITHUB UPDATE CORE
-# ==========================================
-def github_write_json(filename, payload, commit_message):
-    try:
-        token = os.getenv("GITHUB_TOKEN") or st.secrets.get("GITHUB_TOKEN")
-        if not token:
-            return "MISSING_TOKEN"
-
-        g = Github(token)
-        repo = g.get_repo("Arabsnipertech-bet/arabsniper")
-        content_str = json.dumps(payload, indent=4, ensure_ascii=False)
-
-        try:
-            contents = repo.get_contents(filename)
-            repo.update_file(contents.path, commit_message, content_str, contents.sha)
-            return "SUCCESS"
-        except Exception:
-            repo.create_file(filename, commit_message, content_str)
-            return "SUCCESS"
-
-    except Exception as e:
-        return str(e)
-
-
-def upload_to_github_main(results):
-    return github_write_json(
-        REMOTE_MAIN_FILE,
-        results,
-        "Update Arab Sniper Data"
-    )
-
-
-def upload_day_to_github(day_num, results):
-    return github_write_json(
-        REMOTE_DAY_FILES[day_num],
-        results,
-        f"Update Arab Sniper Day {day_num} Data"
-    )
-
-
-def upload_details_to_github(day_num, payload):
-    return github_write_json(
-        REMOTE_DETAILS_FILES[day_num],
-        payload,
-        f"Update Arab Sniper Day {day_num} Details"
-    )
+# API_SPORTS_KEY / GITHUB_TOKEN: variabili d'ambiente, altrimenti st.secrets
+engine.SECRETS = st.secrets
 
 # ==========================================
 # SESSION STATE
 # ==========================================
-if "config" not in st.session_state:
-    if os.path.exists(CONFIG_FILE):
-        try:
-            with open(CONFIG_FILE, "r", encoding="utf-8") as f:
-                st.session_state.config = json.load(f)
-        except Exception:
-            st.session_state.config = {"excluded": DEFAULT_EXCLUDED}
-    else:
-        st.session_state.config = {"excluded": DEFAULT_EXCLUDED}
-
-if "team_stats_cache" not in st.session_state:
-    st.session_state.team_stats_cache = {}
-
-if "team_last_matches_cache" not in st.session_state:
-    st.session_state.team_last_matches_cache = {}
-
-if "available_countries" not in st.session_state:
-    st.session_state.available_countries = []
-
-if "scan_results" not in st.session_state:
-    st.session_state.scan_results = []
-
-if "odds_memory" not in st.session_state:
-    st.session_state.odds_memory = {}
-
-if "match_details" not in st.session_state:
-    st.session_state.match_details = {}
-
 if "selected_fixture_for_modal" not in st.session_state:
     st.session_state.selected_fixture_for_modal = None
 
 
-def save_config():
-    with open(CONFIG_FILE, "w", encoding="utf-8") as f:
-        json.dump(st.session_state.config, f, indent=4, ensure_ascii=False)
-
-
 def load_db():
-    today = now_rome().strftime("%Y-%m-%d")
-    ts = None
-
-    if os.path.exists(DB_FILE):
-        try:
-            with open(DB_FILE, "r", encoding="utf-8") as f:
-                data = json.load(f).get("results", [])
-                st.session_state.scan_results = [r for r in data if r.get("Data", "") >= today]
-        except Exception:
-            pass
-
-    if os.path.exists(SNAP_FILE):
-        try:
-            with open(SNAP_FILE, "r", encoding="utf-8") as f:
-                snap_data = json.load(f)
-                st.session_state.odds_memory = snap_data.get("odds", {})
-                ts = snap_data.get("timestamp", "N/D")
-        except Exception:
-            pass
-
-    if os.path.exists(DETAILS_FILE):
-        try:
-            with open(DETAILS_FILE, "r", encoding="utf-8") as f:
-                details_data = json.load(f)
-                st.session_state.match_details = details_data.get("details", {})
-        except Exception:
-            pass
-
-    return ts
-
-
-last_snap_ts = load_db()
-
-# ==========================================
-# API CORE & ROBUSTNESS
-# ==========================================
-API_KEY = os.getenv("API_SPORTS_KEY")
-
-if not API_KEY:
-    try:
-        API_KEY = st.secrets.get("API_SPORTS_KEY", None)
-    except Exception:
-        pass
-
-HEADERS = {"x-apisports-key": API_KEY} if API_KEY else {}
-
-
-def api_get(session, path, params):
-    if not API_KEY:
-        return None
-
-    for attempt in range(2):
-        try:
-            r = session.get(
-                f"https://v3.football.api-sports.io/{path}",
-                headers=HEADERS,
-                params=params,
-                timeout=20
-            )
-            if r.status_code == 200:
-                return r.json()
-            time.sleep(1)
-        except Exception:
-            if attempt == 1:
-                return None
-            time.sleep(1)
-    return None
-
-
-def _contains_ht(text):
-    t = str(text or "").lower()
-    return any(k in t for k in ["1st half", "first half", "1h", "ht", "half time", "halftime", "1° tempo"])
-
-
-def safe_float(x, default=0.0):
-    try:
-        if x is None:
-            return default
-        if isinstance(x, (int, float)):
-            return float(x)
-        s = str(x).strip().replace(",", ".")
-        if s in ("", "-", "None", "null"):
-            return default
-        return float(s)
-    except Exception:
-        return default
-
-
-def is_blacklisted_league(league_name):
-    name = str(league_name or "").lower()
-    return any(k in name for k in LEAGUE_BLACKLIST)
-
-
-def extract_elite_markets(session, fid):
-    res = api_get(session, "odds", {"fixture": fid})
-    if not res or not res.get("response"):
-        return None
-
-    mk = {"q1": 0.0, "qx": 0.0, "q2": 0.0, "o25": 0.0, "o05ht": 0.0, "o15ht": 0.0}
-
-    for bm in res["response"][0].get("bookmakers", []):
-        for b in bm.get("bets", []):
-            name = (b.get("name") or "").lower()
-            bid = b.get("id")
-
-            if bid == 1 and mk["q1"] == 0:
-                for v in b.get("values", []):
-                    vl = str(v.get("value", "")).lower()
-                    odd = safe_float(v.get("odd"), 0.0)
-                    if "home" in vl:
-                        mk["q1"] = odd
-                    elif "draw" in vl:
-                        mk["qx"] = odd
-                    elif "away" in vl:
-                        mk["q2"] = odd
-
-            if bid == 5 and mk["o25"] == 0:
-                if any(j in name for j in ["corner", "card", "booking"]):
-                    continue
-                for v in b.get("values", []):
-                    if "over 2.5" in str(v.get("value", "")).lower():
-                        mk["o25"] = safe_float(v.get("odd"), 0.0)
-
-            if _contains_ht(name) and any(k in name for k in ["total", "over/under", "ou", "goals"]):
-                if "team" in name:
-                    continue
-                for v in b.get("values", []):
-                    val_txt = str(v.get("value", "")).lower().replace(",", ".")
-                    if "over 0.5" in val_txt and mk["o05ht"] == 0:
-                        mk["o05ht"] = safe_float(v.get("odd"), 0.0)
-                    if "over 1.5" in val_txt and mk["o15ht"] == 0:
-                        mk["o15ht"] = safe_float(v.get("odd"), 0.0)
-
-        if mk["q1"] > 0 and mk["o25"] > 0 and mk["o05ht"] > 0:
-            break
-
-    if (1.01 <= mk["q1"] <= 1.10) or (1.01 <= mk["q2"] <= 1.10) or (1.01 <= mk["o25"] <= 1.30):
-        return "SKIP"
-
-    return mk
-
-
-def save_snapshot_file(payload):
-    with open(SNAP_FILE, "w", encoding="utf-8") as f:
-        json.dump(payload, f, indent=4, ensure_ascii=False)
-
-
-def load_existing_snapshot_payload():
-    if os.path.exists(SNAP_FILE):
-        try:
-            with open(SNAP_FILE, "r", encoding="utf-8") as f:
-                payload = json.load(f)
-                if isinstance(payload, dict):
-                    payload.setdefault("odds", {})
-                    return payload
-        except Exception:
-            pass
-
-    return {
-        "odds": {},
-        "timestamp": None,
-        "updated_at": None,
-        "coverage": "rolling_day1_day5"
-    }
-
-
-def build_rolling_multiday_snapshot(session):
     """
-    Salva la baseline quote di tutti i fixture Day1+Day2+Day3+Day4+Day5.
-    Se un fixture_id esiste già, NON lo sovrascrive:
-    così il drop resta ancorato alla prima quota vista.
+    A ogni rerun: via le righe con data passata e memoria quote riletta dallo
+    snapshot (il runner può averlo riscritto nel frattempo).
     """
-    target_dates = get_target_dates()
-    existing_payload = load_existing_snapshot_payload()
-    existing_odds = existing_payload.get("odds", {}) or {}
-
-    new_odds = dict(existing_odds)
-    active_fixture_ids = set()
-
-    for horizon in ROLLING_SNAPSHOT_HORIZONS:
-        target_date = target_dates[horizon - 1]
-
-        res = api_get(session, "fixtures", {"date": target_date, "timezone": "Europe/Rome"})
-        if not res:
-            continue
-
-        fx_list = [
-            f for f in res.get("response", [])
-            if f["fixture"]["status"]["short"] == "NS"
-            and not is_blacklisted_league(f.get("league", {}).get("name", ""))
-        ]
-
-        for f in fx_list:
-            fid = str(f["fixture"]["id"])
-            active_fixture_ids.add(fid)
-
-            mk = extract_elite_markets(session, f["fixture"]["id"])
-            if not mk or mk == "SKIP":
-                continue
-
-            if fid not in new_odds:
-                new_odds[fid] = {
-                    "q1": mk["q1"],
-                    "q2": mk["q2"],
-                    "first_seen_date": target_date,
-                    "first_seen_horizon": horizon,
-                    "first_seen_ts": now_rome().strftime("%Y-%m-%d %H:%M:%S")
-                }
-            else:
-                if isinstance(new_odds[fid], dict):
-                    new_odds[fid]["last_seen_date"] = target_date
-                    new_odds[fid]["last_seen_horizon"] = horizon
-                    new_odds[fid]["last_seen_ts"] = now_rome().strftime("%Y-%m-%d %H:%M:%S")
-
-        time.sleep(0.15)
+    engine.scan_store().expire(engine.now_rome().strftime("%Y-%m-%d"))
+    engine.STATE.odds_memory = None
 
-    cleaned_odds = {}
-    for fid, data in new_odds.items():
-        if fid in active_fixture_ids:
-            cleaned_odds[fid] = data
-
-    payload = {
-        "odds": cleaned_odds,
-        "timestamp": now_rome().strftime("%H:%M"),
-        "updated_at": now_rome().strftime("%Y-%m-%d %H:%M:%S"),
-        "coverage": "rolling_day1_day5"
-    }
-
-    st.session_state.odds_memory = cleaned_odds
-    save_snapshot_file(payload)
-    return payload
-
-
-def get_team_last_matches(session, tid):
-    cache_key = str(tid)
-    if cache_key in st.session_state.team_last_matches_cache:
-        return st.session_state.team_last_matches_cache[cache_key]
-
-    res = api_get(session, "fixtures", {"team": tid, "last": 8, "status": "FT"})
-    fx = res.get("response", []) if res else []
-
-    last_matches = []
-    for f in fx:
-        home_name = f.get("teams", {}).get("home", {}).get("name", "N/D")
-        away_name = f.get("teams", {}).get("away", {}).get("name", "N/D")
-        gh = f.get("goals", {}).get("home", 0)
-        ga = f.get("goals", {}).get("away", 0)
-        hth = f.get("score", {}).get("halftime", {}).get("home", 0)
-        hta = f.get("score", {}).get("halftime", {}).get("away", 0)
-
-        last_matches.append({
-            "date": str(f.get("fixture", {}).get("date", ""))[:10],
-            "league": f.get("league", {}).get("name", "N/D"),
-            "match": f"{home_name} - {away_name}",
-            "ht": f"{hth}-{hta}",
-            "ft": f"{gh}-{ga}",
-            "total_ht_goals": (hth or 0) + (hta or 0),
-            "total_ft_goals": (gh or 0) + (ga or 0)
-        })
-
-    st.session_state.team_last_matches_cache[cache_key] = last_matches
-    return last_matches
-
-
-def get_team_performance(session, tid):
-    if str(tid) in st.session_state.team_stats_cache:
-        return st.session_state.team_stats_cache[str(tid)]
-
-    res = api_get(session, "fixtures", {"team": tid, "last": 8, "status": "FT"})
-    fx = res.get("response", []) if res else []
-    if not fx:
+    if not os.path.exists(engine.SNAP_FILE):
         return None
+    return engine.load_existing_snapshot_payload().get("timestamp") or "N/D"
 
-    act = len(fx)
-    tht, gf, gs = 0, 0, 0
-
-    for f in fx:
-        ht_data = f.get("score", {}).get("halftime", {})
-        tht += (ht_data.get("home") or 0) + (ht_data.get("away") or 0)
-
-        is_home = f["teams"]["home"]["id"] == tid
-        gf += (f["goals"]["home"] or 0) if is_home else (f["goals"]["away"] or 0)
-        gs += (f["goals"]["away"] or 0) if is_home else (f["goals"]["home"] or 0)
-
-    last_f = fx[0]
-    ft_sum = (last_f.get("goals", {}).get("home") or 0) + (last_f.get("goals", {}).get("away") or 0)
-    ht_sum = (last_f.get("score", {}).get("halftime", {}).get("home") or 0) + (last_f.get("score", {}).get("halftime", {}).get("away") or 0)
-    last_2h_zero = ((ft_sum - ht_sum) == 0)
-
-    stats = {
-        "avg_ht": tht / act,
-        "avg_total": (gf + gs) / act,
-        "last_2h_zero": last_2h_zero
-    }
-
-    st.session_state.team_stats_cache[str(tid)] = stats
-    return stats
-
-# ==========================================
-# SCORING HELPERS V24.1
-# ==========================================
-def round3(x):
-    return round(float(x), 3)
-
-
-def symmetry_bonus(a, b, tight=0.22, medium=0.45):
-    diff = abs(float(a) - float(b))
-    if diff <= tight:
-        return 0.8
-    if diff <= medium:
-        return 0.4
-    return 0.0
-
-
-def band_score(value, core_low, core_high, soft_low=None, soft_high=None, core_pts=1.0, soft_pts=0.45):
-    v = safe_float(value, 0.0)
-    if core_low <= v <= core_high:
-        return core_pts
-    if soft_low is not None and soft_high is not None and soft_low <= v <= soft_high:
-        return soft_pts
-    return 0.0
-
-
-def compute_drop_diff(fid, mk):
-    if fid not in st.session_state.odds_memory:
-        return 0.0
-
-    old_data = st.session_state.odds_memory.get(fid, {})
-    if not isinstance(old_data, dict):
-        return 0.0
-
-    fav_is_home = mk["q1"] <= mk["q2"]
-    old_q = safe_float(old_data.get("q1") if fav_is_home else old_data.get("q2"), 0.0)
-    fav_now = min(mk["q1"], mk["q2"])
-
-    if old_q > 0 and fav_now > 0 and old_q > fav_now:
-        return round(old_q - fav_now, 3)
-    return 0.0
 
-
-def score_drop(drop_diff):
-    if drop_diff >= 0.15:
-        return 1.2
-    if drop_diff >= 0.10:
-        return 0.9
-    if drop_diff >= 0.05:
-        return 0.5
-    return 0.0
-
-
-def score_pt_signal(mk, s_h, s_a, combined_ht_avg):
-    score = 0.0
-
-    score += band_score(combined_ht_avg, 1.12, 1.70, 1.05, 1.90, core_pts=1.5, soft_pts=0.8)
-
-    if s_h["avg_ht"] >= 1.10 and s_a["avg_ht"] >= 1.10:
-        score += 1.6
-    elif (s_h["avg_ht"] >= 1.25 and s_a["avg_ht"] >= 0.95) or (s_a["avg_ht"] >= 1.25 and s_h["avg_ht"] >= 0.95):
-        score += 1.0
-
-    score += symmetry_bonus(s_h["avg_ht"], s_a["avg_ht"], tight=0.20, medium=0.40)
-
-    score += band_score(mk["o05ht"], 1.20, 1.40, 1.15, 1.48, core_pts=1.6, soft_pts=0.7)
-    score += band_score(mk["o15ht"], 2.00, 3.60, 1.80, 4.20, core_pts=0.8, soft_pts=0.3)
-
-    if s_h["last_2h_zero"] or s_a["last_2h_zero"]:
-        score += 0.8
-
-    if s_h["avg_total"] >= 1.20 and s_a["avg_total"] >= 1.20:
-        score += 0.5
-
-    return round3(score)
-
-
-def score_over_signal(mk, s_h, s_a, combined_ht_avg, fav, drop_diff):
-    score = 0.0
-
-    if s_h["avg_total"] >= 1.55 and s_a["avg_total"] >= 1.55:
-        score += 2.2
-    elif s_h["avg_total"] >= 1.45 and s_a["avg_total"] >= 1.45:
-        score += 1.4
-    elif (s_h["avg_total"] >= 1.80 and s_a["avg_total"] >= 1.20) or (s_a["avg_total"] >= 1.80 and s_h["avg_total"] >= 1.20):
-        score += 1.0
-
-    score += symmetry_bonus(s_h["avg_total"], s_a["avg_total"], tight=0.28, medium=0.50)
-
-    score += band_score(mk["o25"], 1.51, 2.37, 1.40, 2.55, core_pts=1.8, soft_pts=0.8)
-
-    if combined_ht_avg >= 1.10:
-        score += 0.7
-    if combined_ht_avg >= 1.20:
-        score += 0.3
-
-    if 1.35 <= fav <= 2.20:
-        score += 0.4
-
-    score += score_drop(drop_diff) * 0.7
-
-    return round3(score)
-
-
-def score_boost_signal(mk, s_h, s_a, pt_score, over_score, drop_diff, combined_ht_avg):
-    score = 0.0
-    score += pt_score * 0.38
-    score += over_score * 0.48
-
-    if (s_h["avg_ht"] >= 1.30 and s_a["avg_ht"] >= 1.00) or (s_a["avg_ht"] >= 1.30 and s_h["avg_ht"] >= 1.00):
-        score += 0.55
-    elif s_h["avg_ht"] >= 1.15 and s_a["avg_ht"] >= 1.15:
-        score += 0.35
-
-    if s_h["avg_total"] >= 1.65 and s_a["avg_total"] >= 1.65:
-        score += 0.55
-    elif (s_h["avg_total"] >= 1.95 and s_a["avg_total"] >= 1.35) or (s_a["avg_total"] >= 1.95 and s_h["avg_total"] >= 1.35):
-        score += 0.25
-
-    if 1.60 <= mk["o25"] <= 2.12 and 1.22 <= mk["o05ht"] <= 1.36:
-        score += 0.55
-    elif 1.55 <= mk["o25"] <= 2.20 and 1.20 <= mk["o05ht"] <= 1.38:
-        score += 0.20
-
-    if combined_ht_avg >= 1.16:
-        score += 0.35
-
-    score += score_drop(drop_diff) * 0.45
-    return round3(score)
-
-
-def score_gold_signal(mk, s_h, s_a, pt_score, over_score, boost_score, fav, drop_diff, is_gold_zone, combined_ht_avg):
-    score = 0.0
-    score += pt_score * 0.22
-    score += over_score * 0.30
-    score += boost_score * 0.34
-
-    if is_gold_zone:
-        score += 0.85
-
-    if combined_ht_avg >= 1.18 and s_h["avg_total"] >= 1.55 and s_a["avg_total"] >= 1.50:
-        score += 0.45
-
-    if 1.42 <= fav <= 1.82:
-        score += 0.35
-
-    if drop_diff >= 0.10:
-        score += 0.55
-    elif drop_diff >= 0.05:
-        score += 0.25
-
-    return round3(score)
-
-
-def build_signal_package(fid, mk, s_h, s_a, combined_ht_avg):
-    fav = min(mk["q1"], mk["q2"])
-    is_gold_zone = (1.40 <= fav <= 1.90)
-    drop_diff = compute_drop_diff(fid, mk)
-
-    pt_score = score_pt_signal(mk, s_h, s_a, combined_ht_avg)
-    over_score = score_over_signal(mk, s_h, s_a, combined_ht_avg, fav, drop_diff)
-    boost_score = score_boost_signal(mk, s_h, s_a, pt_score, over_score, drop_diff, combined_ht_avg)
-    gold_score = score_gold_signal(mk, s_h, s_a, pt_score, over_score, boost_score, fav, drop_diff, is_gold_zone, combined_ht_avg)
-
-    tags = []
-    probe_tags = []
-
-    if (fav < 1.75) and (s_h["avg_total"] >= 1.0 and s_a["avg_total"] >= 1.0):
-        probe_tags.append("🐟O")
-
-    if (2.0 <= mk["q1"] <= 3.5) and (2.0 <= mk["q2"] <= 3.5) and (s_h["avg_total"] >= 1.0 and s_a["avg_total"] >= 1.0):
-        probe_tags.append("🐟G")
-
-    if pt_score >= 4.1:
-        tags.append("🎯PT")
-
-    if over_score >= 4.0:
-        tags.append("⚽ OVER")
-
-    boost_gate_ht = (
-        (s_h["avg_ht"] >= 1.28 and s_a["avg_ht"] >= 1.00) or
-        (s_a["avg_ht"] >= 1.28 and s_h["avg_ht"] >= 1.00) or
-        (s_h["avg_ht"] >= 1.12 and s_a["avg_ht"] >= 1.12)
-    )
-    boost_gate_ft = (
-        (s_h["avg_total"] >= 1.60 and s_a["avg_total"] >= 1.55) or
-        (s_a["avg_total"] >= 1.60 and s_h["avg_total"] >= 1.55)
-    )
-    boost_gate_market = (1.58 <= mk["o25"] <= 2.18 and 1.21 <= mk["o05ht"] <= 1.37)
-    ft_convergence = (
-        (s_h["avg_total"] >= 1.45 and s_a["avg_total"] >= 1.45)
-        or
-        (s_h["avg_total"] >= 1.80 and s_a["avg_total"] >= 1.20)
-        or
-        (s_a["avg_total"] >= 1.80 and s_h["avg_total"] >= 1.20)
-    )
-
-    if (
-        boost_score >= 5.85
-        and pt_score >= 4.00
-        and over_score >= 4.15
-        and combined_ht_avg >= 1.14
-        and boost_gate_ht
-        and boost_gate_ft
-        and boost_gate_market
-        and ft_convergence
-    ):
-        tags.append("🚀 BOOST")
-
-    gold_gate_core = (
-        (s_h["avg_total"] >= 1.55 and s_a["avg_total"] >= 1.50)
-        and (s_h["avg_ht"] >= 1.05 and s_a["avg_ht"] >= 1.05)
-        and combined_ht_avg >= 1.16
-    )
-    gold_gate_quote = (1.42 <= fav <= 1.85)
-    gold_gate_extra = (
-        drop_diff >= 0.05 or
-        (
-            s_h["avg_total"] >= 1.75 and
-            s_a["avg_total"] >= 1.65 and
-            combined_ht_avg >= 1.20
-        )
-    )
-
-    if (
-        gold_score >= 6.75
-        and boost_score >= 5.95
-        and pt_score >= 4.00
-        and over_score >= 4.20
-        and is_gold_zone
-        and gold_gate_core
-        and gold_gate_quote
-        and gold_gate_extra
-    ):
-        tags.insert(0, "⚽⭐ GOLD")
-
-    if drop_diff >= 0.05:
-        tags.append(f"📉-{drop_diff:.2f}")
-
-    tags.extend(probe_tags)
-
-    primary_signal_count = sum(1 for t in tags if any(k in t for k in ["GOLD", "BOOST", "OVER", "PT"]))
-    max_score = max(pt_score, over_score, boost_score, gold_score)
-
-    return {
-        "tags": tags,
-        "scores": {
-            "pt": pt_score,
-            "over": over_score,
-            "boost": boost_score,
-            "gold": gold_score,
-            "max": round3(max_score),
-        },
-        "drop_diff": round3(drop_diff),
-        "fav_quote": round3(fav),
-        "is_gold_zone": is_gold_zone,
-        "primary_signal_count": primary_signal_count
-    }
-
-
-def should_keep_match(signal_pack):
-    if signal_pack["primary_signal_count"] >= 1:
-        return True
-
-    has_probe = any(t in signal_pack["tags"] for t in ["🐟O", "🐟G"])
-    if has_probe and signal_pack["scores"]["max"] >= 3.4:
-        return True
-
-    return False
-
-# ==========================================
-# DETAILS / DAY PAYLOAD HELPERS
-# ==========================================
-def save_match_details_file():
-    payload = {
-        "updated_at": now_rome().strftime("%Y-%m-%d %H:%M:%S"),
-        "details": st.session_state.match_details
-    }
-    with open(DETAILS_FILE, "w", encoding="utf-8") as f:
-        json.dump(payload, f, indent=4, ensure_ascii=False)
-    return payload
-
-
-def get_target_dates():
-    return [(now_rome().date() + timedelta(days=i)).strftime("%Y-%m-%d") for i in range(5)]
-
-
-def build_day_results(day_num):
-    target_date = get_target_dates()[day_num - 1]
-    results = [r for r in st.session_state.scan_results if r.get("Data") == target_date]
-    results.sort(key=lambda x: x.get("Ora", "99:99"))
-    return results
-
-
-def build_day_details_payload(day_num):
-    target_date = get_target_dates()[day_num - 1]
-    details = {
-        k: v for k, v in st.session_state.match_details.items()
-        if v.get("date") == target_date
-    }
-    return {
-        "updated_at": now_rome().strftime("%Y-%m-%d %H:%M:%S"),
-        "day": day_num,
-        "date": target_date,
-        "details": details
-    }
-
-
-def sync_day_outputs_to_github(day_num, update_main=False):
-    day_results = build_day_results(day_num)
-    details_payload = build_day_details_payload(day_num)
-
-    status_day = upload_day_to_github(day_num, day_results)
-    status_details = upload_details_to_github(day_num, details_payload)
-
-    if update_main:
-        status_main = upload_to_github_main(day_results)
-    else:
-        status_main = None
-
-    return status_main, status_day, status_details
+last_snap_ts = load_db()
 
 # ==========================================
 # MODAL DETTAGLI MATCH
 # ==========================================
 @st.dialog("🔎 Dettagli partita", width="large")
 def show_match_modal(fixture_id: str):
-    detail = st.session_state.match_details.get(str(fixture_id))
+    detail = engine.scan_store().get_detail(fixture_id)
 
     if not detail:
         st.warning("Dettagli non disponibili per questa partita.")
@@ -869,225 +122,66 @@ def show_match_modal(fixture_id: str):
             st.info("Nessun dato away disponibile.")
 
 # ==========================================
-# SCAN CORE
+# SCAN DA UI
 # ==========================================
-def run_full_scan(horizon=None, snap=False, update_main_site=False, show_success=True):
-    use_horizon = horizon if horizon is not None else HORIZON
-    target_dates = get_target_dates()
-
-    with st.spinner(f"🚀 Analisi mercati {target_dates[use_horizon - 1]}..."):
-        with requests.Session() as s:
-            target_date = target_dates[use_horizon - 1]
-            res = api_get(s, "fixtures", {"date": target_date, "timezone": "Europe/Rome"})
-            if not res:
-                st.error("❌ Nessuna risposta valida dall'API.")
-                return
-
-            day_fx = [
-                f for f in res.get("response", [])
-                if f["fixture"]["status"]["short"] == "NS"
-                and not is_blacklisted_league(f.get("league", {}).get("name", ""))
-            ]
-
-            st.session_state.available_countries = sorted(
-                list(set(st.session_state.available_countries) | {fx["league"]["country"] for fx in day_fx})
-            )
-
-            if snap and use_horizon == 1:
-                snap_bar = st.progress(0, text="📌 SNAPSHOT ROLLING DAY1+DAY2+DAY3+DAY4+DAY5...")
-                build_rolling_multiday_snapshot(s)
-                snap_bar.progress(1.0)
-                time.sleep(0.3)
-                snap_bar.empty()
-
-            final_list = []
-            details_map = dict(st.session_state.match_details)
-
-            pb = st.progress(0, text="🚀 ANALISI SEGNALI E MEDIE...")
-            for i, f in enumerate(day_fx):
-                pb.progress((i + 1) / len(day_fx) if day_fx else 1.0)
-
-                cnt = f["league"]["country"]
-                if cnt in st.session_state.config["excluded"]:
-                    continue
-
-                fid = str(f["fixture"]["id"])
-                mk = extract_elite_markets(s, fid)
-                if not mk or mk == "SKIP" or mk["q1"] == 0:
-                    continue
-
-                home_team = f["teams"]["home"]
-                away_team = f["teams"]["away"]
-
-                fixture_local_dt = fixture_dt_rome(f["fixture"])
-                ora_local = fixture_local_dt.strftime("%H:%M") if fixture_local_dt else f["fixture"]["date"][11:16]
-
-                s_h = get_team_performance(s, home_team["id"])
-                s_a = get_team_performance(s, away_team["id"])
-                if not s_h or not s_a:
-                    continue
-
-                combined_ht_avg = (s_h["avg_ht"] + s_a["avg_ht"]) / 2
-                if combined_ht_avg < 1.03:
-                    continue
-
-                signal_pack = build_signal_package(fid, mk, s_h, s_a, combined_ht_avg)
-                tags = signal_pack["tags"]
-
-                if not should_keep_match(signal_pack):
-                    continue
-
-                fav = signal_pack["fav_quote"]
-                is_gold_zone = signal_pack["is_gold_zone"]
-
-                row = {
-                    "Ora": ora_local,
-                    "Lega": f"{f['league']['name']} ({cnt})",
-                    "Match": f"{home_team['name']} - {away_team['name']}",
-                    "FAV": "✅" if is_gold_zone else "❌",
-                    "1X2": f"{mk['q1']:.1f}|{mk['qx']:.1f}|{mk['q2']:.1f}",
-                    "O2.5": f"{mk['o25']:.2f}",
-                    "O0.5H": f"{mk['o05ht']:.2f}",
-                    "O1.5H": f"{mk['o15ht']:.2f}",
-                    "AVG FT": f"{s_h['avg_total']:.1f}|{s_a['avg_total']:.1f}",
-                    "AVG HT": f"{s_h['avg_ht']:.1f}|{s_a['avg_ht']:.1f}",
-                    "Info": " ".join(tags),
-                    "Data": target_date,
-                    "Fixture_ID": f["fixture"]["id"]
-                }
-                final_list.append(row)
-
-                details_map[fid] = {
-                    "fixture_id": f["fixture"]["id"],
-                    "date": target_date,
-                    "time": ora_local,
-                    "league": f["league"]["name"],
-                    "country": cnt,
-                    "match": f"{home_team['name']} - {away_team['name']}",
-                    "home_team": home_team["name"],
-                    "away_team": away_team["name"],
-                    "markets": {
-                        "q1": mk["q1"],
-                        "qx": mk["qx"],
-                        "q2": mk["q2"],
-                        "o25": mk["o25"],
-                        "o05ht": mk["o05ht"],
-                        "o15ht": mk["o15ht"]
-                    },
-                    "averages": {
-                        "home_avg_ft": round(s_h["avg_total"], 3),
-                        "away_avg_ft": round(s_a["avg_total"], 3),
-                        "home_avg_ht": round(s_h["avg_ht"], 3),
-                        "away_avg_ht": round(s_a["avg_ht"], 3),
-                        "combined_ht_avg": round(combined_ht_avg, 3)
-                    },
-                    "flags": {
-                        "fav_quote": round(fav, 3),
-                        "is_gold_zone": is_gold_zone,
-                        "home_last_2h_zero": s_h["last_2h_zero"],
-                        "away_last_2h_zero": s_a["last_2h_zero"],
-                        "drop_diff": signal_pack["drop_diff"]
-                    },
-                    "scores": signal_pack["scores"],
-                    "tags": tags,
-                    "home_last_8": get_team_last_matches(s, home_team["id"]),
-                    "away_last_8": get_team_last_matches(s, away_team["id"])
-                }
-
-                time.sleep(0.2)
-
-            current_db = {str(r["Fixture_ID"]): r for r in st.session_state.scan_results}
-            target_date_ids = {str(r["Fixture_ID"]) for r in final_list}
-
-            for existing in list(current_db.keys()):
-                existing_row = current_db[existing]
-                if existing_row.get("Data") == target_date and existing not in target_date_ids:
-                    del current_db[existing]
-
-            for r in final_list:
-                current_db[str(r["Fixture_ID"])] = r
-
-            st.session_state.scan_results = list(current_db.values())
-            st.session_state.scan_results.sort(key=lambda x: (x.get("Data", ""), x.get("Ora", "99:99")))
-
-            with open(DB_FILE, "w", encoding="utf-8") as f:
-                json.dump({"results": st.session_state.scan_results}, f, indent=4, ensure_ascii=False)
-
-            st.session_state.match_details = details_map
-            save_match_details_file()
-
-            status_main, status_day, status_details = sync_day_outputs_to_github(
-                day_num=use_horizon,
-                update_main=update_main_site
-            )
-
-            if show_success:
-                if update_main_site:
-                    if status_main == "SUCCESS":
-                        st.success("✅ data.json aggiornato!")
-                    else:
-                        st.error(f"❌ Errore data.json: {status_main}")
-
-                if status_day == "SUCCESS":
-                    st.success(f"✅ {REMOTE_DAY_FILES[use_horizon]} aggiornato!")
-                else:
-                    st.error(f"❌ Errore {REMOTE_DAY_FILES[use_horizon]}: {status_day}")
-
-                if status_details == "SUCCESS":
-                    st.success(f"✅ {REMOTE_DETAILS_FILES[use_horizon]} aggiornato!")
-                else:
-                    st.error(f"❌ Errore {REMOTE_DETAILS_FILES[use_horizon]}: {status_details}")
-
-            pb.empty()
-
-            if "--auto" not in sys.argv and "--fast" not in sys.argv and "--day2-refresh" not in sys.argv:
-                time.sleep(2)
-                st.rerun()
-
-# ==========================================
-# AUTO BUILD 5 GIORNI
-# ==========================================
-def run_nightly_multiday_build():
-    print("🚀 Avvio scan notturno multi-day...")
-
-    print("📌 DAY 1: SNAP + SCAN + update data.json/data_day1/details_day1")
-    run_full_scan(horizon=1, snap=True, update_main_site=True, show_success=False)
+def run_full_scan(horizon, snap=False, update_main_site=False):
+    target_date = engine.get_target_dates()[horizon - 1]
+
+    with st.spinner(f"🚀 Analisi mercati {target_date}..."):
+        pb = st.progress(0, text="🚀 ANALISI SEGNALI E MEDIE...")
+        result = engine.run_full_scan(
+            horizon=horizon,
+            snap=snap,
+            update_main_site=update_main_site,
+            progress=lambda fraction, text: pb.progress(min(fraction, 1.0), text=text)
+        )
+        pb.empty()
 
-    print("📆 DAY 2: scan statico + update data_day2/details_day2")
-    run_full_scan(horizon=2, snap=False, update_main_site=False, show_success=False)
+    if result.get("error"):
+        st.error(f"❌ {result['error']}")
+        return
 
-    print("📆 DAY 3: scan statico + update data_day3/details_day3")
-    run_full_scan(horizon=3, snap=False, update_main_site=False, show_success=False)
+    if update_main_site:
+        if result["status_main"] == "SUCCESS":
+            st.success("✅ data.json aggiornato!")
+        else:
+            st.error(f"❌ Errore data.json: {result['status_main']}")
 
-    print("📆 DAY 4: scan statico + update data_day4/details_day4")
-    run_full_scan(horizon=4, snap=False, update_main_site=False, show_success=False)
+    if result["status_day"] == "SUCCESS":
+        st.success(f"✅ {engine.REMOTE_DAY_FILES[horizon]} aggiornato!")
+    else:
+        st.error(f"❌ Errore {engine.REMOTE_DAY_FILES[horizon]}: {result['status_day']}")
 
-    print("📆 DAY 5: scan statico + update data_day5/details_day5")
-    run_full_scan(horizon=5, snap=False, update_main_site=False, show_success=False)
+    if result["status_details"] == "SUCCESS":
+        st.success(f"✅ {engine.REMOTE_DETAILS_FILES[horizon]} aggiornato!")
+    else:
+        st.error(f"❌ Errore {engine.REMOTE_DETAILS_FILES[horizon]}: {result['status_details']}")
 
-    print("✅ Build multi-day completata.")
+    time.sleep(2)
+    st.rerun()
 
 # ==========================================
 # UI SIDEBAR
 # ==========================================
 st.sidebar.header("👑 Arab Sniper V24.1 Multi-Day WEB")
 HORIZON = st.sidebar.selectbox("Orizzonte Temporale:", options=[1, 2, 3, 4, 5], index=0)
-target_dates = get_target_dates()
+target_dates = engine.get_target_dates()
 
-all_discovered = sorted(list(set(st.session_state.get("available_countries", []))))
-if st.session_state.scan_results:
-    historical_cnt = {r["Lega"].split("(")[-1].replace(")", "") for r in st.session_state.scan_results}
+all_discovered = sorted(list(set(engine.STATE.available_countries)))
+historical_cnt = engine.scan_store().countries(target_dates[0])
+if historical_cnt:
     all_discovered = sorted(list(set(all_discovered) | historical_cnt))
 
 if all_discovered:
+    config = engine.load_config()
     new_ex = st.sidebar.multiselect(
         "Escludi Nazioni:",
         options=all_discovered,
-        default=[c for c in st.session_state.config.get("excluded", []) if c in all_discovered]
+        default=[c for c in config.get("excluded", []) if c in all_discovered]
     )
     if st.sidebar.button("💾 SALVA CONFIG"):
-        st.session_state.config["excluded"] = new_ex
-        save_config()
+        config["excluded"] = new_ex
+        engine.save_config(config)
         st.rerun()
 
 if last_snap_ts:
@@ -1096,9 +190,8 @@ else:
     st.sidebar.warning("⚠️ SNAPSHOT ASSENTE")
 
 st.sidebar.markdown("---")
-st.sidebar.caption(f"DB: {Path(DB_FILE).name}")
-st.sidebar.caption(f"SNAP: {Path(SNAP_FILE).name}")
-st.sidebar.caption(f"DETAILS: {Path(DETAILS_FILE).name}")
+st.sidebar.caption(f"DB: {Path(engine.SCAN_STORE_FILE).name}")
+st.sidebar.caption(f"SNAP: {Path(engine.SNAP_FILE).name}")
 st.sidebar.caption("GitHub: data.json + data_day1/2/3/4/5 + details_day1/2/3/4/5")
 
 # ==========================================
@@ -1113,9 +206,9 @@ if c2.button("🚀 SCAN VELOCE"):
 if st.session_state.selected_fixture_for_modal:
     show_match_modal(st.session_state.selected_fixture_for_modal)
 
-if st.session_state.scan_results:
-    df = pd.DataFrame(st.session_state.scan_results)
-    full_view = df[df["Data"] == target_dates[HORIZON - 1]]
+horizon_rows = engine.scan_store().results_for_date(target_dates[HORIZON - 1])
+if horizon_rows:
+    full_view = pd.DataFrame(horizon_rows)
 
     if not full_view.empty:
         full_view = full_view.sort_values(by=["Ora", "Match"])
@@ -1157,13 +250,7 @@ if st.session_state.scan_results:
         view["O25_VIS"] = view.apply(build_o25_visual, axis=1)
 
         # Rimuoviamo colonne tecniche che non vogliamo mostrare in tabella
-        cols_to_drop = [
-            "Data", "Fixture_ID",
-            "Q1_OPEN", "QX_OPEN", "Q2_OPEN", "O25_OPEN",
-            "Q1_CURR", "QX_CURR", "Q2_CURR", "O25_CURR",
-            "Q1_MOVE", "QX_MOVE", "Q2_MOVE", "O25_MOVE",
-            "INVERSION", "INV_FROM", "INV_TO"
-        ]
+        cols_to_drop = ["Data", "Fixture_ID"] + engine.ENRICHMENT_COLUMNS
         view = view.drop(columns=[c for c in cols_to_drop if c in view.columns], errors="ignore")
 
         if "1X2" in view.columns:
@@ -1244,10 +331,7 @@ if st.session_state.scan_results:
         d3.download_button(
             "🧠 DETAILS JSON",
             json.dumps(
-                {
-                    k: v for k, v in st.session_state.match_details.items()
-                    if v.get("date") == target_dates[HORIZON - 1]
-                },
+                engine.scan_store().details_for_date(target_dates[HORIZON - 1]),
                 indent=4,
                 ensure_ascii=False
             ).encode("utf-8"),
@@ -1262,18 +346,15 @@ else:
 if __name__ == "__main__":
     if "--auto" in sys.argv:
         print("🚀 Avvio Scan Automatico Notturno Multi-Day...")
-        HORIZON = 1
-        run_nightly_multiday_build()
+        engine.run_nightly_multiday_build()
         print("✅ Scan completo terminato: data.json + data_day1/2/3/4/5 + details_day1/2/3/4/5 aggiornati.")
 
     elif "--fast" in sys.argv:
-        HORIZON = 1
         print("⚡ Avvio Scan Veloce Automatico (solo Day 1)...")
-        run_full_scan(horizon=1, snap=False, update_main_site=True, show_success=False)
+        engine.run_full_scan(horizon=1, snap=False, update_main_site=True)
         print("✅ Scan veloce terminato: data.json + data_day1 + details_day1 aggiornati.")
 
     elif "--day2-refresh" in sys.argv:
-        HORIZON = 2
         print("🌙 Avvio Refresh Serale Day 2...")
-        run_full_scan(horizon=2, snap=False, update_main_site=False, show_success=False)
+        engine.run_full_scan(horizon=2, snap=False, update_main_site=False)
         print("✅ Refresh Day 2 terminato: data_day2 + details_day2 aggiornati.")
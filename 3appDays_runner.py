@@ -1,180 +1,37 @@
 import sys
-import types
-import importlib.util
 import subprocess
-import shutil
-import requests
-import os
 import json
-import base64
+import resource
 import time
 from pathlib import Path
-from datetime import datetime
+
+from archive_store import ArchiveStore
+from github_publisher import git_blob_sha
+from run_metrics import print_summary
 
 BASE_DIR = Path(__file__).resolve().parent
-APP_PATH = BASE_DIR / "3appDays.py"
 ARCHIVE_DIR = BASE_DIR / "archives"
 
-GITHUB_OWNER = "arabsnipertech-bet"
-GITHUB_REPO = "arabsniper"
-GITHUB_BRANCH = "main"
-GITHUB_API = f"https://api.github.com/repos/{GITHUB_OWNER}/{GITHUB_REPO}/contents"
-
 MIN_VALID_DAY1_ROWS = 1
 
+# refresh serale: Day1..Day4 in parallelo, un solo commit
+EVENING_HORIZONS = [1, 2, 3, 4]
 
-# =========================
-# FAKE STREAMLIT
-# =========================
-class SessionState(dict):
-    def __getattr__(self, name):
-        return self.get(name)
-
-    def __setattr__(self, name, value):
-        self[name] = value
-
-
-class DummyContext:
-    def __enter__(self):
-        return self
-
-    def __exit__(self, exc_type, exc, tb):
-        return False
-
-    def progress(self, *args, **kwargs):
-        return self
-
-    def empty(self):
-        return None
-
-    def write(self, *args, **kwargs):
-        return None
-
-    def markdown(self, *args, **kwargs):
-        return None
-
-    def dataframe(self, *args, **kwargs):
-        return None
-
-    def info(self, *args, **kwargs):
-        return None
-
-    def success(self, *args, **kwargs):
-        return None
-
-    def warning(self, *args, **kwargs):
-        return None
-
-    def error(self, *args, **kwargs):
-        return None
-
-    def button(self, *args, **kwargs):
-        return False
-
-    def download_button(self, *args, **kwargs):
-        return False
-
-    def subheader(self, *args, **kwargs):
-        return None
-
-    def caption(self, *args, **kwargs):
-        return None
-
-    def header(self, *args, **kwargs):
-        return None
-
-    def selectbox(self, label, options=None, index=0, **kwargs):
-        if options is None:
-            return None
-        if len(options) == 0:
-            return None
-        return options[index] if len(options) > index else options[0]
-
-    def multiselect(self, label, options=None, default=None, **kwargs):
-        return default or []
-
-
-class FakeSidebar(DummyContext):
-    pass
-
-
-class FakeSecrets(dict):
-    def get(self, key, default=None):
-        return super().get(key, default)
-
-
-class FakeStreamlitModule(types.ModuleType):
-    def __init__(self):
-        super().__init__("streamlit")
-        self.session_state = SessionState()
-        self.sidebar = FakeSidebar()
-        self.secrets = FakeSecrets()
-
-    def set_page_config(self, *args, **kwargs):
-        return None
-
-    def spinner(self, *args, **kwargs):
-        return DummyContext()
-
-    def progress(self, *args, **kwargs):
-        return DummyContext()
-
-    def columns(self, spec, **kwargs):
-        if isinstance(spec, int):
-            n = spec
-        else:
-            n = len(spec)
-        return [DummyContext() for _ in range(n)]
-
-    def button(self, *args, **kwargs):
-        return False
-
-    def markdown(self, *args, **kwargs):
-        return None
-
-    def dataframe(self, *args, **kwargs):
-        return None
-
-    def info(self, *args, **kwargs):
-        return None
-
-    def success(self, *args, **kwargs):
-        return None
-
-    def warning(self, *args, **kwargs):
-        return None
-
-    def error(self, *args, **kwargs):
-        return None
-
-    def subheader(self, *args, **kwargs):
-        return None
-
-    def write(self, *args, **kwargs):
-        return None
-
-    def rerun(self):
-        return None
-
-    def download_button(self, *args, **kwargs):
-        return False
-
-    def dialog(self, *args, **kwargs):
-        def decorator(func):
-            return func
-        return decorator
-
-
-fake_st = FakeStreamlitModule()
-sys.modules["streamlit"] = fake_st
-
+# refresh diurni/serali: ricalcolo solo dei fixture con quote cambiate (--full-rescan per disattivarlo)
+DELTA_REFRESH = True
 
 # =========================
-# IMPORT DINAMICO DI 3appDays.py
+# MOTORE DI SCAN
+# import diretto, senza UI: tempo e memoria di avvio stampati in output
 # =========================
-spec = importlib.util.spec_from_file_location("app3days_module", APP_PATH)
-app = importlib.util.module_from_spec(spec)
-spec.loader.exec_module(app)
+_t_import = time.perf_counter()
+import sniper_engine as engine
+
+print(
+    f"⏱️ RUNNER: motore caricato in {time.perf_counter() - _t_import:.2f}s | "
+    f"RSS {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MB",
+    flush=True
+)
 
 
 # =========================
@@ -214,44 +71,16 @@ SYNC_FILES = [
 # HELPERS GENERALI
 # =========================
 def archive_live_files():
-    ts = datetime.now().strftime("%Y%m%d_%H%M%S")
-    target = ARCHIVE_DIR / ts
-    target.mkdir(parents=True, exist_ok=True)
-
-    copied = 0
-    for name in LIVE_FILES:
-        src = BASE_DIR / name
-        if src.exists():
-            shutil.copy2(src, target / name)
-            copied += 1
-
-    print(f"📦 Backup creato in: {target}", flush=True)
-    print(f"📦 File copiati: {copied}", flush=True)
-
-
-def github_headers():
-    token = os.getenv("GITHUB_TOKEN")
-    headers = {
-        "Accept": "application/vnd.github+json",
-        "User-Agent": "arabsniper-runner",
-    }
-    if token:
-        headers["Authorization"] = f"Bearer {token}"
-    return headers
-
+    store = ArchiveStore(ARCHIVE_DIR)
+    stats = store.archive({name: BASE_DIR / name for name in LIVE_FILES})
+    engine.run_count("archive_new_blobs", stats["new_blobs"])
 
-def fetch_github_file(path: str) -> str:
-    url = f"{GITHUB_API}/{path}"
-    params = {"ref": GITHUB_BRANCH}
-    response = requests.get(url, headers=github_headers(), params=params, timeout=30)
-    response.raise_for_status()
-    payload = response.json()
-
-    if "content" not in payload:
-        raise RuntimeError(f"Contenuto mancante per {path}")
-
-    content = payload["content"].replace("\n", "")
-    return base64.b64decode(content).decode("utf-8")
+    print(f"📦 Backup run {stats['run']} in: {store.manifest_path(stats['run'])}", flush=True)
+    print(
+        f"📦 File archiviati: {stats['files']} | nuovi blob: {stats['new_blobs']} "
+        f"({stats['stored_bytes'] / 1024:.1f} KB compressi)",
+        flush=True
+    )
 
 
 def read_json_safe(path: Path):
@@ -264,7 +93,7 @@ def read_json_safe(path: Path):
 
 
 def expected_day1_date() -> str:
-    return app.get_target_dates()[0]
+    return engine.get_target_dates()[0]
 
 
 def normalize_fixture_id(value):
@@ -406,42 +235,42 @@ def validate_day1_pair(verbose=True):
     return True
 
 
-def sync_remote_outputs_to_local(max_attempts=6, wait_seconds=10):
+def verify_local_outputs():
     """
-    Dopo che 3appDays.py ha scritto i file su GitHub via API,
-    li riscarichiamo tramite GitHub Contents API.
-    La sync è considerata valida solo se:
-    - tutti i file richiesti vengono scaricati
-    - data_day1.json e details_day1.json risultano coerenti tra loro
+    sniper_engine.py scrive gli output in locale (atomicamente) e pubblica quegli stessi byte.
+    La verifica è quindi tutta locale:
+    - data_day1.json e details_day1.json devono risultare coerenti tra loro
+    - i file pubblicati in questa run devono avere lo stesso blob SHA di quelli su disco
     """
-    print("🔄 Sincronizzo i file remoti GitHub nel workspace locale...", flush=True)
+    print("🔎 Verifico i file di output locali...", flush=True)
     expected = expected_day1_date()
     print(f"📅 Attendo day1 coerente con data: {expected}", flush=True)
 
-    for attempt in range(1, max_attempts + 1):
-        print(f"🔁 Tentativo sync {attempt}/{max_attempts}", flush=True)
-        all_ok = True
+    if not validate_day1_pair(verbose=True):
+        print("❌ data_day1.json e details_day1.json locali non sono coerenti.", flush=True)
+        return False
 
-        for name in SYNC_FILES:
-            dest = BASE_DIR / name
-            try:
-                text = fetch_github_file(name)
-                dest.write_text(text, encoding="utf-8")
-                print(f"✅ Sync locale: {name}", flush=True)
-            except Exception as exc:
-                all_ok = False
-                print(f"⚠️ Sync fallita per {name}: {exc}", flush=True)
+    publisher = engine.GITHUB_PUBLISHER
+    checked = 0
+    mismatched = []
+    for name in SYNC_FILES:
+        published_sha = publisher.published.get(name)
+        if not published_sha:
+            continue
+        path = BASE_DIR / name
+        checked += 1
+        if not path.exists() or git_blob_sha(path.read_bytes()) != published_sha:
+            mismatched.append(name)
 
-        if all_ok and validate_day1_pair(verbose=True):
-            print("✅ Sync completata: data_day1.json e details_day1.json sono coerenti.", flush=True)
-            return True
+    if mismatched:
+        print(f"❌ File locali diversi da quelli pubblicati: {', '.join(mismatched)}", flush=True)
+        return False
 
-        if attempt < max_attempts:
-            print(f"⏳ Attendo {wait_seconds} secondi prima del nuovo tentativo...", flush=True)
-            time.sleep(wait_seconds)
+    if publisher.last_status not in (None, "SUCCESS"):
+        print(f"⚠️ Pubblicazione GitHub non riuscita ({publisher.last_status}): restano validi i file locali.", flush=True)
 
-    print("❌ Sync remota fallita o day1 ancora incoerente dopo tutti i tentativi.", flush=True)
-    return False
+    print(f"✅ Output locali verificati | file confrontati con i blob pubblicati: {checked}", flush=True)
+    return True
 
 
 def run_quote_history(days, label):
@@ -455,7 +284,8 @@ def run_quote_history(days, label):
         label,
     ]
     print("🧠 Aggiorno quote_history:", " ".join(args), flush=True)
-    result = subprocess.run(args, cwd=str(BASE_DIR))
+    with engine.run_stage("quote_history"):
+        result = subprocess.run(args, cwd=str(BASE_DIR))
     if result.returncode != 0:
         print("⚠️ Aggiornamento quote_history terminato con errore.", flush=True)
     return result.returncode
@@ -464,18 +294,35 @@ def run_quote_history(days, label):
 # =========================
 # RUN MODES
 # =========================
+def scan_night():
+    engine.run_nightly_multiday_build()
+
+
+def scan_mid_day1():
+    engine.run_full_scan(horizon=1, snap=False, update_main_site=True, delta=DELTA_REFRESH)
+
+
+def scan_evening_multi():
+    engine.run_parallel_refresh(
+        EVENING_HORIZONS,
+        delta=DELTA_REFRESH,
+        commit_message="Update Arab Sniper Evening Day1-4 Data",
+    )
+
+
 def run_night():
     print("🌙 RUNNER: backup file live prima del night scan...", flush=True)
-    archive_live_files()
+    with engine.run_stage("archive"):
+        archive_live_files()
 
     print("🌙 RUNNER: avvio build multi-day notturna...", flush=True)
-    app.HORIZON = 1
-    app.run_nightly_multiday_build()
+    scan_night()
     print("✅ RUNNER: build multi-day completata.", flush=True)
 
-    synced = sync_remote_outputs_to_local()
-    if not synced:
-        print("❌ Interrompo: i file remoti non sono coerenti, evito di sporcare quote_history.", flush=True)
+    with engine.run_stage("verify"):
+        verified = verify_local_outputs()
+    if not verified:
+        print("❌ Interrompo: i file di output non sono coerenti, evito di sporcare quote_history.", flush=True)
         return 1
 
     result = run_quote_history([1, 2, 3, 4, 5], "night")
@@ -484,13 +331,13 @@ def run_night():
 
 def run_mid_day1():
     print("☀️ RUNNER: avvio refresh centrale Day1...", flush=True)
-    app.HORIZON = 1
-    app.run_full_scan(horizon=1, snap=False, update_main_site=True, show_success=False)
+    scan_mid_day1()
     print("✅ RUNNER: refresh centrale Day1 completato.", flush=True)
 
-    synced = sync_remote_outputs_to_local()
-    if not synced:
-        print("❌ Interrompo: i file remoti non sono coerenti dopo mid-day1.", flush=True)
+    with engine.run_stage("verify"):
+        verified = verify_local_outputs()
+    if not verified:
+        print("❌ Interrompo: i file di output non sono coerenti dopo mid-day1.", flush=True)
         return 1
 
     result = run_quote_history([1], "mid_day1")
@@ -499,32 +346,62 @@ def run_mid_day1():
 
 def run_evening_multi():
     print("🌆 RUNNER: avvio refresh serale multi-day (Day1..Day4)...", flush=True)
-    app.HORIZON = 4
-    app.run_full_scan(horizon=4, snap=False, update_main_site=True, show_success=False)
+    scan_evening_multi()
     print("✅ RUNNER: refresh serale multi-day completato.", flush=True)
 
-    synced = sync_remote_outputs_to_local()
-    if not synced:
-        print("❌ Interrompo: i file remoti non sono coerenti dopo evening-multi.", flush=True)
+    with engine.run_stage("verify"):
+        verified = verify_local_outputs()
+    if not verified:
+        print("❌ Interrompo: i file di output non sono coerenti dopo evening-multi.", flush=True)
         return 1
 
-    result = run_quote_history([1, 2, 3, 4], "evening_multi")
+    result = run_quote_history(EVENING_HORIZONS, "evening_multi")
     return result
 
 
+# solo la parte di scan di ogni modalità (usata da bench_scan.py)
+SCAN_STEPS = {
+    "--night": scan_night,
+    "--mid-day1": scan_mid_day1,
+    "--evening-multi": scan_evening_multi,
+}
+
+RUN_MODES = {
+    "--night": run_night,
+    "--mid-day1": run_mid_day1,
+    "--evening-multi": run_evening_multi,
+}
+
+
 def main():
+    global DELTA_REFRESH
     args = sys.argv[1:]
 
-    if "--night" in args:
-        return run_night()
-
-    if "--mid-day1" in args:
-        return run_mid_day1()
+    if "--sequential" in args:
+        print("🐢 RUNNER: modalità sequenziale (prefetch concorrente disattivato).", flush=True)
+        engine.SCAN_WORKERS = 1
 
-    if "--evening-multi" in args:
-        return run_evening_multi()
+    if "--full-rescan" in args:
+        print("🔁 RUNNER: delta refresh disattivato, ricalcolo completo.", flush=True)
+        DELTA_REFRESH = False
 
-    print("❌ Argomento non valido. Usa: --night | --mid-day1 | --evening-multi", flush=True)
+    for flag, run_mode in RUN_MODES.items():
+        if flag in args:
+            try:
+                # run_report.json accanto agli output, tabella delle fasi su stdout
+                with engine.metrics_run(flag.lstrip("-")):
+                    return run_mode()
+            finally:
+                if engine.STATE.last_run_report:
+                    print_summary(engine.STATE.last_run_report)
+                engine.api_cache().print_stats()
+                engine.api_cache().close()
+                form_store = engine.team_form_store()
+                if form_store is not None:
+                    form_store.print_stats()
+                    form_store.close()
+
+    print("❌ Argomento non valido. Usa: --night | --mid-day1 | --evening-multi [--sequential] [--full-rescan]", flush=True)
     return 1
 
 
@@ -9,6 +9,14 @@ import sys
 from pathlib import Path
 from github import Github
 
+from api_client import ApiClient, DEFAULT_SCAN_WORKERS, parallel_map
+from api_replay import RECORD_ENV, REPLAY_ENV, ReplayStore
+from diagnostics_sink import DiagnosticsSink
+from http_cache import ResponseCache
+from market_parser import MarketParser
+from run_metrics import REPORT_FILE_NAME, load_report
+from team_form import fetch_team_form, record_score
+
 # ==========================================
 # CONFIGURAZIONE ARAB SNIPER V24.1 DIAGNOSI
 # Base derivata dalla V24 test
@@ -25,6 +33,7 @@ DETAILS_FILE = str(BASE_DIR / "match_details.json")
 DIAG_DB_FILE = str(BASE_DIR / "diagnostic_matches.json")
 DIAG_CSV_FILE = str(BASE_DIR / "diagnostic_matches.csv")
 DIAG_DETAILS_FILE = str(BASE_DIR / "diagnostic_match_details.json")
+RUN_REPORT_FILE = str(BASE_DIR / REPORT_FILE_NAME)
 
 DEFAULT_EXCLUDED = ["Thailand", "Indonesia", "India", "Kenya", "Morocco", "Rwanda", "Nigeria", "Oman", "Algeria", "UAE"]
 LEAGUE_BLACKLIST = ["u19", "u20", "youth", "women", "friendly", "carioca", "paulista", "mineiro"]
@@ -55,7 +64,16 @@ except Exception:
     ROME_TZ = None
 
 
+# ARAB_NOW (ISO, es. 2026-03-19T08:00:00) congela l'orologio per replay e benchmark
+FROZEN_NOW = os.getenv("ARAB_NOW")
+
+
 def now_rome():
+    if FROZEN_NOW:
+        frozen = datetime.fromisoformat(FROZEN_NOW)
+        if ROME_TZ and frozen.tzinfo is None:
+            frozen = frozen.replace(tzinfo=ROME_TZ)
+        return frozen.astimezone(ROME_TZ) if ROME_TZ else frozen
     return datetime.now(ROME_TZ) if ROME_TZ else datetime.now()
 
 
@@ -180,6 +198,9 @@ if "team_stats_cache" not in st.session_state:
 if "team_last_matches_cache" not in st.session_state:
     st.session_state.team_last_matches_cache = {}
 
+if "team_form_cache" not in st.session_state:
+    st.session_state.team_form_cache = {}
+
 if "available_countries" not in st.session_state:
     st.session_state.available_countries = []
 
@@ -247,33 +268,24 @@ if not API_KEY:
         pass
 
 HEADERS = {"x-apisports-key": API_KEY} if API_KEY else {}
+API_CACHE = ResponseCache()
+API_RECORDER = ReplayStore.from_env(RECORD_ENV)
+API_REPLAY = ReplayStore.from_env(REPLAY_ENV)
+API_CLIENT = ApiClient(API_KEY, cache=API_CACHE, recorder=API_RECORDER, replay=API_REPLAY)
 
+if API_RECORDER:
+    API_RECORDER.write_manifest(now_rome().isoformat())
 
-def api_get(session, path, params):
-    if not API_KEY:
-        return None
+# 1 = diagnosi sequenziale (debug), >1 = prefetch concorrente di quote e form squadre
+SCAN_WORKERS = DEFAULT_SCAN_WORKERS
 
-    for attempt in range(2):
-        try:
-            r = session.get(
-                f"https://v3.football.api-sports.io/{path}",
-                headers=HEADERS,
-                params=params,
-                timeout=20
-            )
-            if r.status_code == 200:
-                return r.json()
-            time.sleep(1)
-        except Exception:
-            if attempt == 1:
-                return None
-            time.sleep(1)
-    return None
+
+def api_get(session, path, params):
+    return API_CLIENT.get(session, path, params)
 
 
-def _contains_ht(text):
-    t = str(text or "").lower()
-    return any(k in t for k in ["1st half", "first half", "1h", "ht", "half time", "halftime", "1° tempo"])
+# stesso parser mercati dello scanner (tabelle bet/valori memoizzate)
+MARKET_PARSER = MarketParser.from_env()
 
 
 def safe_float(x, default=0.0):
@@ -300,48 +312,7 @@ def extract_elite_markets(session, fid):
     if not res or not res.get("response"):
         return None
 
-    mk = {"q1": 0.0, "qx": 0.0, "q2": 0.0, "o25": 0.0, "o05ht": 0.0, "o15ht": 0.0}
-
-    for bm in res["response"][0].get("bookmakers", []):
-        for b in bm.get("bets", []):
-            name = (b.get("name") or "").lower()
-            bid = b.get("id")
-
-            if bid == 1 and mk["q1"] == 0:
-                for v in b.get("values", []):
-                    vl = str(v.get("value", "")).lower()
-                    odd = safe_float(v.get("odd"), 0.0)
-                    if "home" in vl:
-                        mk["q1"] = odd
-                    elif "draw" in vl:
-                        mk["qx"] = odd
-                    elif "away" in vl:
-                        mk["q2"] = odd
-
-            if bid == 5 and mk["o25"] == 0:
-                if any(j in name for j in ["corner", "card", "booking"]):
-                    continue
-                for v in b.get("values", []):
-                    if "over 2.5" in str(v.get("value", "")).lower():
-                        mk["o25"] = safe_float(v.get("odd"), 0.0)
-
-            if _contains_ht(name) and any(k in name for k in ["total", "over/under", "ou", "goals"]):
-                if "team" in name:
-                    continue
-                for v in b.get("values", []):
-                    val_txt = str(v.get("value", "")).lower().replace(",", ".")
-                    if "over 0.5" in val_txt and mk["o05ht"] == 0:
-                        mk["o05ht"] = safe_float(v.get("odd"), 0.0)
-                    if "over 1.5" in val_txt and mk["o15ht"] == 0:
-                        mk["o15ht"] = safe_float(v.get("odd"), 0.0)
-
-        if mk["q1"] > 0 and mk["o25"] > 0 and mk["o05ht"] > 0:
-            break
-
-    if (1.01 <= mk["q1"] <= 1.10) or (1.01 <= mk["q2"] <= 1.10) or (1.01 <= mk["o25"] <= 1.30):
-        return "SKIP"
-
-    return mk
+    return MARKET_PARSER.parse(res["response"][0])
 
 
 def save_snapshot_file(payload):
@@ -435,50 +406,41 @@ def build_rolling_multiday_snapshot(session):
     return payload
 
 
+def get_team_form(session, tid):
+    """
+    Record compatti delle ultime 8 partite finite (loader condiviso con 3appDays.py).
+    """
+    cache_key = str(tid)
+    if cache_key in st.session_state.team_form_cache:
+        return st.session_state.team_form_cache[cache_key]
+
+    records = fetch_team_form(session, tid, api_get)
+    if records is None:
+        return []
+
+    st.session_state.team_form_cache[cache_key] = records
+    return records
+
+
 def get_team_last_matches(session, tid):
     cache_key = str(tid)
     if cache_key in st.session_state.team_last_matches_cache:
         return st.session_state.team_last_matches_cache[cache_key]
 
-    res = api_get(session, "fixtures", {"team": tid, "last": 8, "status": "FT"})
-    fx = res.get("response", []) if res else []
-
     last_matches = []
-    for f in fx:
-        home = f.get("teams", {}).get("home", {})
-        away = f.get("teams", {}).get("away", {})
-
-        home_id = home.get("id")
-        away_id = away.get("id")
-
-        home_name = home.get("name", "N/D")
-        away_name = away.get("name", "N/D")
-
-        gh = safe_float(f.get("goals", {}).get("home", 0), 0.0)
-        ga = safe_float(f.get("goals", {}).get("away", 0), 0.0)
-
-        hth = safe_float(f.get("score", {}).get("halftime", {}).get("home", 0), 0.0)
-        hta = safe_float(f.get("score", {}).get("halftime", {}).get("away", 0), 0.0)
-
-        # Identifica se la squadra analizzata giocava in casa o fuori
-        is_home_team = str(home_id) == str(tid)
-        is_away_team = str(away_id) == str(tid)
-
-        team_ht_scored = 0.0
-        team_ht_conceded = 0.0
-        team_ft_scored = 0.0
-        team_ft_conceded = 0.0
-
-        if is_home_team:
-            team_ht_scored = hth
-            team_ht_conceded = hta
-            team_ft_scored = gh
-            team_ft_conceded = ga
-        elif is_away_team:
-            team_ht_scored = hta
-            team_ht_conceded = hth
-            team_ft_scored = ga
-            team_ft_conceded = gh
+    for rec in get_team_form(session, tid):
+        home_name, away_name, hth, hta, gh, ga = record_score(rec)
+
+        gh = safe_float(gh, 0.0)
+        ga = safe_float(ga, 0.0)
+        hth = safe_float(hth, 0.0)
+        hta = safe_float(hta, 0.0)
+
+        # Metriche già orientate sulla squadra analizzata
+        team_ht_scored = safe_float(rec.get("ht_for"), 0.0)
+        team_ht_conceded = safe_float(rec.get("ht_against"), 0.0)
+        team_ft_scored = safe_float(rec.get("ft_for"), 0.0)
+        team_ft_conceded = safe_float(rec.get("ft_against"), 0.0)
 
         total_ht_goals = hth + hta
         total_ft_goals = gh + ga
@@ -487,8 +449,8 @@ def get_team_last_matches(session, tid):
         second_half_conceded = max(team_ft_conceded - team_ht_conceded, 0.0)
 
         last_matches.append({
-            "date": str(f.get("fixture", {}).get("date", ""))[:10],
-            "league": f.get("league", {}).get("name", "N/D"),
+            "date": rec.get("date", ""),
+            "league": rec.get("league", "N/D"),
             "match": f"{home_name} - {away_name}",
             "ht": f"{int(hth)}-{int(hta)}",
             "ft": f"{int(gh)}-{int(ga)}",
@@ -612,6 +574,31 @@ def get_team_performance(session, tid):
     st.session_state.team_stats_cache[cache_key] = stats
     return stats
 
+def prefetch_markets(fixture_ids, workers):
+    """
+    Quote dei fixture scaricate in parallelo.
+    Restituisce {fixture_id: markets} (None = nessuna quota disponibile).
+    """
+    fixture_ids = list(dict.fromkeys(fixture_ids))
+    fetched = parallel_map(extract_elite_markets, fixture_ids, workers)
+    return dict(zip(fixture_ids, fetched))
+
+
+def prefetch_team_form(team_ids, workers):
+    """
+    Scarica in parallelo la form delle squadre non ancora in cache;
+    la team_form_cache viene popolata dal thread principale.
+    """
+    pending = [
+        tid for tid in dict.fromkeys(team_ids)
+        if str(tid) not in st.session_state.team_form_cache
+    ]
+
+    fetched = parallel_map(lambda sess, tid: fetch_team_form(sess, tid, api_get), pending, workers)
+    for tid, records in zip(pending, fetched):
+        if records is not None:
+            st.session_state.team_form_cache[str(tid)] = records
+
 # ==========================================
 # SCORING HELPERS V24.1
 # ==========================================
@@ -1888,16 +1875,64 @@ def build_diag_base_row(fx, target_date):
     }
 
 
-def append_diagnostic_row(rows, base_row, **extra):
+# intestazione fissa del CSV diagnostico (stream e file ordinato):
+# i campi nuovi di append_diagnostic_row vanno aggiunti qui, altrimenti restano solo nel .jsonl
+DIAG_COLUMNS = [
+    "date", "time", "country", "league", "status_short", "status_long", "league_blacklisted",
+    "home", "away", "match", "fixture_id", "home_team_id", "away_team_id",
+    "diagnostic_scope", "early_skip", "skip_stage", "kept", "prefilter_out", "reason", "tags",
+    "analyzed", "analysis_bucket", "strong_tag_count",
+    "has_gold", "has_boost", "has_ptgg", "has_pt15", "has_over", "has_probe_o", "has_probe_g",
+    "fav_quote", "is_gold_zone", "drop_diff",
+    "q1", "qx", "q2", "o25", "o05ht", "o15ht",
+    "combined_ht_avg", "combined_ht_clean", "combined_ft_clean",
+    "combined_ht_scored_clean", "combined_ht_conceded_clean",
+    "home_avg_total", "away_avg_total", "home_avg_ht", "away_avg_ht",
+    "home_avg_total_clean", "away_avg_total_clean", "home_avg_ht_clean", "away_avg_ht_clean",
+    "home_avg_ht_scored_clean", "away_avg_ht_scored_clean",
+    "home_avg_ht_conceded_clean", "away_avg_ht_conceded_clean",
+    "home_ft_2plus_rate", "away_ft_2plus_rate", "home_ft_3plus_rate", "away_ft_3plus_rate",
+    "home_ft_low_rate", "away_ft_low_rate", "home_ht_1plus_rate", "away_ht_1plus_rate",
+    "home_ht_zero_rate", "away_ht_zero_rate",
+    "ptgg_score", "pt15_score", "pt_score", "over_score", "boost_score", "gold_score", "max_score",
+]
+
+DIAG_SORT_PRIORITY = {
+    "KEPT": 0,
+    "SCARTATA_KEEP": 1,
+    "PREFILTER_OUT": 2,
+    "INPUT_STATS": 3,
+    "INPUT_MARKETS": 4,
+    "INPUT_TEAMS": 5,
+    "INPUT_FIXTURE": 6,
+    "FILTER_COUNTRY": 7,
+    "FILTER_LEAGUE": 8,
+    "FILTER_STATUS": 9,
+    "ERROR": 10,
+}
+
+
+def diag_sort_key(row):
+    return (
+        row.get("date", ""),
+        DIAG_SORT_PRIORITY.get(row.get("skip_stage"), 99),
+        row.get("league", ""),
+        row.get("time", ""),
+        row.get("match", ""),
+    )
+
+
+def append_diagnostic_row(sink, base_row, **extra):
     row = dict(base_row)
     row.update(extra)
-    rows.append(row)
+    sink.write_row(row)
 
 # ==========================================
 # SCAN CORE
 # ==========================================
-def run_full_scan(horizon=None, snap=False, update_main_site=False, show_success=True):
+def run_full_scan(horizon=None, snap=False, update_main_site=False, show_success=True, workers=None):
     use_horizon = horizon if horizon is not None else HORIZON
+    use_workers = workers if workers is not None else SCAN_WORKERS
     target_dates = get_target_dates()
 
     with st.spinner(f"🚀 Analisi mercati {target_dates[use_horizon - 1]}..."):
@@ -1963,9 +1998,33 @@ def run_full_scan(horizon=None, snap=False, update_main_site=False, show_success
                     return
 
             final_list = []
-            diagnostic_rows = []
             details_map = dict(st.session_state.match_details)
 
+            # ==========================================
+            # 2b) PREFETCH CONCORRENTE QUOTE + FORM SQUADRE
+            # ==========================================
+            prefetched_markets = {}
+            if use_workers > 1:
+                scan_fx = [
+                    f for f in ns_not_blacklisted
+                    if f.get("league", {}).get("country", "N/D") not in st.session_state.config["excluded"]
+                    and f.get("fixture", {}).get("id") is not None
+                ]
+                prefetched_markets = prefetch_markets(
+                    [str(f["fixture"]["id"]) for f in scan_fx],
+                    use_workers
+                )
+                team_ids = []
+                for f in scan_fx:
+                    mk = prefetched_markets.get(str(f["fixture"]["id"]))
+                    home_id = f.get("teams", {}).get("home", {}).get("id")
+                    away_id = f.get("teams", {}).get("away", {}).get("id")
+                    if mk and mk != "SKIP" and safe_float(mk.get("q1"), 0.0) != 0 and home_id and away_id:
+                        team_ids.extend([home_id, away_id])
+                prefetch_team_form(team_ids, use_workers)
+
+            # righe diagnostiche e righe analizzate su disco appena prodotte (anche se il run si interrompe)
+            diag_sink = DiagnosticsSink(DIAG_CSV_FILE, DIAG_COLUMNS, db_path=DIAG_DB_FILE)
             pb = st.progress(0, text="🚀 ANALISI DIAGNOSTICA COMPLETA...")
 
             # ==========================================
@@ -1979,7 +2038,7 @@ def run_full_scan(horizon=None, snap=False, update_main_site=False, show_success
                     status_short = base["status_short"]
                     if status_short != "NS":
                         append_diagnostic_row(
-                            diagnostic_rows,
+                            diag_sink,
                             base,
                             diagnostic_scope="ALL_FIXTURES",
                             early_skip=True,
@@ -1993,7 +2052,7 @@ def run_full_scan(horizon=None, snap=False, update_main_site=False, show_success
 
                     if base["league_blacklisted"]:
                         append_diagnostic_row(
-                            diagnostic_rows,
+                            diag_sink,
                             base,
                             diagnostic_scope="ALL_FIXTURES",
                             early_skip=True,
@@ -2008,7 +2067,7 @@ def run_full_scan(horizon=None, snap=False, update_main_site=False, show_success
                     cnt = base["country"]
                     if cnt in st.session_state.config["excluded"]:
                         append_diagnostic_row(
-                            diagnostic_rows,
+                            diag_sink,
                             base,
                             diagnostic_scope="ALL_FIXTURES",
                             early_skip=True,
@@ -2023,7 +2082,7 @@ def run_full_scan(horizon=None, snap=False, update_main_site=False, show_success
                     fid = str(base.get("fixture_id"))
                     if not fid or fid == "None":
                         append_diagnostic_row(
-                            diagnostic_rows,
+                            diag_sink,
                             base,
                             diagnostic_scope="ALL_FIXTURES",
                             early_skip=True,
@@ -2035,10 +2094,13 @@ def run_full_scan(horizon=None, snap=False, update_main_site=False, show_success
                         )
                         continue
 
-                    mk = extract_elite_markets(s, fid)
+                    if fid in prefetched_markets:
+                        mk = prefetched_markets[fid]
+                    else:
+                        mk = extract_elite_markets(s, fid)
                     if not mk:
                         append_diagnostic_row(
-                            diagnostic_rows,
+                            diag_sink,
                             base,
                             diagnostic_scope="ALL_FIXTURES",
                             early_skip=True,
@@ -2052,7 +2114,7 @@ def run_full_scan(horizon=None, snap=False, update_main_site=False, show_success
 
                     if mk == "SKIP":
                         append_diagnostic_row(
-                            diagnostic_rows,
+                            diag_sink,
                             base,
                             diagnostic_scope="ALL_FIXTURES",
                             early_skip=True,
@@ -2067,7 +2129,7 @@ def run_full_scan(horizon=None, snap=False, update_main_site=False, show_success
                     q1 = safe_float(mk.get("q1"), 0.0)
                     if q1 == 0:
                         append_diagnostic_row(
-                            diagnostic_rows,
+                            diag_sink,
                             base,
                             diagnostic_scope="ALL_FIXTURES",
                             early_skip=True,
@@ -2089,7 +2151,7 @@ def run_full_scan(horizon=None, snap=False, update_main_site=False, show_success
                     away_team = f.get("teams", {}).get("away", {})
                     if not home_team.get("id") or not away_team.get("id"):
                         append_diagnostic_row(
-                            diagnostic_rows,
+                            diag_sink,
                             base,
                             diagnostic_scope="ALL_FIXTURES",
                             early_skip=True,
@@ -2111,7 +2173,7 @@ def run_full_scan(horizon=None, snap=False, update_main_site=False, show_success
                     s_a = get_team_performance(s, away_team["id"])
                     if not s_h and not s_a:
                         append_diagnostic_row(
-                            diagnostic_rows,
+                            diag_sink,
                             base,
                             diagnostic_scope="ALL_FIXTURES",
                             early_skip=True,
@@ -2130,7 +2192,7 @@ def run_full_scan(horizon=None, snap=False, update_main_site=False, show_success
                         continue
                     if not s_h:
                         append_diagnostic_row(
-                            diagnostic_rows,
+                            diag_sink,
                             base,
                             diagnostic_scope="ALL_FIXTURES",
                             early_skip=True,
@@ -2149,7 +2211,7 @@ def run_full_scan(horizon=None, snap=False, update_main_site=False, show_success
                         continue
                     if not s_a:
                         append_diagnostic_row(
-                            diagnostic_rows,
+                            diag_sink,
                             base,
                             diagnostic_scope="ALL_FIXTURES",
                             early_skip=True,
@@ -2236,9 +2298,10 @@ def run_full_scan(horizon=None, snap=False, update_main_site=False, show_success
                         "FT2+ A": round(s_a["ft_2plus_rate"], 2),
                     }
                     final_list.append(row)
+                    diag_sink.write_match(row)
 
                     append_diagnostic_row(
-                        diagnostic_rows,
+                        diag_sink,
                         base,
                         diagnostic_scope="ALL_FIXTURES",
                         early_skip=False,
@@ -2356,7 +2419,7 @@ def run_full_scan(horizon=None, snap=False, update_main_site=False, show_success
 
                 except Exception as e:
                     append_diagnostic_row(
-                        diagnostic_rows,
+                        diag_sink,
                         base,
                         diagnostic_scope="ALL_FIXTURES",
                         early_skip=True,
@@ -2372,64 +2435,46 @@ def run_full_scan(horizon=None, snap=False, update_main_site=False, show_success
 
             # ==========================================
             # 4) SALVATAGGI DIAGNOSTICI LOCALI
+            # righe già scritte in streaming: si chiude l'array JSON e si ordina il CSV (merge esterno)
             # ==========================================
             try:
-                with open(DIAG_DB_FILE, "w", encoding="utf-8") as f:
-                    json.dump(final_list, f, indent=4, ensure_ascii=False)
-            except Exception as e:
-                print(f"❌ Errore salvataggio diagnostico DB: {e}", flush=True)
-                if show_success:
-                    st.error(f"❌ Errore salvataggio diagnostico DB: {e}")
-                return
+                try:
+                    diag_sink.finish_matches()
+                except Exception as e:
+                    print(f"❌ Errore salvataggio diagnostico DB: {e}", flush=True)
+                    if show_success:
+                        st.error(f"❌ Errore salvataggio diagnostico DB: {e}")
+                    return
 
-            try:
-                with open(DIAG_DETAILS_FILE, "w", encoding="utf-8") as f:
-                    json.dump({
-                        "updated_at": now_rome().strftime("%Y-%m-%d %H:%M:%S"),
-                        "details": details_map
-                    }, f, indent=4, ensure_ascii=False)
-            except Exception as e:
-                print(f"❌ Errore salvataggio diagnostico details: {e}", flush=True)
-                if show_success:
-                    st.error(f"❌ Errore salvataggio diagnostico details: {e}")
-                return
+                try:
+                    with open(DIAG_DETAILS_FILE, "w", encoding="utf-8") as f:
+                        json.dump({
+                            "updated_at": now_rome().strftime("%Y-%m-%d %H:%M:%S"),
+                            "details": details_map
+                        }, f, indent=4, ensure_ascii=False)
+                except Exception as e:
+                    print(f"❌ Errore salvataggio diagnostico details: {e}", flush=True)
+                    if show_success:
+                        st.error(f"❌ Errore salvataggio diagnostico details: {e}")
+                    return
 
-            try:
-                df_diag = pd.DataFrame(diagnostic_rows)
-                if not df_diag.empty:
-                    priority = {
-                        "KEPT": 0,
-                        "SCARTATA_KEEP": 1,
-                        "PREFILTER_OUT": 2,
-                        "INPUT_STATS": 3,
-                        "INPUT_MARKETS": 4,
-                        "INPUT_TEAMS": 5,
-                        "INPUT_FIXTURE": 6,
-                        "FILTER_COUNTRY": 7,
-                        "FILTER_LEAGUE": 8,
-                        "FILTER_STATUS": 9,
-                        "ERROR": 10,
-                    }
-                    df_diag["sort_priority"] = df_diag["skip_stage"].map(priority).fillna(99)
-                    df_diag = df_diag.sort_values(
-                        by=["date", "sort_priority", "league", "time", "match"],
-                        ascending=[True, True, True, True, True],
-                        na_position="last"
-                    ).drop(columns=["sort_priority"])
-                df_diag.to_csv(DIAG_CSV_FILE, index=False, encoding="utf-8-sig")
-            except Exception as e:
-                print(f"❌ Errore salvataggio diagnostico CSV: {e}", flush=True)
-                if show_success:
-                    st.error(f"❌ Errore salvataggio diagnostico CSV: {e}")
-                return
+                try:
+                    diag_sink.write_sorted_csv(diag_sort_key)
+                except Exception as e:
+                    print(f"❌ Errore salvataggio diagnostico CSV: {e}", flush=True)
+                    if show_success:
+                        st.error(f"❌ Errore salvataggio diagnostico CSV: {e}")
+                    return
+            finally:
+                diag_sink.close()
 
             st.session_state.scan_results = final_list
             st.session_state.match_details = details_map
 
             if show_success:
-                kept_count = len([r for r in diagnostic_rows if r.get("kept")])
-                prefilter_count = len([r for r in diagnostic_rows if r.get("prefilter_out")])
-                early_skip_count = len([r for r in diagnostic_rows if r.get("early_skip")])
+                kept_count = diag_sink.kept
+                prefilter_count = diag_sink.prefilter_out
+                early_skip_count = diag_sink.early_skip
                 st.success(f"✅ Diagnosi completata: {len(final_list)} match analizzati con score/tag")
                 st.success(f"✅ CSV diagnostico salvato: {Path(DIAG_CSV_FILE).name}")
                 st.info(
@@ -2496,7 +2541,7 @@ st.sidebar.markdown("---")
 st.sidebar.caption(f"DB DIAGNOSI: {Path(DIAG_DB_FILE).name}")
 st.sidebar.caption(f"SNAP: {Path(SNAP_FILE).name}")
 st.sidebar.caption(f"DETAILS DIAGNOSI: {Path(DIAG_DETAILS_FILE).name}")
-st.sidebar.caption("Diagnosi locale: JSON + CSV, nessun upload GitHub")
+st.sidebar.caption("Diagnosi locale: JSON + CSV + JSON-lines (in streaming), nessun upload GitHub")
 
 # ==========================================
 # UI MAIN
@@ -2694,6 +2739,78 @@ if st.session_state.scan_results:
 else:
     st.info("Esegui uno scan.")
 
+# ==========================================
+# ULTIMO RUN REPORT (run_report.json di sniper_engine / runner)
+# ==========================================
+def show_run_report():
+    report = load_report(RUN_REPORT_FILE)
+    with st.expander("⏱️ ULTIMO RUN REPORT", expanded=False):
+        if not report:
+            st.info(f"Nessun {Path(RUN_REPORT_FILE).name}: lo scrive ogni scan del motore o del runner.")
+            return
+
+        api = report.get("api") or {}
+        cache = report.get("cache") or {}
+        st.caption(
+            f"{report.get('label', 'N/D')} | {report.get('started_at', 'N/D')} → {report.get('finished_at', 'N/D')} | "
+            f"{report.get('wall_seconds', 0):.1f}s"
+        )
+        m1, m2, m3, m4 = st.columns(4)
+        m1.metric("Chiamate API", api.get("calls", 0))
+        m2.metric("Retry", api.get("retries", 0))
+        m3.metric("MB ricevuti", f"{api.get('bytes', 0) / (1024 * 1024):.2f}")
+        m4.metric("Hit cache", cache.get("hits", 0))
+
+        stages = report.get("stages") or {}
+        if stages:
+            st.dataframe(
+                pd.DataFrame([
+                    {"Fase": name, "Secondi": entry.get("seconds", 0), "Passaggi": entry.get("count", 0)}
+                    for name, entry in stages.items()
+                ]).sort_values(by="Secondi", ascending=False),
+                use_container_width=True,
+                hide_index=True
+            )
+
+        endpoints = api.get("by_endpoint") or {}
+        cache_endpoints = cache.get("by_endpoint") or {}
+        labels = sorted(set(endpoints) | set(cache_endpoints))
+        if labels:
+            st.dataframe(
+                pd.DataFrame([
+                    {
+                        "Endpoint": label,
+                        "Chiamate": endpoints.get(label, {}).get("calls", 0),
+                        "Retry": endpoints.get(label, {}).get("retries", 0),
+                        "Saltate": endpoints.get(label, {}).get("skipped", 0),
+                        "KB": round(endpoints.get(label, {}).get("bytes", 0) / 1024, 1),
+                        "Hit cache": cache_endpoints.get(label, {}).get("hits", 0),
+                        "Status": " ".join(
+                            f"{code}x{n}" for code, n in sorted((endpoints.get(label, {}).get("status") or {}).items())
+                        ),
+                    }
+                    for label in labels
+                ]),
+                use_container_width=True,
+                hide_index=True
+            )
+
+        quota = report.get("api_quota") or {}
+        if quota.get("daily_remaining") is not None:
+            st.caption(
+                f"Quota API {quota.get('day', 'N/D')}: {quota.get('daily_remaining')}/{quota.get('daily_limit', 'N/D')} "
+                f"richieste rimaste | backoff {api.get('backoff_seconds', 0):.1f}s | "
+                f"{api.get('skipped', 0)} chiamate opzionali saltate"
+                + (" | ⚠️ quota quasi finita" if quota.get("low") else "")
+            )
+
+        extra = {k: report[k] for k in ("counters", "team_form", "github") if report.get(k)}
+        if extra:
+            st.json(extra, expanded=False)
+
+
+show_run_report()
+
 # ==========================================
 # LOGICA ESECUZIONE AUTOMATICA GITHUB ACTIONS
 # ==========================================
@@ -0,0 +1,384 @@
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import requests
+
+from http_cache import endpoint_label
+
+# ==========================================
+# CLIENT API-SPORTS CONDIVISO
+# - rate limiter token bucket (richieste/minuto del piano)
+# - pool di worker per il fan-out delle chiamate
+# - contatori chiamate/byte/retry/status HTTP per endpoint, record/replay (api_replay.py)
+# - retry con backoff esponenziale + jitter su 429/5xx/errori di rete;
+#   su 429 (o errors.rateLimit nel body) si ferma il limiter per tutti i thread
+# - header di quota API-Sports: limite al minuto (abbassa il limiter se il piano
+#   ne concede meno) e richieste giornaliere rimaste
+# - quota giornaliera quasi finita (<= API_SPORTS_QUOTA_RESERVE): le chiamate
+#   opzionali (optional=True) vengono saltate; quota finita: nessuna chiamata fino al giorno dopo (UTC)
+# ==========================================
+API_BASE_URL = "https://v3.football.api-sports.io"
+
+DEFAULT_REQUESTS_PER_MINUTE = int(os.getenv("API_SPORTS_RPM", "300") or 300)
+DEFAULT_SCAN_WORKERS = int(os.getenv("ARAB_SCAN_WORKERS", "6") or 1)
+DEFAULT_ATTEMPTS = int(os.getenv("API_SPORTS_ATTEMPTS", "4") or 1)
+DEFAULT_QUOTA_RESERVE = int(os.getenv("API_SPORTS_QUOTA_RESERVE", "300") or 0)
+
+BACKOFF_BASE_SECONDS = 1.0
+BACKOFF_MAX_SECONDS = 30.0
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+def _lower_headers(headers):
+    return {str(k).lower(): v for k, v in (headers or {}).items()}
+
+
+def _header_int(headers, name):
+    try:
+        return int(headers.get(name))
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt, retry_after=None):
+    """
+    Attesa prima del retry numero `attempt` (da 1): esponenziale con jitter
+    (metà fissa, metà casuale), mai meno del Retry-After del server.
+    """
+    delay = min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * (2 ** (attempt - 1)))
+    delay = delay / 2 + random.uniform(0, delay / 2)
+    if retry_after:
+        delay = max(delay, min(float(retry_after), BACKOFF_MAX_SECONDS * 4))
+    return delay
+
+
+class TokenBucket:
+    """
+    Limiter thread-safe: al massimo `requests_per_minute` richieste al minuto,
+    con un piccolo burst iniziale pari al ritmo di un secondo.
+    """
+
+    def __init__(self, requests_per_minute, burst=None):
+        self.requests_per_minute = max(1, int(requests_per_minute))
+        self.rate = self.requests_per_minute / 60.0
+        self.capacity = float(burst or max(1, int(self.rate)))
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def set_rate(self, requests_per_minute):
+        """
+        Abbassa il ritmo (mai lo alza): limite al minuto letto dagli header del piano.
+        """
+        requests_per_minute = max(1, int(requests_per_minute))
+        with self.lock:
+            if requests_per_minute >= self.requests_per_minute:
+                return False
+            self.requests_per_minute = requests_per_minute
+            self.rate = requests_per_minute / 60.0
+            self.capacity = min(self.capacity, float(max(1, int(self.rate))))
+            self.tokens = min(self.tokens, self.capacity)
+            return True
+
+    def pause(self, seconds):
+        """
+        Nessuna richiesta per `seconds` secondi, per tutti i thread (dopo un 429).
+        """
+        with self.lock:
+            resume_at = time.monotonic() + seconds
+            if resume_at > self.updated_at:
+                self.updated_at = resume_at
+                self.tokens = 0.0
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                # updated_at nel futuro = limiter in pausa fino a quell'istante
+                self.tokens = min(self.capacity, self.tokens + max(0.0, now - self.updated_at) * self.rate)
+                self.updated_at = max(self.updated_at, now)
+
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+
+                wait = (self.updated_at - now) + (1 - self.tokens) / self.rate
+
+            time.sleep(wait)
+
+
+def _utc_day():
+    return datetime.now(timezone.utc).strftime("%Y-%m-%d")
+
+
+class ApiClient:
+    def __init__(self, api_key, requests_per_minute=DEFAULT_REQUESTS_PER_MINUTE, timeout=20, attempts=DEFAULT_ATTEMPTS,
+                 cache=None, recorder=None, replay=None, quota_reserve=DEFAULT_QUOTA_RESERVE):
+        self.api_key = api_key
+        self.headers = {"x-apisports-key": api_key} if api_key else {}
+        self.limiter = TokenBucket(requests_per_minute)
+        self.timeout = timeout
+        self.attempts = max(1, int(attempts))
+        self.cache = cache
+        self.recorder = recorder
+        self.replay = replay
+        self.quota_reserve = quota_reserve
+        self.stats_lock = threading.Lock()
+        self.calls = {}
+        self.bytes = {}
+        self.retries = {}
+        self.status = {}
+        self.skipped = {}
+        self.backoff_seconds = 0.0
+        # ultimo stato letto dagli header (giorno UTC: la quota giornaliera riparte a mezzanotte)
+        self.quota = {
+            "day": None,
+            "daily_limit": None,
+            "daily_remaining": None,
+            "minute_limit": None,
+            "minute_remaining": None,
+            "exhausted": False,
+            "low_warned": False,
+        }
+
+    def _count(self, label, nbytes, status=None):
+        with self.stats_lock:
+            self.calls[label] = self.calls.get(label, 0) + 1
+            self.bytes[label] = self.bytes.get(label, 0) + nbytes
+        if status is not None:
+            self._count_status(label, status)
+
+    def _count_status(self, label, status):
+        # status HTTP, "error" per timeout ed errori di rete,
+        # "rateLimit"/"quota" per i 200 con errore di limite nel body
+        with self.stats_lock:
+            codes = self.status.setdefault(label, {})
+            codes[str(status)] = codes.get(str(status), 0) + 1
+
+    def _count_retry(self, label, seconds):
+        with self.stats_lock:
+            self.retries[label] = self.retries.get(label, 0) + 1
+            self.backoff_seconds += seconds
+
+    def _count_skip(self, label):
+        with self.stats_lock:
+            self.skipped[label] = self.skipped.get(label, 0) + 1
+
+    # -------------------------
+    # QUOTA
+    # -------------------------
+    def _read_quota(self, headers):
+        """
+        Header API-Sports (in minuscolo): x-ratelimit-requests-* (giorno), x-ratelimit-* (minuto).
+        """
+        daily_limit = _header_int(headers, "x-ratelimit-requests-limit")
+        daily_remaining = _header_int(headers, "x-ratelimit-requests-remaining")
+        minute_limit = _header_int(headers, "x-ratelimit-limit")
+        minute_remaining = _header_int(headers, "x-ratelimit-remaining")
+
+        with self.stats_lock:
+            day = _utc_day()
+            if self.quota["day"] != day:
+                self.quota.update({"day": day, "exhausted": False, "low_warned": False})
+            for key, value in (
+                ("daily_limit", daily_limit),
+                ("daily_remaining", daily_remaining),
+                ("minute_limit", minute_limit),
+                ("minute_remaining", minute_remaining),
+            ):
+                if value is not None:
+                    self.quota[key] = value
+            warn = self._quota_low_locked() and not self.quota["low_warned"]
+            if warn:
+                self.quota["low_warned"] = True
+
+        if minute_limit and self.limiter.set_rate(minute_limit):
+            print(f"⏳ API: limite del piano {minute_limit} richieste/minuto, limiter adeguato", flush=True)
+        if warn:
+            print(
+                f"⚠️ API: quota giornaliera quasi finita ({self.quota['daily_remaining']} richieste rimaste), "
+                "chiamate opzionali sospese",
+                flush=True
+            )
+
+    def _mark_exhausted(self):
+        with self.stats_lock:
+            already = self.quota["exhausted"] and self.quota["day"] == _utc_day()
+            self.quota.update({"day": _utc_day(), "exhausted": True, "daily_remaining": 0})
+        if not already:
+            print("🛑 API: quota giornaliera esaurita, nessuna altra chiamata fino a domani (UTC)", flush=True)
+
+    def _quota_low_locked(self):
+        remaining = self.quota["daily_remaining"]
+        return remaining is not None and remaining <= self.quota_reserve
+
+    def quota_exhausted(self):
+        with self.stats_lock:
+            return self.quota["exhausted"] and self.quota["day"] == _utc_day()
+
+    def quota_low(self):
+        """
+        True se la quota giornaliera di oggi è sotto la riserva: le chiamate opzionali si saltano.
+        """
+        with self.stats_lock:
+            return self.quota["day"] == _utc_day() and (self.quota["exhausted"] or self._quota_low_locked())
+
+    def quota_status(self):
+        with self.stats_lock:
+            status = {k: v for k, v in self.quota.items() if k != "low_warned"}
+        status["low"] = self.quota_low()
+        status["reserve"] = self.quota_reserve
+        return status
+
+    # -------------------------
+    # CHIAMATE
+    # -------------------------
+    def get(self, session, path, params, optional=False):
+        """
+        optional=True: chiamata di cui il run può fare a meno, saltata (None)
+        quando la quota giornaliera è sotto la riserva.
+        """
+        if self.replay is not None:
+            hit = self.replay.load(path, params)
+            if hit is None:
+                return None
+            payload, nbytes = hit
+            self._count(endpoint_label(path, params), nbytes)
+            return payload
+
+        payload = self._fetch(session, path, params, optional)
+        if payload is not None and self.recorder is not None:
+            self.recorder.save(path, params, payload)
+        return payload
+
+    def _fetch(self, session, path, params, optional=False):
+        if not self.api_key:
+            return None
+
+        if self.cache is not None:
+            cached = self.cache.get(path, params)
+            if cached is not None:
+                return cached
+
+        label = endpoint_label(path, params)
+        if self.quota_exhausted() or (optional and self.quota_low()):
+            self._count_skip(label)
+            return None
+
+        retry_after = None
+        rate_limited = False
+        for attempt in range(self.attempts):
+            if attempt:
+                delay = backoff_delay(attempt, retry_after)
+                self._count_retry(label, delay)
+                if rate_limited:
+                    self.limiter.pause(delay)
+                else:
+                    time.sleep(delay)
+                retry_after = None
+                rate_limited = False
+
+            self.limiter.acquire()
+            try:
+                r = session.get(
+                    f"{API_BASE_URL}/{path}",
+                    headers=self.headers,
+                    params=params,
+                    timeout=self.timeout
+                )
+            except Exception:
+                self._count(label, 0, "error")
+                continue
+
+            headers = _lower_headers(getattr(r, "headers", None))
+            self._count(label, len(r.content or b""))
+            self._read_quota(headers)
+
+            if r.status_code != 200:
+                self._count_status(label, r.status_code)
+                if r.status_code not in RETRY_STATUS:
+                    return None
+                rate_limited = r.status_code == 429
+                retry_after = _header_int(headers, "retry-after")
+                continue
+
+            try:
+                payload = r.json()
+            except Exception:
+                self._count_status(label, "error")
+                continue
+
+            # API-Sports segnala i limiti anche con un 200 e il campo errors valorizzato
+            errors = payload.get("errors") if isinstance(payload, dict) else None
+            if isinstance(errors, dict) and "rateLimit" in errors:
+                self._count_status(label, "rateLimit")
+                rate_limited = True
+                continue
+            if isinstance(errors, dict) and "requests" in errors:
+                self._count_status(label, "quota")
+                self._mark_exhausted()
+                return None
+
+            self._count_status(label, 200)
+            if self.cache is not None and not errors:
+                self.cache.put(path, params, payload)
+            return payload
+        return None
+
+    def stats(self):
+        with self.stats_lock:
+            return {
+                "calls": sum(self.calls.values()),
+                "bytes": sum(self.bytes.values()),
+                "retries": sum(self.retries.values()),
+                "backoff_seconds": round(self.backoff_seconds, 3),
+                "skipped": sum(self.skipped.values()),
+                "by_endpoint": {
+                    label: {
+                        "calls": self.calls.get(label, 0),
+                        "bytes": self.bytes.get(label, 0),
+                        "retries": self.retries.get(label, 0),
+                        "skipped": self.skipped.get(label, 0),
+                        "status": dict(self.status.get(label, {})),
+                    }
+                    for label in sorted(set(self.calls) | set(self.status) | set(self.skipped))
+                },
+            }
+
+
+def parallel_map(func, items, workers=DEFAULT_SCAN_WORKERS):
+    """
+    Esegue func(session, item) su un pool di thread e restituisce i risultati
+    nello stesso ordine di `items`. Ogni thread usa la propria requests.Session;
+    un errore su un item produce None, che il chiamante tratta come "nessun dato".
+    """
+    items = list(items)
+    if not items:
+        return []
+
+    local = threading.local()
+    sessions = []
+    sessions_lock = threading.Lock()
+
+    def run(item):
+        session = getattr(local, "session", None)
+        if session is None:
+            session = requests.Session()
+            local.session = session
+            with sessions_lock:
+                sessions.append(session)
+        try:
+            return func(session, item)
+        except Exception:
+            return None
+
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, int(workers))) as pool:
+            return list(pool.map(run, items))
+    finally:
+        for session in sessions:
+            session.close()
@@ -0,0 +1,82 @@
+import gzip
+import json
+import os
+import threading
+from pathlib import Path
+
+from http_cache import cache_key, endpoint_label
+
+# ==========================================
+# RECORD / REPLAY RISPOSTE API
+# - ARAB_API_RECORD_DIR: salva ogni risposta restituita da api_get nel corpus
+# - ARAB_API_REPLAY_DIR: serve le risposte dal corpus, senza rete né API key
+# Un file gzip per richiesta (chiave = endpoint + parametri ordinati),
+# più manifest.json con l'istante di registrazione per congelare le date.
+# ==========================================
+RECORD_ENV = "ARAB_API_RECORD_DIR"
+REPLAY_ENV = "ARAB_API_REPLAY_DIR"
+MANIFEST_FILE = "manifest.json"
+
+
+class ReplayStore:
+    def __init__(self, root):
+        self.root = Path(root)
+        self.responses_dir = self.root / "responses"
+        self.lock = threading.Lock()
+        self.saved = 0
+        self.missing = {}
+
+    @classmethod
+    def from_env(cls, env_name):
+        root = os.getenv(env_name)
+        return cls(root) if root else None
+
+    def entry_path(self, path, params):
+        return self.responses_dir / f"{cache_key(path, params)}.json.gz"
+
+    def save(self, path, params, payload):
+        body = json.dumps(
+            {"path": path, "params": {str(k): str(v) for k, v in (params or {}).items()}, "payload": payload},
+            ensure_ascii=False,
+            separators=(",", ":"),
+        ).encode("utf-8")
+
+        target = self.entry_path(path, params)
+        tmp = target.with_name(f"{target.name}.{threading.get_ident()}.tmp")
+        with self.lock:
+            self.responses_dir.mkdir(parents=True, exist_ok=True)
+            with gzip.open(tmp, "wb") as f:
+                f.write(body)
+            os.replace(tmp, target)
+            self.saved += 1
+
+    def load(self, path, params):
+        """
+        Restituisce (payload, byte JSON) oppure None se la richiesta non è nel corpus.
+        """
+        target = self.entry_path(path, params)
+        try:
+            with gzip.open(target, "rb") as f:
+                body = f.read()
+        except FileNotFoundError:
+            label = endpoint_label(path, params)
+            with self.lock:
+                self.missing[label] = self.missing.get(label, 0) + 1
+            return None
+        return json.loads(body.decode("utf-8"))["payload"], len(body)
+
+    def write_manifest(self, recorded_at):
+        self.root.mkdir(parents=True, exist_ok=True)
+        manifest = self.read_manifest()
+        if manifest.get("recorded_at"):
+            return
+        manifest["recorded_at"] = recorded_at
+        with open(self.root / MANIFEST_FILE, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2, ensure_ascii=False)
+
+    def read_manifest(self):
+        try:
+            with open(self.root / MANIFEST_FILE, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception:
+            return {}
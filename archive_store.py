@@ -0,0 +1,390 @@
+import argparse
+import difflib
+import fnmatch
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# ==========================================
+# ARCHIVIO CONTENT-ADDRESSED
+# - blobs/<aa>/<sha256>.gz: ogni contenuto salvato una volta sola, compresso gzip
+#   (mtime=0: stesso file -> stessi byte, git non vede modifiche)
+# - manifests/<run>.json: per ogni run nome file -> sha256, dimensione, byte compressi
+# - un run che trova un file invariato aggiunge solo la riga nel manifest
+# - prune(): manifest più vecchi di keep_days (tenendo almeno keep_min run), poi
+#   via i blob non più referenziati
+# - migrate_legacy(): importa le vecchie cartelle archives/<run>/ copiate per intero
+#
+#   python archive_store.py list
+#   python archive_store.py restore 20260318_021300 --to /tmp/ripristino
+#   python archive_store.py diff 20260317_021300 20260318_021300 --file details_day1.json
+# ==========================================
+BASE_DIR = Path(__file__).resolve().parent
+DEFAULT_ARCHIVE_DIR = BASE_DIR / "archives"
+BLOBS_DIR = "blobs"
+MANIFESTS_DIR = "manifests"
+MANIFEST_VERSION = 1
+RUN_FORMAT = "%Y%m%d_%H%M%S"
+
+KEEP_DAYS = 180
+KEEP_MIN_RUNS = 7
+MAX_LINE_CHARS = 240
+
+
+def _write_atomic(path, data):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.tmp")
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def sha256_bytes(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def run_datetime(run):
+    try:
+        return datetime.strptime(run, RUN_FORMAT)
+    except ValueError:
+        return None
+
+
+class ArchiveStore:
+    def __init__(self, root=DEFAULT_ARCHIVE_DIR):
+        self.root = Path(root)
+        self.blobs_dir = self.root / BLOBS_DIR
+        self.manifests_dir = self.root / MANIFESTS_DIR
+
+    # -------------------------
+    # BLOB
+    # -------------------------
+    def blob_path(self, sha):
+        return self.blobs_dir / sha[:2] / f"{sha}.gz"
+
+    def put_blob(self, data):
+        """
+        Salva il contenuto se non c'è già. Restituisce (sha256, byte compressi, nuovo).
+        """
+        sha = sha256_bytes(data)
+        path = self.blob_path(sha)
+        if path.exists():
+            return sha, path.stat().st_size, False
+        packed = gzip.compress(data, compresslevel=9, mtime=0)
+        _write_atomic(path, packed)
+        return sha, len(packed), True
+
+    def read_blob(self, sha):
+        with open(self.blob_path(sha), "rb") as f:
+            data = gzip.decompress(f.read())
+        if sha256_bytes(data) != sha:
+            raise ValueError(f"blob {sha[:12]} corrotto")
+        return data
+
+    def blob_shas(self):
+        return {p.name[:-3] for p in self.blobs_dir.glob("*/*.gz")}
+
+    # -------------------------
+    # MANIFEST
+    # -------------------------
+    def manifest_path(self, run):
+        return self.manifests_dir / f"{run}.json"
+
+    def runs(self):
+        return sorted(p.stem for p in self.manifests_dir.glob("*.json"))
+
+    def load_manifest(self, run):
+        path = self.manifest_path(run)
+        if not path.exists():
+            raise FileNotFoundError(f"run {run} non presente in {self.manifests_dir}")
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def resolve_run(self, run):
+        """
+        "latest" o un prefisso univoco (es. 20260318) -> nome completo del run.
+        """
+        runs = self.runs()
+        if run == "latest":
+            if not runs:
+                raise FileNotFoundError("nessun run archiviato")
+            return runs[-1]
+        if run in runs:
+            return run
+        matches = [r for r in runs if r.startswith(run)]
+        if len(matches) != 1:
+            raise FileNotFoundError(f"run {run}: {len(matches)} corrispondenze")
+        return matches[0]
+
+    def archive(self, files, run=None):
+        """
+        files: {nome: percorso}; i file mancanti si saltano.
+        Scrive il manifest del run e restituisce le statistiche dell'archiviazione.
+        """
+        run = run or datetime.now().strftime(RUN_FORMAT)
+        entries = {}
+        stats = {"run": run, "files": 0, "new_blobs": 0, "bytes": 0, "stored_bytes": 0}
+        for name, path in files.items():
+            path = Path(path)
+            if not path.exists():
+                continue
+            data = path.read_bytes()
+            sha, stored, new = self.put_blob(data)
+            entries[name] = {"sha256": sha, "size": len(data), "stored": stored}
+            stats["files"] += 1
+            stats["bytes"] += len(data)
+            if new:
+                stats["new_blobs"] += 1
+                stats["stored_bytes"] += stored
+
+        manifest = {
+            "version": MANIFEST_VERSION,
+            "run": run,
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "files": entries,
+        }
+        _write_atomic(self.manifest_path(run), json.dumps(manifest, ensure_ascii=False, indent=2).encode("utf-8"))
+        return stats
+
+    def restore(self, run, target_dir, names=None):
+        """
+        Riscrive in target_dir i file del run (tutti o solo `names`). Restituisce i nomi scritti.
+        """
+        files = self.load_manifest(run)["files"]
+        target_dir = Path(target_dir)
+        written = []
+        for name, entry in files.items():
+            if names and name not in names:
+                continue
+            _write_atomic(target_dir / name, self.read_blob(entry["sha256"]))
+            written.append(name)
+        return written
+
+    def iter_files(self, pattern="*"):
+        """
+        (run, nome, percorso blob) per i file dei manifest che corrispondono al pattern.
+        """
+        for run in self.runs():
+            for name, entry in self.load_manifest(run)["files"].items():
+                if fnmatch.fnmatch(name, pattern):
+                    yield run, name, self.blob_path(entry["sha256"])
+
+    # -------------------------
+    # RETENTION
+    # -------------------------
+    def prune(self, keep_days=KEEP_DAYS, keep_min=KEEP_MIN_RUNS, now=None):
+        """
+        Elimina i manifest più vecchi di keep_days (gli ultimi keep_min restano sempre)
+        e i blob che nessun manifest rimasto usa. Restituisce (run eliminati, blob eliminati).
+        """
+        cutoff = (now or datetime.now()) - timedelta(days=keep_days)
+        runs = self.runs()
+        removable = runs[:-keep_min] if keep_min > 0 else runs
+        removed_runs = []
+        for run in removable:
+            started = run_datetime(run)
+            if started is not None and started < cutoff:
+                self.manifest_path(run).unlink()
+                removed_runs.append(run)
+
+        used = set()
+        for run in self.runs():
+            used.update(entry["sha256"] for entry in self.load_manifest(run)["files"].values())
+        removed_blobs = 0
+        for sha in self.blob_shas() - used:
+            self.blob_path(sha).unlink()
+            removed_blobs += 1
+        for folder in self.blobs_dir.glob("*"):
+            if folder.is_dir() and not any(folder.iterdir()):
+                folder.rmdir()
+        return removed_runs, removed_blobs
+
+    def migrate_legacy(self):
+        """
+        Vecchie cartelle archives/<run>/ con le copie dei file: diventano manifest + blob.
+        Restituisce i run importati.
+        """
+        migrated = []
+        if not self.root.exists():
+            return migrated
+        for folder in sorted(p for p in self.root.iterdir() if p.is_dir()):
+            if folder.name in (BLOBS_DIR, MANIFESTS_DIR) or run_datetime(folder.name) is None:
+                continue
+            files = {p.name: p for p in sorted(folder.iterdir()) if p.is_file()}
+            self.archive(files, run=folder.name)
+            shutil.rmtree(folder, ignore_errors=True)
+            migrated.append(folder.name)
+        return migrated
+
+    def stats(self):
+        runs = self.runs()
+        blobs = list(self.blobs_dir.glob("*/*.gz"))
+        logical = 0
+        for run in runs:
+            logical += sum(entry["size"] for entry in self.load_manifest(run)["files"].values())
+        return {
+            "runs": len(runs),
+            "blobs": len(blobs),
+            "stored_bytes": sum(p.stat().st_size for p in blobs),
+            "logical_bytes": logical,
+        }
+
+
+def read_json_file(path):
+    """
+    JSON da file normale o da blob compresso (.gz).
+    """
+    path = Path(path)
+    if path.suffix == ".gz":
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            return json.load(f)
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+# -------------------------
+# DIFF
+# -------------------------
+def _keyed(payload):
+    """
+    Vista per chiave di un payload: details -> fixture, liste di righe -> Fixture_ID.
+    """
+    if isinstance(payload, dict) and isinstance(payload.get("details"), dict):
+        return payload["details"]
+    if isinstance(payload, dict):
+        return payload
+    if isinstance(payload, list) and all(isinstance(r, dict) and "Fixture_ID" in r for r in payload):
+        return {str(r["Fixture_ID"]): r for r in payload}
+    return None
+
+
+def json_change_summary(old_bytes, new_bytes):
+    """
+    "+a -b ~c" sulle chiavi (fixture) dei due JSON, None se non confrontabili.
+    """
+    try:
+        old = _keyed(json.loads(old_bytes))
+        new = _keyed(json.loads(new_bytes))
+    except Exception:
+        return None
+    if old is None or new is None:
+        return None
+    added = len(new.keys() - old.keys())
+    removed = len(old.keys() - new.keys())
+    changed = sum(1 for key in old.keys() & new.keys() if old[key] != new[key])
+    return f"+{added} -{removed} ~{changed}"
+
+
+def diff_runs(store, run_a, run_b):
+    """
+    Una riga per file: (nome, stato, dimensione A, dimensione B, riepilogo chiavi).
+    """
+    files_a = store.load_manifest(run_a)["files"]
+    files_b = store.load_manifest(run_b)["files"]
+    rows = []
+    for name in sorted(files_a.keys() | files_b.keys()):
+        a, b = files_a.get(name), files_b.get(name)
+        if a is None:
+            rows.append((name, "aggiunto", None, b["size"], ""))
+        elif b is None:
+            rows.append((name, "rimosso", a["size"], None, ""))
+        elif a["sha256"] == b["sha256"]:
+            rows.append((name, "uguale", a["size"], b["size"], ""))
+        else:
+            summary = json_change_summary(store.read_blob(a["sha256"]), store.read_blob(b["sha256"]))
+            rows.append((name, "modificato", a["size"], b["size"], summary or ""))
+    return rows
+
+
+def file_diff(store, run_a, run_b, name, context=3):
+    """
+    Diff unificato di un file tra due run.
+    """
+    texts = []
+    for run in (run_a, run_b):
+        entry = store.load_manifest(run)["files"].get(name)
+        texts.append(store.read_blob(entry["sha256"]).decode("utf-8", errors="replace").splitlines() if entry else [])
+    return difflib.unified_diff(texts[0], texts[1], f"{run_a}/{name}", f"{run_b}/{name}", n=context, lineterm="")
+
+
+def _fmt_size(n):
+    return "-" if n is None else f"{n / 1024:.1f} KB"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Archivio content-addressed dei file live")
+    parser.add_argument("--archives", default=str(DEFAULT_ARCHIVE_DIR))
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    sub.add_parser("list", help="run archiviati e spazio occupato")
+
+    p_restore = sub.add_parser("restore", help="ripristina i file di un run")
+    p_restore.add_argument("run", help="nome run, prefisso univoco o latest")
+    p_restore.add_argument("--to", default=".", help="cartella di destinazione")
+    p_restore.add_argument("--file", action="append", help="solo questi file (ripetibile)")
+
+    p_diff = sub.add_parser("diff", help="confronta due run")
+    p_diff.add_argument("run_a")
+    p_diff.add_argument("run_b", nargs="?", default="latest")
+    p_diff.add_argument("--file", help="diff unificato di un file")
+    p_diff.add_argument("--lines", type=int, default=200, help="righe massime del diff unificato")
+
+    p_prune = sub.add_parser("prune", help="retention: elimina run vecchi e blob orfani")
+    p_prune.add_argument("--keep-days", type=int, default=KEEP_DAYS)
+    p_prune.add_argument("--keep-min", type=int, default=KEEP_MIN_RUNS)
+
+    sub.add_parser("migrate", help="importa le vecchie cartelle archives/<run>/")
+    args = parser.parse_args()
+
+    store = ArchiveStore(args.archives)
+    try:
+        if args.command == "list":
+            for run in store.runs():
+                files = store.load_manifest(run)["files"]
+                print(f"   {run}  {len(files):>3} file  {_fmt_size(sum(e['size'] for e in files.values())):>10}", flush=True)
+            s = store.stats()
+            ratio = s["logical_bytes"] / s["stored_bytes"] if s["stored_bytes"] else 0.0
+            print(
+                f"📦 {s['runs']} run, {s['blobs']} blob: {_fmt_size(s['stored_bytes'])} su disco "
+                f"per {_fmt_size(s['logical_bytes'])} archiviati ({ratio:.1f}x)",
+                flush=True
+            )
+
+        elif args.command == "restore":
+            run = store.resolve_run(args.run)
+            written = store.restore(run, args.to, args.file)
+            print(f"♻️ Run {run}: {len(written)} file ripristinati in {Path(args.to).resolve()}", flush=True)
+
+        elif args.command == "diff":
+            run_a, run_b = store.resolve_run(args.run_a), store.resolve_run(args.run_b)
+            if args.file:
+                lines = list(file_diff(store, run_a, run_b, args.file))
+                for line in lines[:args.lines]:
+                    print(line if len(line) <= MAX_LINE_CHARS else f"{line[:MAX_LINE_CHARS]}…", flush=True)
+                if len(lines) > args.lines:
+                    print(f"... altre {len(lines) - args.lines} righe", flush=True)
+            else:
+                print(f"🔍 {run_a} → {run_b}", flush=True)
+                for name, state, size_a, size_b, summary in diff_runs(store, run_a, run_b):
+                    print(f"   {name:<22}{state:<12}{_fmt_size(size_a):>10}{_fmt_size(size_b):>10}  {summary}", flush=True)
+
+        elif args.command == "prune":
+            removed_runs, removed_blobs = store.prune(args.keep_days, args.keep_min)
+            print(f"🗑️ Run eliminati: {len(removed_runs)} | blob eliminati: {removed_blobs}", flush=True)
+
+        elif args.command == "migrate":
+            migrated = store.migrate_legacy()
+            print(f"📦 Cartelle importate: {len(migrated)}", flush=True)
+    except (FileNotFoundError, ValueError) as e:
+        print(f"❌ {e}", flush=True)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
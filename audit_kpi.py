@@ -0,0 +1,184 @@
+import numpy as np
+import pandas as pd
+
+from scan_store import TAG_PATTERNS
+
+# ==========================================
+# KPI AUDIT (pandas vettoriale)
+# - risultati uniti al CSV con un join per Fixture_ID
+# - hit per mercato come espressioni di colonna (booleani nullable: NA = risultato mancante)
+# - hit-rate / ROI stake 1 per gruppo in un solo groupby, per qualsiasi tag e mercato
+#   (una partita con più tag conta in ogni tag)
+# ==========================================
+RESULT_COLUMNS = ("status_short", "HT_H", "HT_A", "FT_H", "FT_A")
+
+# mercato: (colonna hit, colonna quota)
+MARKETS = {
+    "O0.5HT": ("HIT_O0.5HT", "O0.5HT"),
+    "O2.5": ("HIT_O2.5", "O2.5_num"),
+    "GGHT": ("HIT_GGHT", "GGHT_num"),
+}
+
+GOLD_BUCKETS = ["PREMIUM 1.25–1.35", "OTTIMO 1.25–1.40", "<1.25 (bassa)", "1.40–1.45 (rischio)", ">1.45 (alta)", "missing"]
+
+
+def to_numeric(series):
+    """
+    Come to_float su tutta la colonna: virgola decimale, vuoti e "nan"/"none" -> NaN.
+    """
+    if pd.api.types.is_numeric_dtype(series):
+        return series.astype(float)
+    text = series.astype("string").str.strip().str.replace(",", ".", regex=False)
+    return pd.to_numeric(text, errors="coerce").astype(float)
+
+
+def split_1x2(series):
+    """
+    "2.1|3.2|3.4" -> colonne Q1, QX, Q2 (NaN se il formato non torna).
+    """
+    parts = series.astype("string").str.split("|", expand=True)
+    out = pd.DataFrame(index=series.index, columns=["Q1", "QX", "Q2"], dtype=float)
+    if parts.shape[1] == 3:
+        valid = parts.notna().all(axis=1)
+        for i, col in enumerate(out.columns):
+            out[col] = to_numeric(parts[i]).where(valid)
+    return out
+
+
+def gold_bucket(o05):
+    """
+    Fascia della quota O0.5HT (stesse soglie di gold_bucket_o05ht, su tutta la colonna).
+    """
+    conditions = [
+        o05.isna() | (o05 <= 0),
+        (o05 >= 1.25) & (o05 <= 1.35),
+        (o05 >= 1.25) & (o05 <= 1.40),
+        o05 < 1.25,
+        o05 <= 1.45,
+    ]
+    choices = ["missing", "PREMIUM 1.25–1.35", "OTTIMO 1.25–1.40", "<1.25 (bassa)", "1.40–1.45 (rischio)"]
+    return pd.Series(np.select(conditions, choices, default=">1.45 (alta)"), index=o05.index)
+
+
+def merge_results(df, results, key="Fixture_ID"):
+    """
+    Join per fixture: le colonne risultato delle righe trovate in `results`
+    ({fixture_id: risultato}) vengono sovrascritte, le altre restano quelle del CSV.
+    """
+    df = df.copy()
+    for col in RESULT_COLUMNS:
+        if col not in df.columns:
+            df[col] = None
+
+    if not results:
+        return df
+
+    # dtype object: i gol restano int (o None) come nel CSV, senza passare da float
+    res = pd.DataFrame(
+        [[r.get(col) for col in RESULT_COLUMNS] for r in results.values()],
+        index=pd.Index([int(fid) for fid in results], dtype="int64"),
+        columns=list(RESULT_COLUMNS),
+        dtype=object
+    )
+    joined = pd.DataFrame({"_fid": pd.to_numeric(df[key], errors="coerce").astype("Int64")}, index=df.index)
+    joined = joined.join(res, on="_fid")
+    found = joined["_fid"].isin(res.index)
+
+    for col in RESULT_COLUMNS:
+        df[col] = joined[col].where(found, df[col]).astype(object)
+    return df
+
+
+def add_hit_columns(df):
+    """
+    HIT_O0.5HT / HIT_GGHT con il risultato HT, HIT_O2.5 con quello FT; NA se manca.
+    """
+    ht_h, ht_a = to_numeric(df["HT_H"]), to_numeric(df["HT_A"])
+    ft_h, ft_a = to_numeric(df["FT_H"]), to_numeric(df["FT_A"])
+    has_ht = ht_h.notna() & ht_a.notna()
+    has_ft = ft_h.notna() & ft_a.notna()
+
+    df["HIT_O0.5HT"] = ((ht_h + ht_a) >= 1).astype("boolean").where(has_ht, pd.NA)
+    df["HIT_O2.5"] = ((ft_h + ft_a) >= 3).astype("boolean").where(has_ft, pd.NA)
+    df["HIT_GGHT"] = ((ht_h >= 1) & (ht_a >= 1)).astype("boolean").where(has_ht, pd.NA)
+    return df
+
+
+def tag_flags(info, tags=TAG_PATTERNS):
+    """
+    Una colonna booleana per tag, dal testo Info.
+    """
+    text = info.fillna("").astype(str)
+    return pd.DataFrame({tag: text.str.contains(pattern, regex=False) for tag, pattern in tags.items()}, index=info.index)
+
+
+def _market_frame(df, markets):
+    work = {}
+    for name, (hit_col, odd_col) in markets.items():
+        hit = df[hit_col].astype("boolean") if hit_col in df.columns else pd.Series(pd.NA, index=df.index, dtype="boolean")
+        odd = to_numeric(df[odd_col]) if odd_col in df.columns else pd.Series(np.nan, index=df.index)
+        has = hit.notna()
+        won = hit.fillna(False).astype(bool)
+        bet = has & (odd > 1.0)
+        work[f"{name}|n"] = has.astype(int)
+        work[f"{name}|hit"] = won.astype(int)
+        work[f"{name}|bets"] = bet.astype(int)
+        work[f"{name}|profit"] = np.where(bet, np.where(won, odd - 1.0, -1.0), 0.0)
+        work[f"{name}|odd"] = odd
+    return pd.DataFrame(work, index=df.index)
+
+
+def kpi_table(df, by=None, markets=MARKETS):
+    """
+    Una riga per (gruppo, mercato): partite, con risultato, hit %, scommesse
+    (quota > 1 e risultato noto), profitto e ROI % a stake 1, quota media.
+    by: colonna (o lista) di raggruppamento; None = un solo gruppo "Totale".
+    """
+    work = _market_frame(df, markets)
+    keys = [by] if isinstance(by, str) else list(by or [])
+    if keys:
+        for key in keys:
+            work[key] = df[key].values
+    else:
+        keys = ["Gruppo"]
+        work["Gruppo"] = "Totale"
+
+    agg = {col: ("mean" if col.endswith("|odd") else "sum") for col in work.columns if "|" in col}
+    grouped = work.groupby(keys, sort=False, dropna=False)
+    totals = grouped.agg(agg)
+    sizes = grouped.size()
+
+    frames = []
+    for name in markets:
+        n = totals[f"{name}|n"]
+        bets = totals[f"{name}|bets"]
+        profit = totals[f"{name}|profit"]
+        frames.append(pd.DataFrame({
+            "Mercato": name,
+            "Partite": sizes,
+            "Con risultato": n,
+            "Hit %": (100.0 * totals[f"{name}|hit"] / n.where(n > 0)).round(2),
+            "Scommesse": bets,
+            "Profitto": profit.where(bets > 0).round(2),
+            "ROI %": (100.0 * profit / bets.where(bets > 0)).round(2),
+            "Quota media": totals[f"{name}|odd"].round(3),
+        }))
+    return pd.concat(frames).reset_index()
+
+
+def tag_kpi_table(df, tags=TAG_PATTERNS, markets=MARKETS, info_col="Info"):
+    """
+    kpi_table per tag: le righe con più tag vengono replicate, una per tag.
+    """
+    if info_col not in df.columns:
+        return kpi_table(df.iloc[0:0], by=None, markets=markets)
+    df = df.reset_index(drop=True)
+    flags = tag_flags(df[info_col], tags)
+    pairs = flags.stack()
+    pairs = pairs[pairs]
+    rows = pairs.index.get_level_values(0)
+    expanded = df.loc[rows].copy()
+    expanded["Tag"] = pd.Categorical(pairs.index.get_level_values(1), categories=list(tags))
+    expanded = expanded.sort_values("Tag", kind="stable")
+    expanded["Tag"] = expanded["Tag"].astype(str)
+    return kpi_table(expanded.reset_index(drop=True), by="Tag", markets=markets)
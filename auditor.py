@@ -1,9 +1,14 @@
 import streamlit as st
 import pandas as pd
-import requests
-import time
 from pathlib import Path
 
+from api_client import ApiClient, DEFAULT_SCAN_WORKERS
+from audit_kpi import (
+    GOLD_BUCKETS, MARKETS, TAG_PATTERNS, add_hit_columns, gold_bucket, kpi_table, merge_results, split_1x2,
+    tag_flags, tag_kpi_table, to_numeric
+)
+from results_store import FINAL_STATUSES, ResultsStore, fetch_results, store_path_from_env
+
 st.set_page_config(page_title="Arab Audit CSV + Risultati API", layout="wide")
 st.title("📊 Arab Auditor — CSV scan + risultati via API")
 
@@ -15,131 +20,18 @@ if not API_KEY:
     st.error("Manca API_SPORTS_KEY in st.secrets.")
     st.stop()
 
-HEADERS = {"x-apisports-key": API_KEY}
-BASE_URL = "https://v3.football.api-sports.io"
+# client condiviso con scanner e diagnosi: rate limit, backoff su 429/5xx, quota giornaliera
+API_CLIENT = ApiClient(API_KEY)
+
+# risultati definitivi (FT/AET/PEN) salvati in locale: un nuovo audit chiede all'API solo il resto
+RESULTS_STORE_PATH = store_path_from_env()
 
 # =========================
 # Helpers
 # =========================
-def to_float(x):
-    try:
-        if x is None or pd.isna(x):
-            return None
-        s = str(x).strip().replace(",", ".")
-        if s == "" or s.lower() in {"nan", "none"}:
-            return None
-        return float(s)
-    except Exception:
-        return None
-
-def to_int(x):
-    try:
-        if x is None or pd.isna(x):
-            return None
-        return int(x)
-    except Exception:
-        return None
-
-def parse_1x2(s):
-    # "2.1|3.2|3.4"
-    try:
-        if s is None or pd.isna(s):
-            return None, None, None
-        parts = str(s).split("|")
-        if len(parts) != 3:
-            return None, None, None
-        return to_float(parts[0]), to_float(parts[1]), to_float(parts[2])
-    except Exception:
-        return None, None, None
-
-def is_gold(info):
-    return isinstance(info, str) and ("⚽⭐" in info)
-
-def gold_bucket_o05ht(o05):
-    if o05 is None or o05 <= 0:
-        return "missing"
-    if 1.25 <= o05 <= 1.35:
-        return "PREMIUM 1.25–1.35"
-    if 1.25 <= o05 <= 1.40:
-        return "OTTIMO 1.25–1.40"
-    if o05 < 1.25:
-        return "<1.25 (bassa)"
-    if o05 <= 1.45:
-        return "1.40–1.45 (rischio)"
-    return ">1.45 (alta)"
-
-def compute_hits(ht_h, ht_a, ft_h, ft_a):
-    hit_o05ht = None
-    hit_gght  = None
-    hit_o25   = None
-    if ht_h is not None and ht_a is not None:
-        hit_o05ht = (ht_h + ht_a) >= 1
-        hit_gght  = (ht_h >= 1 and ht_a >= 1)
-    if ft_h is not None and ft_a is not None:
-        hit_o25 = (ft_h + ft_a) >= 3
-    return hit_o05ht, hit_o25, hit_gght
-
-def roi_stake1(odds_series, hit_series):
-    sub = pd.DataFrame({"odd": odds_series, "hit": hit_series}).dropna()
-    sub = sub[(sub["odd"] > 1.0)]
-    if sub.empty:
-        return None, None, 0
-    profit = ((sub.loc[sub["hit"] == True, "odd"] - 1).sum() - (sub["hit"] == False).sum())
-    roi = profit / len(sub)
-    return float(roi), float(profit), int(len(sub))
-
-def api_get(session, path, params, retries=3):
-    url = f"{BASE_URL}/{path}"
-    for attempt in range(retries):
-        try:
-            r = session.get(url, headers=HEADERS, params=params, timeout=25)
-            if r.status_code == 200:
-                return r.json()
-            # rate limit / transient
-            if r.status_code in (429, 500, 502, 503, 504):
-                time.sleep(1.2 + attempt * 0.8)
-                continue
-            return None
-        except Exception:
-            time.sleep(1.0 + attempt * 0.6)
-    return None
-
-def fetch_fixture_result(session, fixture_id: int):
-    """
-    Ritorna dict con:
-      status_short, ht_home, ht_away, ft_home, ft_away
-    """
-    js = api_get(session, "fixtures", {"id": fixture_id, "timezone": "Europe/Rome"})
-    if not js or not js.get("response"):
-        return None
-
-    f = js["response"][0]
-    status = (f.get("fixture", {}) or {}).get("status", {}) or {}
-    short = status.get("short")
-
-    score = f.get("score", {}) or {}
-    ht = score.get("halftime", {}) or {}
-    ft = score.get("fulltime", {}) or {}
-    goals = f.get("goals", {}) or {}
-
-    ht_h = to_int(ht.get("home"))
-    ht_a = to_int(ht.get("away"))
-
-    ft_h = to_int(ft.get("home"))
-    ft_a = to_int(ft.get("away"))
-    # fallback
-    if ft_h is None:
-        ft_h = to_int(goals.get("home"))
-    if ft_a is None:
-        ft_a = to_int(goals.get("away"))
-
-    return {
-        "status_short": short,
-        "HT_H": ht_h,
-        "HT_A": ht_a,
-        "FT_H": ft_h,
-        "FT_A": ft_a,
-    }
+def api_get(session, path, params):
+    return API_CLIENT.get(session, path, params)
+
 
 # =========================
 # Input CSV
@@ -162,30 +54,27 @@ if "Fixture_ID" not in df.columns:
 
 # Normalizza odds dal tuo export
 if "O0.5H" in df.columns:
-    df["O0.5HT"] = df["O0.5H"].apply(to_float)
+    df["O0.5HT"] = to_numeric(df["O0.5H"])
 elif "O0.5HT" in df.columns:
-    df["O0.5HT"] = df["O0.5HT"].apply(to_float)
+    df["O0.5HT"] = to_numeric(df["O0.5HT"])
 else:
-    df["O0.5HT"] = None
+    df["O0.5HT"] = float("nan")
 
-df["O2.5_num"] = df["O2.5"].apply(to_float) if "O2.5" in df.columns else None
-df["GGHT_num"] = df["GGH"].apply(to_float) if "GGH" in df.columns else (df["GGHT"].apply(to_float) if "GGHT" in df.columns else None)
+df["O2.5_num"] = to_numeric(df["O2.5"]) if "O2.5" in df.columns else float("nan")
+df["GGHT_num"] = to_numeric(df["GGH"]) if "GGH" in df.columns else (to_numeric(df["GGHT"]) if "GGHT" in df.columns else float("nan"))
 
 if "1X2" in df.columns:
-    q = df["1X2"].apply(parse_1x2)
-    df["Q1"] = [x[0] for x in q]
-    df["QX"] = [x[1] for x in q]
-    df["Q2"] = [x[2] for x in q]
+    df[["Q1", "QX", "Q2"]] = split_1x2(df["1X2"])
 
-df["IsGold"] = df["Info"].apply(is_gold) if "Info" in df.columns else False
-df["Gold_O05_bucket"] = df["O0.5HT"].apply(gold_bucket_o05ht)
+df["IsGold"] = tag_flags(df["Info"], {"GOLD": TAG_PATTERNS["GOLD"]})["GOLD"] if "Info" in df.columns else False
+df["Gold_O05_bucket"] = gold_bucket(df["O0.5HT"])
 
 # =========================
 # Fetch results
 # =========================
 st.sidebar.header("⚙️ Fetch risultati")
-max_calls = st.sidebar.slider("Max fixture da interrogare (per sicurezza)", 10, 1000, min(300, len(df)), 10)
-sleep_s = st.sidebar.slider("Sleep tra chiamate (sec)", 0.0, 1.5, 0.15, 0.05)
+max_calls = st.sidebar.slider("Max fixture da interrogare via API (per sicurezza)", 10, 5000, min(1000, max(10, len(df))), 10)
+workers = st.sidebar.slider("Blocchi fixtures?ids= in parallelo", 1, 12, DEFAULT_SCAN_WORKERS)
 only_missing = st.sidebar.checkbox("Interroga solo fixture senza risultati già presenti", value=True)
 
 run = st.button("🚀 Avvia Audit (CSV + risultati API)", type="primary")
@@ -204,42 +93,42 @@ if run:
         missing_mask = pd.Series([True]*len(df))
 
     fixture_ids = df.loc[missing_mask, "Fixture_ID"].dropna().astype(int).unique().tolist()
-    fixture_ids = fixture_ids[:max_calls]
 
-    st.write(f"Fixture da interrogare via API: **{len(fixture_ids)}**")
+    st.write(f"Fixture da verificare: **{len(fixture_ids)}**")
 
-    results_map = {}
-    with requests.Session() as session:
+    store = ResultsStore(RESULTS_STORE_PATH) if RESULTS_STORE_PATH else None
+    try:
         pb = st.progress(0.0)
-        for i, fid in enumerate(fixture_ids, start=1):
-            pb.progress(i / len(fixture_ids) if fixture_ids else 1.0)
-            r = fetch_fixture_result(session, int(fid))
-            if r:
-                results_map[int(fid)] = r
-            time.sleep(sleep_s)
-
-    # Merge results into df
-    # crea colonne se non esistono
-    for col in ["status_short","HT_H","HT_A","FT_H","FT_A"]:
-        if col not in df.columns:
-            df[col] = None
-
-    for idx, row in df.iterrows():
-        fid = row.get("Fixture_ID")
-        fid_int = int(fid) if pd.notna(fid) else None
-        if fid_int in results_map:
-            r = results_map[fid_int]
-            df.at[idx, "status_short"] = r["status_short"]
-            df.at[idx, "HT_H"] = r["HT_H"]
-            df.at[idx, "HT_A"] = r["HT_A"]
-            df.at[idx, "FT_H"] = r["FT_H"]
-            df.at[idx, "FT_A"] = r["FT_A"]
-
-    # Compute HIT
-    hits = df.apply(lambda r: compute_hits(to_int(r["HT_H"]), to_int(r["HT_A"]), to_int(r["FT_H"]), to_int(r["FT_A"])), axis=1)
-    df["HIT_O0.5HT"] = [h[0] for h in hits]
-    df["HIT_O2.5"] = [h[1] for h in hits]
-    df["HIT_GGHT"] = [h[2] for h in hits]
+        results_map = fetch_results(
+            api_get,
+            fixture_ids,
+            store=store,
+            workers=workers,
+            max_fetch=max_calls,
+            on_progress=lambda done, total: pb.progress(done / total if total else 1.0)
+        )
+        pb.progress(1.0)
+        store_stats = store.stats() if store is not None else {"hits": 0, "saved": 0}
+    finally:
+        if store is not None:
+            store.close()
+
+    n_final = sum(1 for r in results_map.values() if r.get("status_short") in FINAL_STATUSES)
+    st.caption(
+        f"Risultati: {len(results_map)} trovati ({n_final} definitivi) | {store_stats['hits']} dallo store locale, "
+        f"{store_stats['saved']} nuovi salvati"
+    )
+
+    api_stats = API_CLIENT.stats()
+    quota = API_CLIENT.quota_status()
+    st.caption(
+        f"Chiamate API: {api_stats['calls']} | retry: {api_stats['retries']} "
+        f"({api_stats['backoff_seconds']:.1f}s di backoff) | quota giornaliera rimasta: "
+        f"{quota['daily_remaining'] if quota['daily_remaining'] is not None else 'N/D'}"
+    )
+
+    # Merge results into df (join per Fixture_ID) + hit per mercato
+    df = add_hit_columns(merge_results(df, results_map))
 
     # =========================
     # Dashboard KPI
@@ -247,67 +136,68 @@ if run:
     st.divider()
     st.subheader("📌 KPI Globali (solo match con risultato disponibile)")
 
-    df_ht = df[df["HIT_O0.5HT"].notna()].copy()
-    df_ft = df[df["HIT_O2.5"].notna()].copy()
+    kpi_all = kpi_table(df).set_index("Mercato")
 
     c1, c2, c3, c4 = st.columns(4)
     c1.metric("Match CSV", len(df))
-    c2.metric("Con HT", len(df_ht))
-    c3.metric("Con FT", len(df_ft))
+    c2.metric("Con HT", int(kpi_all.at["O0.5HT", "Con risultato"]))
+    c3.metric("Con FT", int(kpi_all.at["O2.5", "Con risultato"]))
     c4.metric("Gold (⚽⭐)", int(df["IsGold"].sum()))
 
-    def hr(sub, col):
-        s = sub[col].dropna()
-        return None if s.empty else 100.0 * (s == True).mean()
+    def hr(kpi, market):
+        value = kpi.at[market, "Hit %"]
+        return 0.0 if pd.isna(value) else value
 
     st.write(
-        f"**Hit-rate**  O0.5HT: `{(hr(df_ht,'HIT_O0.5HT') or 0):.1f}%`  |  "
-        f"O2.5: `{(hr(df_ft,'HIT_O2.5') or 0):.1f}%`  |  "
-        f"GGHT: `{(hr(df_ht,'HIT_GGHT') or 0):.1f}%`"
+        f"**Hit-rate**  O0.5HT: `{hr(kpi_all, 'O0.5HT'):.1f}%`  |  "
+        f"O2.5: `{hr(kpi_all, 'O2.5'):.1f}%`  |  "
+        f"GGHT: `{hr(kpi_all, 'GGHT'):.1f}%`"
     )
 
-    roi_all, prof_all, n_all = roi_stake1(df_ht["O0.5HT"], df_ht["HIT_O0.5HT"])
-    if roi_all is not None:
-        st.write(f"**ROI O0.5HT (stake 1)** su {n_all} match: `{roi_all*100:.2f}%` (profit `{prof_all:.2f}`)")
+    if kpi_all.at["O0.5HT", "Scommesse"]:
+        st.write(
+            f"**ROI O0.5HT (stake 1)** su {int(kpi_all.at['O0.5HT', 'Scommesse'])} match: "
+            f"`{kpi_all.at['O0.5HT', 'ROI %']:.2f}%` (profit `{kpi_all.at['O0.5HT', 'Profitto']:.2f}`)"
+        )
 
     # =========================
     # Gold KPI
     # =========================
     st.subheader("⭐ KPI Gold (⚽⭐)")
 
-    gold = df[df["IsGold"] == True].copy()
-    gold_ht = gold[gold["HIT_O0.5HT"].notna()].copy()
-    gold_ft = gold[gold["HIT_O2.5"].notna()].copy()
+    gold = df[df["IsGold"] == True]
+    kpi_gold = kpi_table(gold).set_index("Mercato")
 
     g1, g2, g3, g4 = st.columns(4)
     g1.metric("Gold totali", len(gold))
-    g2.metric("Gold con HT", len(gold_ht))
-    g3.metric("Gold con FT", len(gold_ft))
-    roi_g, prof_g, n_g = roi_stake1(gold_ht["O0.5HT"], gold_ht["HIT_O0.5HT"])
-    g4.metric("ROI Gold O0.5HT", f"{(roi_g*100):.2f}%" if roi_g is not None else "n/a")
+    g2.metric("Gold con HT", int(kpi_gold.at["O0.5HT", "Con risultato"]))
+    g3.metric("Gold con FT", int(kpi_gold.at["O2.5", "Con risultato"]))
+    roi_g = kpi_gold.at["O0.5HT", "ROI %"]
+    g4.metric("ROI Gold O0.5HT", f"{roi_g:.2f}%" if pd.notna(roi_g) else "n/a")
 
     st.write(
-        f"**Hit-rate Gold**  O0.5HT: `{(hr(gold_ht,'HIT_O0.5HT') or 0):.1f}%`  |  "
-        f"O2.5: `{(hr(gold_ft,'HIT_O2.5') or 0):.1f}%`  |  "
-        f"GGHT: `{(hr(gold_ht,'HIT_GGHT') or 0):.1f}%`"
+        f"**Hit-rate Gold**  O0.5HT: `{hr(kpi_gold, 'O0.5HT'):.1f}%`  |  "
+        f"O2.5: `{hr(kpi_gold, 'O2.5'):.1f}%`  |  "
+        f"GGHT: `{hr(kpi_gold, 'GGHT'):.1f}%`"
     )
 
     st.subheader("🏷️ Gold per bucket O0.5HT (Premium/Ottimo ecc.)")
-    rows = []
-    for bucket in ["PREMIUM 1.25–1.35", "OTTIMO 1.25–1.40", "<1.25 (bassa)", "1.40–1.45 (rischio)", ">1.45 (alta)", "missing"]:
-        sub = gold[gold["Gold_O05_bucket"] == bucket].copy()
-        sub_ht = sub[sub["HIT_O0.5HT"].notna()].copy()
-        if sub.empty:
-            continue
-        roi_b, prof_b, n_b = roi_stake1(sub_ht["O0.5HT"], sub_ht["HIT_O0.5HT"]) if not sub_ht.empty else (None, None, 0)
-        rows.append({
-            "Bucket": bucket,
-            "N": len(sub),
-            "Hit O0.5HT %": round((hr(sub_ht,"HIT_O0.5HT") or 0), 2),
-            "Avg O0.5HT": round(sub["O0.5HT"].dropna().mean() or 0, 3),
-            "ROI O0.5HT %": round((roi_b or 0) * 100, 2) if roi_b is not None else None,
-        })
-    st.dataframe(pd.DataFrame(rows), use_container_width=True)
+    buckets = kpi_table(gold, by="Gold_O05_bucket", markets={"O0.5HT": MARKETS["O0.5HT"]}).set_index("Gold_O05_bucket")
+    buckets = buckets.reindex([b for b in GOLD_BUCKETS if b in buckets.index])
+    st.dataframe(
+        pd.DataFrame({
+            "Bucket": buckets.index,
+            "N": buckets["Partite"].values,
+            "Hit O0.5HT %": buckets["Hit %"].fillna(0).values,
+            "Avg O0.5HT": buckets["Quota media"].fillna(0).values,
+            "ROI O0.5HT %": buckets["ROI %"].values,
+        }),
+        use_container_width=True
+    )
+
+    st.subheader("📊 KPI per tag e mercato")
+    st.caption("Una partita con più tag conta in ognuno. ROI a stake 1 sulle quote del CSV (solo quota > 1 e risultato noto).")
+    st.dataframe(tag_kpi_table(df), use_container_width=True, hide_index=True)
 
     st.subheader("🔎 Tabella dettagli (con risultati)")
     show_cols = [c for c in [
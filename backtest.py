@@ -0,0 +1,319 @@
+import argparse
+import glob
+import json
+import os
+import sys
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from api_client import ApiClient
+from archive_store import ArchiveStore, read_json_file
+from results_store import ResultsStore, fetch_results, store_path_from_env
+from run_metrics import RunMetrics, print_summary
+from scoring import DEFAULT_THRESHOLDS, batch_gates, batch_scores, rows_from_details, to_columns
+
+# ==========================================
+# BACKTEST SOGLIE
+# - details_dayN.json archiviati (blob dei manifest in archives/) e live letti una volta sola:
+#   una riga per fixture (vince lo snapshot con updated_at più recente), array colonnari
+# - risultati dal results store (results_store.py); --fetch scarica via API quelli mancanti
+# - punteggi calcolati una volta (batch_scores); le soglie di tutte le config vanno
+#   in array (C, 1) e batch_gates() restituisce le maschere (C, N) in un solo passaggio
+# - per config, tag e mercato: segnali, con risultato, hit %, ROI a stake 1 sulla quota salvata
+# I details contengono solo i fixture tenuti dallo scan di allora: soglie più larghe
+# di quelle di produzione non recuperano le partite scartate.
+#
+#   python backtest.py
+#   python backtest.py --config soglie.json --fetch --csv backtest.csv
+#   python backtest.py --set boost_min=6.0 --set gold_min=7.0 --from 2026-03-01
+# ==========================================
+BASE_DIR = Path(__file__).resolve().parent
+DEFAULT_ARCHIVES_DIR = BASE_DIR / "archives"
+
+# mercato: (colonna quota, gol minimi, tempo)
+MARKETS = {
+    "O0.5HT": ("o05ht", 1, "ht"),
+    "O1.5HT": ("o15ht", 2, "ht"),
+    "O2.5": ("o25", 3, "ft"),
+}
+TAGS = ["GOLD", "BOOST", "OVER", "PT", "PROBE_O", "PROBE_G", "KEEP"]
+
+
+def snapshot_paths(archives_dir, include_live=True):
+    """
+    Blob dei details nei manifest dell'archivio (ogni contenuto una volta sola),
+    eventuali cartelle run del vecchio formato e i details live.
+    """
+    blobs = ArchiveStore(archives_dir).iter_files("details_day*.json")
+    paths = list(dict.fromkeys(str(path) for _, _, path in blobs))
+    paths += sorted(glob.glob(str(Path(archives_dir) / "[0-9]*" / "details_day*.json")))
+    if include_live:
+        paths += sorted(glob.glob(str(BASE_DIR / "details_day*.json")))
+    return paths
+
+
+def load_dataset(paths, date_from=None, date_to=None):
+    """
+    Un fixture per riga, dallo snapshot più recente tra tutti i file.
+    Restituisce (fixture_ids, dates, columns, info) con columns nel formato di to_columns().
+    """
+    latest = {}
+    files = 0
+    seen = 0
+    for path in paths:
+        try:
+            payload = read_json_file(path)
+        except Exception as e:
+            print(f"⚠️ {path}: {e}", flush=True)
+            continue
+        files += 1
+        details = payload.get("details", {}) or {}
+        updated_at = str(payload.get("updated_at") or "")
+        for row in rows_from_details(details):
+            seen += 1
+            fid = row["fixture_id"]
+            day = str(details[fid].get("date") or payload.get("date") or "")
+            if (date_from and day < date_from) or (date_to and day > date_to):
+                continue
+            prev = latest.get(fid)
+            if prev is None or updated_at >= prev[0]:
+                latest[fid] = (updated_at, day, row)
+
+    fids = sorted(latest, key=lambda fid: (latest[fid][1], fid))
+    rows = [latest[fid][2] for fid in fids]
+    info = {"files": files, "snapshots": seen, "fixtures": len(fids)}
+    return np.array([int(fid) for fid in fids], dtype=np.int64), [latest[fid][1] for fid in fids], to_columns(rows), info
+
+
+def load_results(fixture_ids, dates, store=None, client=None):
+    """
+    Gol HT/FT per fixture come array float (NaN = risultato non disponibile).
+    Con un client API, i fixture dei giorni passati assenti dallo store si chiedono all'API.
+    """
+    ids = [int(fid) for fid in fixture_ids]
+    results = store.get_many(ids) if store is not None else {}
+
+    if client is not None:
+        today = datetime.now().strftime("%Y-%m-%d")
+        pending = [fid for fid, day in zip(ids, dates) if fid not in results and day < today]
+        if pending:
+            print(f"🌐 Risultati da scaricare: {len(pending)} fixture", flush=True)
+            results.update(fetch_results(client.get, pending, store=store))
+
+    goals = {key: np.full(len(ids), np.nan) for key in ("HT_H", "HT_A", "FT_H", "FT_A")}
+    for i, fid in enumerate(ids):
+        r = results.get(fid)
+        if not r or r.get("status_short") not in ("FT", "AET", "PEN"):
+            continue
+        for key in goals:
+            if r.get(key) is not None:
+                goals[key][i] = r[key]
+    return goals
+
+
+def market_vectors(columns, goals):
+    """
+    Per mercato: risultato noto, hit, scommessa (quota > 1 e risultato noto), profitto stake 1.
+    """
+    ht = goals["HT_H"] + goals["HT_A"]
+    ft = goals["FT_H"] + goals["FT_A"]
+    vectors = {}
+    for name, (odd_col, min_goals, period) in MARKETS.items():
+        total = ht if period == "ht" else ft
+        odd = columns[odd_col]
+        has = ~np.isnan(total)
+        hit = has & (np.nan_to_num(total, nan=-1.0) >= min_goals)
+        bet = has & (odd > 1.0)
+        vectors[name] = {
+            "has": has.astype(np.float64),
+            "hit": hit.astype(np.float64),
+            "bet": bet.astype(np.float64),
+            "profit": np.where(bet, np.where(hit, odd - 1.0, -1.0), 0.0),
+        }
+    return vectors
+
+
+def threshold_arrays(configs):
+    """
+    {soglia: array (C, 1)} dalle config (override di DEFAULT_THRESHOLDS).
+    """
+    return {
+        key: np.array([[float(cfg.get(key, default))] for cfg in configs.values()])
+        for key, default in DEFAULT_THRESHOLDS.items()
+    }
+
+
+def tag_masks(scores, gates):
+    return {
+        "GOLD": gates["tag_gold"],
+        "BOOST": gates["tag_boost"],
+        "OVER": gates["tag_over"],
+        "PT": gates["tag_pt"],
+        "PROBE_O": scores["probe_o"] & gates["keep"],
+        "PROBE_G": scores["probe_g"] & gates["keep"],
+        "KEEP": gates["keep"],
+    }
+
+
+def evaluate_arrays(scores, configs, vectors):
+    """
+    Tutte le config in un passaggio: maschere (C, N) per tag, somme per mercato
+    come prodotto matrice-vettore. {tag: {"signals": (C,), mercato: {n, hits, bets, profit}}}.
+    """
+    gates = batch_gates(scores, threshold_arrays(configs))
+    n_configs = len(configs)
+    out = {}
+    for tag, mask in tag_masks(scores, gates).items():
+        mask = np.broadcast_to(mask, (n_configs, mask.shape[-1])).astype(np.float64)
+        out[tag] = {"signals": mask.sum(axis=1)}
+        for market, vec in vectors.items():
+            out[tag][market] = {
+                "n": mask @ vec["has"],
+                "hits": mask @ vec["hit"],
+                "bets": mask @ vec["bet"],
+                "profit": mask @ vec["profit"],
+            }
+    return out
+
+
+def evaluate(scores, configs, vectors):
+    """
+    Una riga per (config, tag, mercato).
+    """
+    names = list(configs)
+    rows = []
+    for tag, sums in evaluate_arrays(scores, configs, vectors).items():
+        for market in vectors:
+            n, hits, bets, profit = (sums[market][k] for k in ("n", "hits", "bets", "profit"))
+            for c, name in enumerate(names):
+                rows.append({
+                    "config": name,
+                    "tag": tag,
+                    "market": market,
+                    "signals": int(sums["signals"][c]),
+                    "with_result": int(n[c]),
+                    "hit_pct": round(100.0 * hits[c] / n[c], 2) if n[c] else None,
+                    "bets": int(bets[c]),
+                    "profit": round(float(profit[c]), 2) if bets[c] else None,
+                    "roi_pct": round(100.0 * profit[c] / bets[c], 2) if bets[c] else None,
+                })
+    return pd.DataFrame(rows)
+
+
+def load_configs(path=None, overrides=None):
+    """
+    Sempre "baseline" (soglie di produzione); poi le config del file JSON
+    ({nome: {soglia: valore}} oppure lista di dict) e quella da --set.
+    """
+    configs = {"baseline": {}}
+    if path:
+        with open(path, "r", encoding="utf-8") as f:
+            raw = json.load(f)
+        items = raw.items() if isinstance(raw, dict) else ((f"cfg{i + 1}", cfg) for i, cfg in enumerate(raw))
+        for name, cfg in items:
+            configs[str(name)] = dict(cfg)
+    if overrides:
+        configs["set"] = dict(overrides)
+
+    for name, cfg in configs.items():
+        unknown = set(cfg) - set(DEFAULT_THRESHOLDS)
+        if unknown:
+            raise ValueError(f"config {name}: soglie sconosciute {sorted(unknown)}")
+    return configs
+
+
+def parse_set(values):
+    overrides = {}
+    for item in values or []:
+        key, _, value = item.partition("=")
+        overrides[key.strip()] = float(value)
+    return overrides
+
+
+def print_table(table):
+    for tag in TAGS:
+        sub = table[table["tag"] == tag]
+        if sub.empty or not sub["signals"].any():
+            continue
+        print(f"🏷️ {tag}", flush=True)
+        header = f"   {'config':<14}{'segnali':>8}" + "".join(f"{m + ' hit%':>13}{'ROI%':>8}" for m in MARKETS)
+        print(header, flush=True)
+        for name, rows in sub.groupby("config", sort=False):
+            by_market = rows.set_index("market")
+            cells = ""
+            for market in MARKETS:
+                hit = by_market.at[market, "hit_pct"]
+                roi = by_market.at[market, "roi_pct"]
+                cells += f"{'-' if pd.isna(hit) else f'{hit:.1f}':>13}{'-' if pd.isna(roi) else f'{roi:.1f}':>8}"
+            print(f"   {name:<14}{int(rows['signals'].iloc[0]):>8}{cells}", flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backtest delle soglie di scoring su details archiviati e risultati")
+    parser.add_argument("--archives", default=str(DEFAULT_ARCHIVES_DIR))
+    parser.add_argument("--no-live", action="store_true", help="ignora i details_day*.json live")
+    parser.add_argument("--config", help="JSON con le config di soglie da confrontare")
+    parser.add_argument("--set", action="append", metavar="SOGLIA=VALORE", help="config extra da riga di comando")
+    parser.add_argument("--from", dest="date_from", help="prima data fixture (YYYY-MM-DD)")
+    parser.add_argument("--to", dest="date_to", help="ultima data fixture (YYYY-MM-DD)")
+    parser.add_argument("--fetch", action="store_true", help="scarica via API i risultati mancanti")
+    parser.add_argument("--csv", help="salva la tabella completa (config, tag, mercato)")
+    args = parser.parse_args()
+
+    try:
+        configs = load_configs(args.config, parse_set(args.set))
+    except Exception as e:
+        print(f"❌ Config non valide: {e}", flush=True)
+        return 1
+
+    metrics = RunMetrics("backtest")
+    store_path = store_path_from_env()
+    store = ResultsStore(store_path) if store_path else None
+    if store is not None:
+        metrics.add_source("results_store", store.stats)
+    client = ApiClient(os.getenv("API_SPORTS_KEY")) if args.fetch else None
+    if client is not None:
+        metrics.add_source("api", client.stats)
+
+    try:
+        with metrics.stage("load"):
+            fixture_ids, dates, columns, info = load_dataset(
+                snapshot_paths(args.archives, not args.no_live), args.date_from, args.date_to
+            )
+        if not len(fixture_ids):
+            print("⚠️ Nessun fixture negli snapshot selezionati.", flush=True)
+            return 0
+
+        with metrics.stage("results"):
+            goals = load_results(fixture_ids, dates, store, client)
+        with metrics.stage("scores"):
+            scores = batch_scores(columns)
+            vectors = market_vectors(columns, goals)
+        with metrics.stage("evaluate"):
+            table = evaluate(scores, configs, vectors)
+    finally:
+        if store is not None:
+            store.close()
+
+    with_result = int(np.count_nonzero(~np.isnan(goals["FT_H"] + goals["FT_A"])))
+    print(
+        f"📊 {info['files']} file, {info['snapshots']} snapshot -> {info['fixtures']} fixture "
+        f"({dates[0]} → {dates[-1]}), {with_result} con risultato | {len(configs)} config",
+        flush=True
+    )
+    print_table(table)
+    if args.csv:
+        table.to_csv(args.csv, index=False)
+        print(f"💾 Tabella salvata in {args.csv}", flush=True)
+
+    metrics.count("fixtures", info["fixtures"])
+    metrics.count("configs", len(configs))
+    print_summary(metrics.report())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,154 @@
+import argparse
+import gzip
+import json
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+from market_parser import MarketParser, consensus_summary, safe_float
+
+# ==========================================
+# MICRO-BENCHMARK PARSER MERCATI
+# Riproduce sugli elementi odds di un corpus registrato (bench_scan.py --record)
+# il vecchio giro annidato su bookmaker/bet e il MarketParser a tabelle
+# (anche con la raccolta del consensus multi-bookmaker),
+# verifica che diano lo stesso risultato e confronta i tempi.
+#
+#   python bench_markets.py --corpus corpus/
+#   python bench_markets.py --corpus corpus/ --priority "Bet365,Pinnacle"
+# ==========================================
+DEFAULT_ROUNDS = 20
+
+
+def load_odds_items(corpus):
+    """
+    Tutti gli elementi response delle risposte odds (per fixture e bulk per data) del corpus.
+    """
+    items = []
+    for path in sorted((Path(corpus) / "responses").glob("*.json.gz")):
+        with gzip.open(path, "rb") as f:
+            entry = json.loads(f.read().decode("utf-8"))
+        if entry.get("path") != "odds":
+            continue
+        items.extend((entry.get("payload") or {}).get("response", []) or [])
+    return items
+
+
+def _contains_ht(text):
+    t = str(text or "").lower()
+    return any(k in t for k in ["1st half", "first half", "1h", "ht", "half time", "halftime", "1° tempo"])
+
+
+def parse_elite_markets_legacy(odds_item):
+    """
+    Versione precedente (riferimento per la verifica e per i tempi).
+    """
+    mk = {"q1": 0.0, "qx": 0.0, "q2": 0.0, "o25": 0.0, "o05ht": 0.0, "o15ht": 0.0}
+
+    for bm in (odds_item or {}).get("bookmakers", []):
+        for b in bm.get("bets", []):
+            name = (b.get("name") or "").lower()
+            bid = b.get("id")
+
+            if bid == 1 and mk["q1"] == 0:
+                for v in b.get("values", []):
+                    vl = str(v.get("value", "")).lower()
+                    odd = safe_float(v.get("odd"), 0.0)
+                    if "home" in vl:
+                        mk["q1"] = odd
+                    elif "draw" in vl:
+                        mk["qx"] = odd
+                    elif "away" in vl:
+                        mk["q2"] = odd
+
+            if bid == 5 and mk["o25"] == 0:
+                if any(j in name for j in ["corner", "card", "booking"]):
+                    continue
+                for v in b.get("values", []):
+                    if "over 2.5" in str(v.get("value", "")).lower():
+                        mk["o25"] = safe_float(v.get("odd"), 0.0)
+
+            if _contains_ht(name) and any(k in name for k in ["total", "over/under", "ou", "goals"]):
+                if "team" in name:
+                    continue
+                for v in b.get("values", []):
+                    val_txt = str(v.get("value", "")).lower().replace(",", ".")
+                    if "over 0.5" in val_txt and mk["o05ht"] == 0:
+                        mk["o05ht"] = safe_float(v.get("odd"), 0.0)
+                    if "over 1.5" in val_txt and mk["o15ht"] == 0:
+                        mk["o15ht"] = safe_float(v.get("odd"), 0.0)
+
+        if mk["q1"] > 0 and mk["o25"] > 0 and mk["o05ht"] > 0:
+            break
+
+    if (1.01 <= mk["q1"] <= 1.10) or (1.01 <= mk["q2"] <= 1.10) or (1.01 <= mk["o25"] <= 1.30):
+        return "SKIP"
+
+    return mk
+
+
+def _collect(parser, item):
+    quotes = []
+    parser.parse(item, quotes=quotes)
+    return quotes
+
+
+def time_parser(parse, items, rounds):
+    best = None
+    for _ in range(rounds):
+        t0 = time.perf_counter()
+        for item in items:
+            parse(item)
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmark del parser mercati su un corpus odds registrato")
+    parser.add_argument("--corpus", required=True, help="cartella corpus (bench_scan.py --record)")
+    parser.add_argument("--rounds", type=int, default=DEFAULT_ROUNDS)
+    parser.add_argument("--priority", default="", help="priorità bookmaker, nomi o id separati da virgola")
+    args = parser.parse_args()
+
+    items = load_odds_items(args.corpus)
+    if not items:
+        print(f"❌ Nessuna risposta odds in {args.corpus}", flush=True)
+        return 1
+
+    engine = MarketParser()
+    mismatches = sum(1 for item in items if engine.parse(item) != parse_elite_markets_legacy(item))
+
+    legacy_s = time_parser(parse_elite_markets_legacy, items, args.rounds)
+    table_s = time_parser(MarketParser().parse, items, args.rounds)
+    consensus_parser = MarketParser()
+    consensus_s = time_parser(lambda item: consensus_summary(_collect(consensus_parser, item)), items, args.rounds)
+
+    n_bets = sum(len(bm.get("bets", [])) for item in items for bm in item.get("bookmakers", []))
+    print(f"📊 {len(items)} elementi odds, {n_bets} bet | tabelle: {len(engine.bet_table)} bet, {len(engine.value_table)} valori", flush=True)
+    print(f"   legacy  {legacy_s * 1e6 / len(items):>8.1f} µs/elemento", flush=True)
+    print(f"   tabelle {table_s * 1e6 / len(items):>8.1f} µs/elemento  (x{legacy_s / table_s:.2f})", flush=True)
+    print(f"   tabelle + consensus {consensus_s * 1e6 / len(items):>8.1f} µs/elemento", flush=True)
+
+    prioritized = MarketParser([t for t in args.priority.split(",") if t.strip()])
+    supplied = Counter()
+    changed = 0
+    for item in items:
+        mk, sources = prioritized.parse_with_sources(item)
+        supplied.update(sources.values())
+        if args.priority and mk != engine.parse(item):
+            changed += 1
+    print(f"🏷️ Quote per bookmaker: {dict(supplied.most_common())}", flush=True)
+    if args.priority:
+        print(f"   priorità {args.priority}: {changed} elementi con mercati diversi dall'ordine del payload", flush=True)
+
+    if mismatches:
+        print(f"❌ {mismatches} elementi con risultato diverso dal parser legacy", flush=True)
+        return 1
+    print("✅ Stesso risultato del parser legacy su tutto il corpus.", flush=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,234 @@
+import argparse
+import hashlib
+import importlib.util
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from api_replay import MANIFEST_FILE, RECORD_ENV, REPLAY_ENV
+
+# ==========================================
+# BENCHMARK SCAN OFFLINE
+# Esegue la parte di scan delle modalità del runner (night, mid-day1,
+# evening-multi) contro un corpus registrato, in una copia temporanea
+# del workspace: niente rete, niente GitHub, file del repo intatti.
+#
+#   registrazione corpus (API key reale):
+#     python bench_scan.py --record corpus/ --modes night
+#   benchmark + gate di regressione:
+#     python bench_scan.py --corpus corpus/ --json bench.json
+#     python bench_scan.py --corpus corpus/ --check bench.json
+# ==========================================
+BASE_DIR = Path(__file__).resolve().parent
+RUNNER_FILE = "3appDays_runner.py"
+MODES = ["night", "mid-day1", "evening-multi"]
+OUTPUT_FILES = [
+    "data.json",
+    "data_day1.json", "data_day2.json", "data_day3.json", "data_day4.json", "data_day5.json",
+    "details_day1.json", "details_day2.json", "details_day3.json", "details_day4.json", "details_day5.json",
+    "arab_snapshot_database.json",
+]
+DEFAULT_TIME_TOLERANCE = 0.25
+
+
+def prepare_workdir():
+    """
+    Copia script e file JSON di stato in una cartella temporanea.
+    """
+    workdir = Path(tempfile.mkdtemp(prefix="arab_bench_"))
+    for src in BASE_DIR.iterdir():
+        if src.is_file() and src.suffix in (".py", ".json"):
+            shutil.copy2(src, workdir / src.name)
+    return workdir
+
+
+def outputs_fingerprint(workdir):
+    digests = {}
+    for name in OUTPUT_FILES:
+        path = workdir / name
+        if path.exists():
+            digests[name] = hashlib.sha1(path.read_bytes()).hexdigest()
+    return digests
+
+
+def run_child(mode, workdir):
+    """
+    Processo figlio: importa il runner dalla copia ed esegue lo scan della modalità.
+    """
+    os.chdir(workdir)
+    sys.path.insert(0, str(workdir))
+    # stessi argomenti del workflow: l'app si comporta come in produzione
+    sys.argv = [RUNNER_FILE, f"--{mode}"]
+
+    spec = importlib.util.spec_from_file_location("bench_runner", workdir / RUNNER_FILE)
+    runner = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(runner)
+    engine = runner.engine
+
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    try:
+        runner.SCAN_STEPS[f"--{mode}"]()
+    finally:
+        wall = time.perf_counter() - t0
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        engine.api_cache().close()
+
+    api = engine.api_client().stats()
+    replay = engine.api_replay()
+    return {
+        "mode": mode,
+        "wall_seconds": round(wall, 3),
+        "calls": api["calls"],
+        "bytes": api["bytes"],
+        "by_endpoint": api["by_endpoint"],
+        "replay_missing": dict(replay.missing) if replay else {},
+        "peak_traced_mb": round(peak / (1024 * 1024), 2),
+        "max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "rows": engine.scan_store().count(),
+        "outputs": outputs_fingerprint(workdir),
+    }
+
+
+def launch(mode, corpus, record=False, workers=None):
+    workdir = prepare_workdir()
+    result_file = workdir / "_bench_result.json"
+
+    env = dict(os.environ)
+    env.pop("GITHUB_TOKEN", None)
+    env["ARAB_API_CACHE"] = "0"
+    # team form store nuovo per ogni modalità, dentro la copia temporanea
+    env["ARAB_TEAM_FORM_STORE"] = str(workdir / "team_form.sqlite")
+    env.pop(RECORD_ENV, None)
+    env.pop(REPLAY_ENV, None)
+    if record:
+        env[RECORD_ENV] = str(Path(corpus).resolve())
+    else:
+        env[REPLAY_ENV] = str(Path(corpus).resolve())
+        manifest = json.loads((Path(corpus) / MANIFEST_FILE).read_text(encoding="utf-8"))
+        env["ARAB_NOW"] = manifest["recorded_at"]
+    if workers is not None:
+        env["ARAB_SCAN_WORKERS"] = str(workers)
+
+    try:
+        proc = subprocess.run(
+            [sys.executable, str(Path(__file__).resolve()), "--child", mode, "--workdir", str(workdir),
+             "--result", str(result_file)],
+            env=env,
+            stdout=subprocess.DEVNULL,
+        )
+        if proc.returncode != 0 or not result_file.exists():
+            print(f"❌ {mode}: scan terminato con errore (exit {proc.returncode})", flush=True)
+            return None
+        return json.loads(result_file.read_text(encoding="utf-8"))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def print_report(results):
+    print("", flush=True)
+    print(f"{'mode':<15}{'wall s':>9}{'calls':>8}{'MB parsed':>11}{'peak MB':>9}{'rss MB':>9}{'rows':>7}", flush=True)
+    for r in results:
+        print(
+            f"{r['mode']:<15}{r['wall_seconds']:>9.2f}{r['calls']:>8}{r['bytes'] / (1024 * 1024):>11.2f}"
+            f"{r['peak_traced_mb']:>9.1f}{r['max_rss_mb']:>9.1f}{r['rows']:>7}",
+            flush=True,
+        )
+        for label, counts in r["by_endpoint"].items():
+            print(f"   {label:<16} calls {counts['calls']:>5} | {counts['bytes'] / 1024:>9.1f} KB", flush=True)
+        if r["replay_missing"]:
+            print(f"   ⚠️ richieste assenti dal corpus: {r['replay_missing']}", flush=True)
+
+
+def check_against(results, baseline_path, tolerance):
+    """
+    Gate di regressione: stessi output, chiamate non in aumento,
+    tempo entro la tolleranza rispetto alla baseline.
+    """
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = {r["mode"]: r for r in json.load(f)}
+
+    failures = []
+    for r in results:
+        base = baseline.get(r["mode"])
+        if not base:
+            continue
+        if r["outputs"] != base["outputs"]:
+            changed = sorted(k for k in set(r["outputs"]) | set(base["outputs"]) if r["outputs"].get(k) != base["outputs"].get(k))
+            failures.append(f"{r['mode']}: output diversi ({', '.join(changed)})")
+        if r["calls"] > base["calls"]:
+            failures.append(f"{r['mode']}: chiamate {base['calls']} -> {r['calls']}")
+        if r["wall_seconds"] > base["wall_seconds"] * (1 + tolerance):
+            failures.append(f"{r['mode']}: tempo {base['wall_seconds']:.2f}s -> {r['wall_seconds']:.2f}s")
+
+    for failure in failures:
+        print(f"❌ {failure}", flush=True)
+    if not failures:
+        print("✅ Nessuna regressione rispetto alla baseline.", flush=True)
+    return not failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark offline dello scan (record/replay API)")
+    parser.add_argument("--corpus", help="cartella corpus da riprodurre")
+    parser.add_argument("--record", metavar="DIR", help="registra un corpus dalle API reali in DIR")
+    parser.add_argument("--modes", default=",".join(MODES), help="modalità separate da virgola")
+    parser.add_argument("--workers", type=int, default=None, help="override ARAB_SCAN_WORKERS")
+    parser.add_argument("--json", dest="json_out", help="salva i risultati in questo file")
+    parser.add_argument("--check", help="baseline JSON per il gate di regressione")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TIME_TOLERANCE)
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--workdir", help=argparse.SUPPRESS)
+    parser.add_argument("--result", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        result = run_child(args.child, Path(args.workdir))
+        with open(args.result, "w", encoding="utf-8") as f:
+            json.dump(result, f)
+        return 0
+
+    corpus = args.record or args.corpus
+    if not corpus:
+        parser.error("serve --corpus oppure --record")
+
+    modes = [m.strip() for m in args.modes.split(",") if m.strip()]
+    unknown = [m for m in modes if m not in MODES]
+    if unknown:
+        parser.error(f"modalità sconosciute: {', '.join(unknown)}")
+
+    if args.record:
+        os.makedirs(args.record, exist_ok=True)
+    elif not (Path(corpus) / MANIFEST_FILE).exists():
+        parser.error(f"{corpus}: manifest.json mancante, registra prima il corpus con --record")
+
+    results = []
+    for mode in modes:
+        print(f"⏱️ {'Registrazione' if args.record else 'Replay'} {mode}...", flush=True)
+        result = launch(mode, corpus, record=bool(args.record), workers=args.workers)
+        if result is None:
+            return 1
+        results.append(result)
+
+    print_report(results)
+
+    if args.json_out:
+        with open(args.json_out, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+        print(f"💾 Risultati salvati in {args.json_out}", flush=True)
+
+    if args.check and not check_against(results, args.check, args.tolerance):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
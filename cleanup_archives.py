@@ -1,33 +1,38 @@
+import argparse
 from pathlib import Path
-import shutil
+
+from archive_store import KEEP_DAYS, KEEP_MIN_RUNS, ArchiveStore
 
 BASE_DIR = Path(__file__).resolve().parent
 ARCHIVES_DIR = BASE_DIR / "archives"
-KEEP_LAST = 7
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Retention dell'archivio: run più vecchi di --keep-days e blob orfani")
+    parser.add_argument("--keep-days", type=int, default=KEEP_DAYS)
+    parser.add_argument("--keep-min", type=int, default=KEEP_MIN_RUNS)
+    args = parser.parse_args()
+
     if not ARCHIVES_DIR.exists():
         print("📁 Nessuna cartella archives presente.")
         return
 
-    folders = [p for p in ARCHIVES_DIR.iterdir() if p.is_dir()]
-    folders = sorted(folders, key=lambda p: p.name)
-
-    total = len(folders)
-    print(f"📦 Snapshot archives trovati: {total}")
-
-    if total <= KEEP_LAST:
-        print(f"✅ Nessuna pulizia necessaria. Tengo gli ultimi {KEEP_LAST}.")
-        return
-
-    to_delete = folders[:-KEEP_LAST]
-
-    for folder in to_delete:
-        print(f"🗑️ Elimino: {folder.name}")
-        shutil.rmtree(folder, ignore_errors=True)
-
-    print(f"✅ Pulizia completata. Rimangono gli ultimi {KEEP_LAST} snapshot.")
+    store = ArchiveStore(ARCHIVES_DIR)
+    migrated = store.migrate_legacy()
+    if migrated:
+        print(f"📦 Cartelle vecchio formato importate: {len(migrated)}")
+
+    print(f"📦 Run archiviati trovati: {len(store.runs())}")
+    removed_runs, removed_blobs = store.prune(args.keep_days, args.keep_min)
+    for run in removed_runs:
+        print(f"🗑️ Elimino: {run}")
+
+    stats = store.stats()
+    print(
+        f"✅ Pulizia completata ({args.keep_days} giorni, almeno {args.keep_min} run): "
+        f"rimangono {stats['runs']} run, {stats['blobs']} blob, {stats['stored_bytes'] / 1024:.1f} KB "
+        f"(blob eliminati: {removed_blobs})."
+    )
 
 
 if __name__ == "__main__":
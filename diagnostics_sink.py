@@ -0,0 +1,184 @@
+import csv
+import heapq
+import json
+import os
+import tempfile
+from pathlib import Path
+
+# ==========================================
+# DIAGNOSTICS SINK (streaming)
+# - ogni riga diagnostica va su disco appena prodotta: JSON-lines + CSV, flush per riga
+# - nessuna lista in memoria: una giornata con migliaia di fixture pesa come una con dieci
+# - CSV ordinato per priorità prodotto alla fine con un merge esterno
+#   (run ordinati da RUN_ROWS righe + heapq.merge) sul CSV in streaming
+# - righe analizzate (diagnostic_matches.json) scritte in streaming come array JSON
+# - run interrotto: restano diagnostic_matches.jsonl, diagnostic_matches.csv.part
+#   e diagnostic_matches.json.part con le righe scritte fino al crash
+# ==========================================
+RUN_ROWS = 5000
+
+
+def _part(path):
+    return Path(f"{path}.part")
+
+
+class JsonArrayWriter:
+    """
+    Array JSON scritto un elemento alla volta, identico a json.dump(items, f, indent=4).
+    Si scrive su `path`.part, rinominato in `path` solo da close().
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.count = 0
+        self.f = open(_part(self.path), "w", encoding="utf-8")
+        self.f.write("[")
+        self.f.flush()
+
+    def write(self, item):
+        text = json.dumps(item, indent=4, ensure_ascii=False).replace("\n", "\n    ")
+        self.f.write(("," if self.count else "") + "\n    " + text)
+        self.f.flush()
+        self.count += 1
+
+    def close(self):
+        if self.f is None:
+            return
+        self.f.write("\n]" if self.count else "]")
+        self.f.close()
+        self.f = None
+        os.replace(_part(self.path), self.path)
+
+    def abort(self):
+        if self.f is not None:
+            self.f.close()
+            self.f = None
+
+
+class DiagnosticsSink:
+    def __init__(self, csv_path, columns, db_path=None):
+        """
+        csv_path: CSV finale ordinato; accanto, lo stream in JSON-lines (.jsonl)
+        e quello CSV non ordinato (.csv.part).
+        columns: intestazione CSV fissa; i campi fuori elenco restano solo nel JSON-lines.
+        db_path: se passato, le righe analizzate vanno in streaming in quel file JSON.
+        """
+        self.csv_path = Path(csv_path)
+        self.jsonl_path = self.csv_path.with_suffix(".jsonl")
+        self.columns = list(columns)
+        self.rows = 0
+        self.kept = 0
+        self.prefilter_out = 0
+        self.early_skip = 0
+        self.sorted_rows = None
+
+        self.jsonl = open(self.jsonl_path, "w", encoding="utf-8")
+        self.stream = open(_part(self.csv_path), "w", encoding="utf-8-sig", newline="")
+        self.writer = csv.DictWriter(self.stream, fieldnames=self.columns, extrasaction="ignore", lineterminator="\n")
+        self.writer.writeheader()
+        self.stream.flush()
+        self.matches = JsonArrayWriter(db_path) if db_path else None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # in caso di errore i file parziali restano su disco
+        self.close()
+        return False
+
+    # -------------------------
+    # STREAMING
+    # -------------------------
+    def write_row(self, row):
+        self.jsonl.write(json.dumps(row, ensure_ascii=False, default=str) + "\n")
+        self.jsonl.flush()
+        self.writer.writerow(row)
+        self.stream.flush()
+
+        self.rows += 1
+        self.kept += bool(row.get("kept"))
+        self.prefilter_out += bool(row.get("prefilter_out"))
+        self.early_skip += bool(row.get("early_skip"))
+
+    def write_match(self, row):
+        if self.matches is not None:
+            self.matches.write(row)
+
+    def finish_matches(self):
+        """
+        Chiude l'array delle righe analizzate e lo pubblica al posto del vecchio file.
+        """
+        if self.matches is not None:
+            self.matches.close()
+
+    # -------------------------
+    # MERGE ESTERNO
+    # -------------------------
+    def _sorted_runs(self, sort_key, tmp_dir, run_rows):
+        """
+        Legge lo stream CSV a blocchi di run_rows righe, ordina ogni blocco e lo salva come run.
+        Il numero di riga chiude la chiave: a parità resta l'ordine di produzione (sort stabile).
+        """
+        runs = []
+        with open(_part(self.csv_path), "r", encoding="utf-8-sig", newline="") as f:
+            reader = csv.reader(f)
+            header = next(reader, self.columns)
+            block = []
+            for seq, values in enumerate(reader):
+                block.append((sort_key(dict(zip(header, values))), seq, values))
+                if len(block) >= run_rows:
+                    runs.append(self._write_run(block, tmp_dir, len(runs)))
+                    block = []
+            if block or not runs:
+                runs.append(self._write_run(block, tmp_dir, len(runs)))
+        return runs
+
+    @staticmethod
+    def _write_run(block, tmp_dir, n):
+        block.sort(key=lambda item: item[:2])
+        path = Path(tmp_dir) / f"run_{n:05d}.jsonl"
+        with open(path, "w", encoding="utf-8") as f:
+            for key, seq, values in block:
+                f.write(json.dumps([key, seq, values], ensure_ascii=False) + "\n")
+        return path
+
+    @staticmethod
+    def _read_run(path):
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                key, seq, values = json.loads(line)
+                yield tuple(key), seq, values
+
+    def write_sorted_csv(self, sort_key, run_rows=RUN_ROWS):
+        """
+        CSV finale ordinato per sort_key(riga come dict di stringhe), via merge esterno
+        dei run ordinati: in memoria al massimo run_rows righe.
+        """
+        self.stream.flush()
+        tmp_csv = Path(f"{self.csv_path}.tmp")
+
+        with tempfile.TemporaryDirectory(prefix="diag_runs_") as tmp_dir:
+            runs = self._sorted_runs(sort_key, tmp_dir, run_rows)
+            with open(tmp_csv, "w", encoding="utf-8-sig", newline="") as out:
+                writer = csv.writer(out, lineterminator="\n")
+                writer.writerow(self.columns)
+                for _, _, values in heapq.merge(*(self._read_run(p) for p in runs), key=lambda item: item[:2]):
+                    writer.writerow(values)
+
+        os.replace(tmp_csv, self.csv_path)
+        self.sorted_rows = self.rows
+        return len(runs)
+
+    def close(self):
+        """
+        Chiude gli stream. Lo stream CSV non ordinato viene rimosso solo se il CSV finale
+        contiene tutte le righe; l'array JSON non chiuso da finish_matches() resta come .part.
+        """
+        for f in (self.jsonl, self.stream):
+            if not f.closed:
+                f.close()
+        if self.matches is not None:
+            self.matches.abort()
+        if self.sorted_rows == self.rows:
+            _part(self.csv_path).unlink(missing_ok=True)
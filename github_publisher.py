@@ -0,0 +1,151 @@
+import hashlib
+import json
+import time
+from contextlib import contextmanager
+
+# ==========================================
+# PUBBLICAZIONE GITHUB IN UN SOLO COMMIT
+# I file di output vengono accumulati e pubblicati insieme via Git Data API:
+# blob dei file cambiati -> tree -> commit -> update del ref.
+# I file con lo stesso blob SHA già presente sul branch vengono saltati.
+# ==========================================
+REF_UPDATE_ATTEMPTS = 3
+
+
+def serialize_payload(payload):
+    return json.dumps(payload, indent=4, ensure_ascii=False)
+
+
+def git_blob_sha(data):
+    """
+    SHA del blob come lo calcola git: sha1("blob <len>\\0" + contenuto).
+    """
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    return hashlib.sha1(b"blob %d\0" % len(data) + data).hexdigest()
+
+
+class GithubPublisher:
+    def __init__(self, repo_name, token_getter, branch="main"):
+        self.repo_name = repo_name
+        self.token_getter = token_getter
+        self.branch = branch
+        self.pending = {}
+        self.batch_depth = 0
+        self.batch_message = None
+        self.last_commit_sha = None
+        self.published = {}
+        self.last_status = None
+        self.flushes = 0
+        self.flush_seconds = 0.0
+        self.commits = 0
+        self.files_sent = 0
+
+    @property
+    def batching(self):
+        return self.batch_depth > 0
+
+    def stage(self, filename, payload):
+        self.stage_text(filename, serialize_payload(payload))
+
+    def stage_text(self, filename, text):
+        self.pending[filename] = text
+
+    @contextmanager
+    def batch(self, commit_message):
+        """
+        Dentro il blocco stage() accumula soltanto; all'uscita un unico commit.
+        """
+        self.batch_depth += 1
+        if self.batch_depth == 1:
+            self.batch_message = commit_message
+        try:
+            yield self
+        finally:
+            self.batch_depth -= 1
+            if self.batch_depth == 0:
+                self.flush(self.batch_message)
+                self.batch_message = None
+
+    def flush(self, commit_message):
+        t0 = time.perf_counter()
+        self.last_status = self._flush(commit_message)
+        self.flushes += 1
+        self.flush_seconds += time.perf_counter() - t0
+        return self.last_status
+
+    def stats(self):
+        return {
+            "flushes": self.flushes,
+            "seconds": round(self.flush_seconds, 3),
+            "commits": self.commits,
+            "files_sent": self.files_sent,
+        }
+
+    def _flush(self, commit_message):
+        if not self.pending:
+            return "SUCCESS"
+
+        files = self.pending
+        self.pending = {}
+
+        try:
+            token = self.token_getter()
+            if not token:
+                return "MISSING_TOKEN"
+
+            # PyGithub solo quando c'è davvero da pubblicare
+            from github import Github, InputGitTreeElement
+
+            repo = Github(token).get_repo(self.repo_name)
+
+            for attempt in range(REF_UPDATE_ATTEMPTS):
+                ref = repo.get_git_ref(f"heads/{self.branch}")
+                head = repo.get_git_commit(ref.object.sha)
+                recursive = any("/" in name for name in files)
+                remote = {
+                    el.path: el.sha
+                    for el in repo.get_git_tree(head.tree.sha, recursive=recursive).tree
+                    if el.type == "blob"
+                }
+
+                local = {name: git_blob_sha(text) for name, text in files.items()}
+                changed = [name for name in files if remote.get(name) != local[name]]
+
+                if not changed:
+                    print(f"📤 GitHub: nessuna modifica su {len(files)} file, commit saltato.", flush=True)
+                    self.published.update(local)
+                    return "SUCCESS"
+
+                elements = []
+                for name in changed:
+                    blob = repo.create_git_blob(files[name], "utf-8")
+                    elements.append(InputGitTreeElement(name, "100644", "blob", sha=blob.sha))
+
+                tree = repo.create_git_tree(elements, base_tree=head.tree)
+                commit = repo.create_git_commit(commit_message, tree, [head])
+
+                try:
+                    ref.edit(commit.sha, force=False)
+                except Exception:
+                    # il branch è avanzato nel frattempo: si riparte dal nuovo HEAD
+                    if attempt == REF_UPDATE_ATTEMPTS - 1:
+                        raise
+                    continue
+
+                self.last_commit_sha = commit.sha
+                self.published.update(local)
+                self.commits += 1
+                self.files_sent += len(changed)
+                print(
+                    f"📤 GitHub: commit {commit.sha[:7]} con {len(changed)} file "
+                    f"({len(files) - len(changed)} invariati).",
+                    flush=True
+                )
+                return "SUCCESS"
+
+        except Exception as e:
+            # i file restano da pubblicare al prossimo flush
+            for name, text in files.items():
+                self.pending.setdefault(name, text)
+            return str(e)
@@ -0,0 +1,190 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from pathlib import Path
+from urllib.parse import urlencode
+
+# ==========================================
+# CACHE PERSISTENTE RISPOSTE API (SQLite)
+# - chiave: endpoint + parametri ordinati
+# - payload JSON compresso zlib
+# - TTL per endpoint + eviction LRU oltre la dimensione massima
+# ==========================================
+BASE_DIR = Path(__file__).resolve().parent
+DEFAULT_CACHE_DIR = Path(os.getenv("ARAB_CACHE_DIR") or (BASE_DIR / ".cache"))
+DEFAULT_CACHE_FILE = DEFAULT_CACHE_DIR / "api_cache.sqlite"
+DEFAULT_MAX_BYTES = int(os.getenv("ARAB_CACHE_MAX_MB", "256") or 256) * 1024 * 1024
+CACHE_ENABLED = os.getenv("ARAB_API_CACHE", "1") != "0"
+
+# (endpoint, parametri che devono essere presenti, TTL secondi): vince la prima regola
+ENDPOINT_TTLS = [
+    ("fixtures", ("team", "last"), 20 * 3600),  # storico partite finite
+    ("fixtures", ("date",), 5 * 60),            # liste fixture della giornata
+    ("odds", (), 15 * 60),                      # quote (bulk e singole)
+]
+
+
+def ttl_for(path, params):
+    keys = set((params or {}).keys())
+    for endpoint, required, ttl in ENDPOINT_TTLS:
+        if path == endpoint and all(k in keys for k in required):
+            return ttl
+    return 0
+
+
+def endpoint_label(path, params):
+    keys = sorted((params or {}).keys())
+    main = next((k for k in ("team", "fixture", "id", "ids", "date") if k in keys), None)
+    return f"{path}:{main}" if main else path
+
+
+def cache_key(path, params):
+    query = urlencode(sorted((str(k), str(v)) for k, v in (params or {}).items()))
+    return hashlib.sha1(f"{path}?{query}".encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    def __init__(self, path=DEFAULT_CACHE_FILE, max_bytes=DEFAULT_MAX_BYTES, enabled=CACHE_ENABLED):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self.lock = threading.Lock()
+        self.conn = None
+        self.hits = {}
+        self.misses = {}
+        self.writes = 0
+
+        if self.enabled:
+            try:
+                self._open()
+            except Exception as e:
+                print(f"⚠️ Cache API disattivata ({self.path.name}): {e}", flush=True)
+                self.enabled = False
+
+    def _open(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.path), check_same_thread=False, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                endpoint TEXT NOT NULL,
+                expires_at REAL NOT NULL,
+                last_access REAL NOT NULL,
+                size INTEGER NOT NULL,
+                payload BLOB NOT NULL
+            )
+            """
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_access ON responses(last_access)")
+        self.conn.execute("DELETE FROM responses WHERE expires_at < ?", (time.time(),))
+        self.conn.commit()
+
+    def get(self, path, params):
+        if not self.enabled or ttl_for(path, params) <= 0:
+            return None
+
+        label = endpoint_label(path, params)
+        key = cache_key(path, params)
+        now = time.time()
+
+        try:
+            with self.lock:
+                row = self.conn.execute(
+                    "SELECT payload, expires_at FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+                if row and row[1] >= now:
+                    self.conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+                    self.conn.commit()
+                    self.hits[label] = self.hits.get(label, 0) + 1
+                    return json.loads(zlib.decompress(row[0]).decode("utf-8"))
+        except Exception:
+            pass
+
+        with self.lock:
+            self.misses[label] = self.misses.get(label, 0) + 1
+        return None
+
+    def put(self, path, params, payload):
+        ttl = ttl_for(path, params)
+        if not self.enabled or ttl <= 0:
+            return
+
+        # API-Sports risponde 200 anche su errori di quota/parametri: quelle risposte non si salvano
+        if isinstance(payload, dict) and payload.get("errors"):
+            return
+
+        try:
+            blob = zlib.compress(json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+            now = time.time()
+            with self.lock:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, endpoint, expires_at, last_access, size, payload) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (cache_key(path, params), endpoint_label(path, params), now + ttl, now, len(blob), blob)
+                )
+                self.conn.commit()
+                self.writes += 1
+                if self.writes % 200 == 0:
+                    self._evict_locked()
+        except Exception:
+            pass
+
+    def _evict_locked(self):
+        total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        target = int(self.max_bytes * 0.9)
+        rows = self.conn.execute("SELECT key, size FROM responses ORDER BY last_access ASC").fetchall()
+        doomed = []
+        for key, size in rows:
+            if total <= target:
+                break
+            doomed.append((key,))
+            total -= size
+
+        self.conn.executemany("DELETE FROM responses WHERE key = ?", doomed)
+        self.conn.commit()
+
+    def close(self):
+        if not self.conn:
+            return
+        try:
+            with self.lock:
+                self.conn.execute("DELETE FROM responses WHERE expires_at < ?", (time.time(),))
+                self._evict_locked()
+                self.conn.close()
+        except Exception:
+            pass
+        self.conn = None
+        self.enabled = False
+
+    def stats(self):
+        labels = sorted(set(self.hits) | set(self.misses))
+        return {
+            "enabled": self.enabled,
+            "hits": sum(self.hits.values()),
+            "misses": sum(self.misses.values()),
+            "by_endpoint": {
+                label: {"hits": self.hits.get(label, 0), "misses": self.misses.get(label, 0)}
+                for label in labels
+            },
+        }
+
+    def print_stats(self):
+        stats = self.stats()
+        if not stats["enabled"] and not stats["hits"] and not stats["misses"]:
+            print("🗄️ Cache API: disattivata.", flush=True)
+            return
+
+        total = stats["hits"] + stats["misses"]
+        rate = (100.0 * stats["hits"] / total) if total else 0.0
+        print(f"🗄️ Cache API: {stats['hits']} hit | {stats['misses']} miss | hit-rate {rate:.1f}%", flush=True)
+        for label, counts in stats["by_endpoint"].items():
+            print(f"   {label:<16} hit {counts['hits']:>5} | miss {counts['misses']:>5}", flush=True)
@@ -0,0 +1,245 @@
+import os
+
+# ==========================================
+# PARSER MERCATI ELITE (odds API-Sports)
+# - tabella bet (id, nome) -> slot mercato: classificata una volta, riusata su tutti i fixture
+# - tabella valori (testo del valore) -> esito: idem
+# - un solo giro sui valori di ogni bet riempie tutti gli slot che quella bet alimenta
+# - per ogni quota il bookmaker che l'ha fornita
+# - priorità bookmaker configurabile (ARAB_BOOKMAKER_PRIORITY="Bet365,Pinnacle" o id),
+#   di default l'ordine del payload: stesso risultato del vecchio giro annidato
+# - consenso multi-bookmaker (quote di tutti i bookmaker, best/median/spread)
+#   raccolto nello stesso giro, senza chiamate in più
+# ==========================================
+PRIORITY_ENV = "ARAB_BOOKMAKER_PRIORITY"
+
+MARKET_KEYS = ("q1", "qx", "q2", "o25", "o05ht", "o15ht")
+
+BET_1X2 = 1
+BET_GOALS_OU = 5
+
+HT_KEYWORDS = ["1st half", "first half", "1h", "ht", "half time", "halftime", "1° tempo"]
+HT_TOTAL_KEYWORDS = ["total", "over/under", "ou", "goals"]
+OU_EXCLUDED_KEYWORDS = ["corner", "card", "booking"]
+
+# esito valore: (slot 1X2 o None, over 2.5, over 0.5, over 1.5)
+SIDE_KEYS = (("home", "q1"), ("draw", "qx"), ("away", "q2"))
+
+
+def safe_float(x, default=0.0):
+    try:
+        if x is None:
+            return default
+        if isinstance(x, (int, float)):
+            return float(x)
+        s = str(x).strip().replace(",", ".")
+        if s in ("", "-", "None", "null"):
+            return default
+        return float(s)
+    except Exception:
+        return default
+
+
+def empty_markets():
+    return {k: 0.0 for k in MARKET_KEYS}
+
+
+def is_skip_market(mk):
+    """
+    Favorito o over troppo bassi: fixture da scartare.
+    """
+    return (1.01 <= mk["q1"] <= 1.10) or (1.01 <= mk["q2"] <= 1.10) or (1.01 <= mk["o25"] <= 1.30)
+
+
+class BetClass:
+    __slots__ = ("is_1x2", "is_goals_ou", "ou_excluded", "is_ht_total")
+
+    def __init__(self, bid, name):
+        text = str(name or "").lower()
+        self.is_1x2 = bid == BET_1X2
+        self.is_goals_ou = bid == BET_GOALS_OU
+        # bet 5 di corner/cartellini: scartata per intero (anche come HT) finché manca l'O2.5
+        self.ou_excluded = self.is_goals_ou and any(j in text for j in OU_EXCLUDED_KEYWORDS)
+        self.is_ht_total = (
+            any(k in text for k in HT_KEYWORDS)
+            and any(k in text for k in HT_TOTAL_KEYWORDS)
+            and "team" not in text
+        )
+
+
+class MarketParser:
+    def __init__(self, priority=None):
+        self.priority = {}
+        for rank, token in enumerate(priority or []):
+            key = str(token).strip().lower()
+            if key and key not in self.priority:
+                self.priority[key] = rank
+        self.bet_table = {}
+        self.value_table = {}
+
+    @classmethod
+    def from_env(cls, env_name=PRIORITY_ENV):
+        raw = os.getenv(env_name, "")
+        return cls([t for t in raw.split(",") if t.strip()])
+
+    # -------------------------
+    # TABELLE MEMOIZZATE
+    # -------------------------
+    def classify_bet(self, bid, name):
+        key = (bid, name)
+        cls = self.bet_table.get(key)
+        if cls is None:
+            cls = BetClass(bid, name)
+            self.bet_table[key] = cls
+        return cls
+
+    def classify_value(self, value):
+        key = value if isinstance(value, str) else str(value)
+        hit = self.value_table.get(key)
+        if hit is None:
+            text = key.lower()
+            side = next((slot for word, slot in SIDE_KEYS if word in text), None)
+            ht_text = text.replace(",", ".")
+            hit = (side, "over 2.5" in text, "over 0.5" in ht_text, "over 1.5" in ht_text)
+            self.value_table[key] = hit
+        return hit
+
+    # -------------------------
+    # PRIORITÀ BOOKMAKER
+    # -------------------------
+    def bookmaker_rank(self, bm):
+        for key in (str(bm.get("id", "")), str(bm.get("name", "")).strip().lower()):
+            if key in self.priority:
+                return self.priority[key]
+        return len(self.priority)
+
+    def ordered_bookmakers(self, bookmakers):
+        if not self.priority:
+            return bookmakers
+        return sorted(bookmakers, key=self.bookmaker_rank)
+
+    # -------------------------
+    # PARSING
+    # -------------------------
+    def parse(self, odds_item, sources=None, quotes=None):
+        """
+        I 6 mercati elite di un elemento odds (odds?fixture= o feed bulk odds?date=),
+        oppure "SKIP". Se passato, `sources` riceve {slot: bookmaker} per ogni quota trovata.
+        Se passata, `quotes` riceve (bookmaker, mercati) di ogni bookmaker nello stesso giro:
+        la linea principale resta quella di prima, si smette solo di uscire al primo completo.
+        """
+        mk = empty_markets()
+        bet_table = self.bet_table
+        value_table = self.value_table
+        collect = quotes is not None
+        done = False
+
+        for bm in self.ordered_bookmakers((odds_item or {}).get("bookmakers", [])):
+            bm_name = bm.get("name") or bm.get("id")
+            bm_mk = empty_markets() if collect else None
+
+            for b in bm.get("bets", []):
+                cls = bet_table.get((b.get("id"), b.get("name"))) or self.classify_bet(b.get("id"), b.get("name"))
+
+                take_1x2 = take_o25 = take_ht = False
+                if not done:
+                    take_1x2 = cls.is_1x2 and mk["q1"] == 0
+                    take_o25 = cls.is_goals_ou and mk["o25"] == 0
+                    if take_o25 and cls.ou_excluded:
+                        take_o25 = False
+                    else:
+                        take_ht = cls.is_ht_total
+
+                bm_1x2 = bm_o25 = bm_ht = False
+                if collect:
+                    bm_1x2 = cls.is_1x2 and bm_mk["q1"] == 0
+                    bm_o25 = cls.is_goals_ou and bm_mk["o25"] == 0
+                    if bm_o25 and cls.ou_excluded:
+                        bm_o25 = False
+                    else:
+                        bm_ht = cls.is_ht_total
+
+                if not (take_1x2 or take_o25 or take_ht or bm_1x2 or bm_o25 or bm_ht):
+                    continue
+
+                # un solo giro sui valori: gli slot di 1X2, O2.5 e HT sono disgiunti
+                for v in b.get("values", []):
+                    value = v.get("value", "")
+                    side, over25, over05, over15 = (
+                        value_table.get(value) if isinstance(value, str) else None
+                    ) or self.classify_value(value)
+                    if not (side or over25 or over05 or over15):
+                        continue
+                    odd = safe_float(v.get("odd"), 0.0)
+
+                    if take_1x2 and side:
+                        mk[side] = odd
+                        if sources is not None:
+                            sources[side] = bm_name
+                    if take_o25 and over25:
+                        mk["o25"] = odd
+                        if sources is not None:
+                            sources["o25"] = bm_name
+                    if take_ht and over05 and mk["o05ht"] == 0:
+                        mk["o05ht"] = odd
+                        if sources is not None:
+                            sources["o05ht"] = bm_name
+                    if take_ht and over15 and mk["o15ht"] == 0:
+                        mk["o15ht"] = odd
+                        if sources is not None:
+                            sources["o15ht"] = bm_name
+
+                    if bm_1x2 and side:
+                        bm_mk[side] = odd
+                    if bm_o25 and over25:
+                        bm_mk["o25"] = odd
+                    if bm_ht and over05 and bm_mk["o05ht"] == 0:
+                        bm_mk["o05ht"] = odd
+                    if bm_ht and over15 and bm_mk["o15ht"] == 0:
+                        bm_mk["o15ht"] = odd
+
+            if collect and any(bm_mk.values()):
+                quotes.append((bm_name, bm_mk))
+
+            if not done and mk["q1"] > 0 and mk["o25"] > 0 and mk["o05ht"] > 0:
+                done = True
+                if not collect:
+                    break
+
+        if is_skip_market(mk):
+            return "SKIP"
+
+        return mk
+
+    def parse_with_sources(self, odds_item):
+        sources = {}
+        return self.parse(odds_item, sources), sources
+
+
+def _median(values):
+    ordered = sorted(values)
+    mid = len(ordered) // 2
+    if len(ordered) % 2:
+        return ordered[mid]
+    return (ordered[mid - 1] + ordered[mid]) / 2
+
+
+def consensus_summary(quotes):
+    """
+    Da [(bookmaker, mercati)] al blocco compatto per details_dayN.json:
+    quote di ogni bookmaker in array allineati a "bookmakers" (0.0 = assente),
+    più best (quota più alta), median e spread (max - min) per mercato.
+    """
+    summary = {
+        "bookmakers": [name for name, _ in quotes],
+        "quotes": {k: [bm_mk[k] for _, bm_mk in quotes] for k in MARKET_KEYS},
+        "best": {},
+        "median": {},
+        "spread": {},
+    }
+    for k in MARKET_KEYS:
+        offered = [q for q in summary["quotes"][k] if q > 0]
+        summary["best"][k] = max(offered) if offered else 0.0
+        summary["median"][k] = round(_median(offered), 3) if offered else 0.0
+        summary["spread"][k] = round(max(offered) - min(offered), 3) if offered else 0.0
+    return summary
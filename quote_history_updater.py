@@ -1,10 +1,14 @@
 import json
 import argparse
+import sys
 from pathlib import Path
 from datetime import datetime
 
+from quote_store import DEFAULT_STORE_DIR, QuoteStore
+
 BASE_DIR = Path(__file__).resolve().parent
 QUOTE_HISTORY_FILE = BASE_DIR / "quote_history.json"
+QUOTE_STORE_DIR = DEFAULT_STORE_DIR
 
 
 # =========================
@@ -153,40 +157,21 @@ def extract_country_from_lega(lega_value):
 
 
 def append_history_point(history_db, fixture_id, match_name, country, league, day_date, day_num, label, markets, ts):
-    rec = history_db.get(fixture_id, {
-        "fixture_id": fixture_id,
-        "match": match_name,
-        "country": country,
-        "league": league,
-        "first_date": day_date,
-        "history": []
-    })
-
-    rec["match"] = match_name or rec.get("match", "")
-    rec["country"] = country or rec.get("country", "")
-    rec["league"] = league or rec.get("league", "")
-    rec["first_date"] = rec.get("first_date") or day_date
-
-    point = {
-        "ts": ts,
-        "label": label,
-        "day": day_num,
-        "date": day_date,
-        "markets": markets
-    }
-
-    hist = rec.get("history", [])
-    if hist:
-        last_point = hist[-1]
-        last_markets = last_point.get("markets", {})
-        if last_markets == markets:
-            history_db[fixture_id] = rec
-            return history_db, False  # invariato
-
-    hist.append(point)
-    rec["history"] = hist[-40:]
-    history_db[fixture_id] = rec
-    return history_db, True  # aggiornato
+    """
+    history_db è il QuoteStore: il punto viene appeso al log solo se le quote sono cambiate.
+    """
+    was_updated = history_db.append_point(
+        fixture_id=fixture_id,
+        match_name=match_name,
+        country=country,
+        league=league,
+        day_date=day_date,
+        day_num=day_num,
+        label=label,
+        markets=markets,
+        ts=ts
+    )
+    return history_db, was_updated
 
 
 def compute_drop_maps(history_points):
@@ -596,4 +581,66 @@ def enrich_data_file(day_num, history_db):
                 row["INV_TO"] = inversion_to or ""
 
             save_json(live_path, live_rows)
-            print(f"✅ data.json aggiorn
+            print(f"✅ data.json aggiornato per {len(live_rows)} righe.")
+
+
+# =========================
+# MAIN
+# =========================
+def parse_days(value):
+    days = []
+    for part in str(value or "").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        try:
+            day = int(part)
+        except ValueError:
+            continue
+        if 1 <= day <= 5 and day not in days:
+            days.append(day)
+    return days
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Aggiorna quote_history e arricchisce data/details")
+    parser.add_argument("--days", default="1", help="giorni da processare, es. 1,2,3")
+    parser.add_argument("--label", default="manual", help="etichetta del punto (night, mid_day1, ...)")
+    args = parser.parse_args()
+
+    days = parse_days(args.days)
+    if not days:
+        print("❌ Nessun giorno valido in --days.")
+        return 1
+
+    history_db = QuoteStore(QUOTE_STORE_DIR)
+    try:
+        # una tantum: il primo run importa il vecchio quote_history.json monolitico
+        history_db.migrate_from_json(QUOTE_HISTORY_FILE)
+
+        for day_num in days:
+            history_db = append_history_from_day(day_num, args.label, history_db)
+
+        for day_num in days:
+            enrich_details_file(day_num, history_db)
+            enrich_data_file(day_num, history_db)
+
+        expired = history_db.expire()
+        if expired:
+            print(f"🧹 quote_store: {expired} fixture con data passata rimossi dall'indice.")
+
+        history_db.save_index()
+        if history_db.needs_compaction():
+            history_db.compact()
+
+        # export per il sito: stesso formato del vecchio quote_history.json, solo fixture attivi
+        exported = history_db.export_json(QUOTE_HISTORY_FILE)
+        print(f"✅ quote_history.json esportato: {exported} fixture ({history_db.appended} punti nuovi).")
+    finally:
+        history_db.close()
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
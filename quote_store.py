@@ -0,0 +1,377 @@
+import argparse
+import json
+import os
+import sys
+from datetime import datetime
+from pathlib import Path
+
+# ==========================================
+# QUOTE HISTORY STORE (append-only)
+# - log.jsonl: una riga per punto (fixture_id, ts, label, day, date, markets + anagrafica)
+# - index.json: per fixture anagrafica, ultime quote e offset/lunghezza dei punti nel log
+# - ogni run appende solo i punti nuovi e legge dal log solo i fixture richiesti
+# - expire(): fuori dall'indice i fixture con data match passata (anche dopo rebuild_index)
+# - indice più corto del log (crash prima di save_index): la coda del log si rilegge al load
+# - compact(): riscrive il log con i soli punti vivi quando lo spazio morto è troppo
+# - migrazione una tantum da quote_history.json ed export nello stesso formato
+# ==========================================
+BASE_DIR = Path(__file__).resolve().parent
+DEFAULT_STORE_DIR = BASE_DIR / "quote_store"
+LOG_FILE = "log.jsonl"
+INDEX_FILE = "index.json"
+INDEX_VERSION = 1
+
+MAX_POINTS_PER_FIXTURE = 40
+COMPACT_MIN_BYTES = 256 * 1024
+COMPACT_DEAD_RATIO = 0.5
+
+META_KEYS = ("match", "country", "league")
+POINT_KEYS = ("ts", "label", "day", "date", "markets")
+
+
+def _write_atomic(path, text):
+    tmp = path.with_name(f"{path.name}.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+class QuoteStore:
+    def __init__(self, root=DEFAULT_STORE_DIR):
+        self.root = Path(root)
+        self.log_path = self.root / LOG_FILE
+        self.index_path = self.root / INDEX_FILE
+        self.fixtures = {}
+        self.log_bytes = 0
+        self.reader = None
+        self.appended = 0
+        self.load()
+
+    # -------------------------
+    # INDICE
+    # -------------------------
+    def load(self):
+        self.root.mkdir(parents=True, exist_ok=True)
+        log_size = self.log_path.stat().st_size if self.log_path.exists() else 0
+
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                payload = json.load(f)
+            if payload.get("version") != INDEX_VERSION or payload.get("log_bytes", 0) > log_size:
+                raise ValueError("indice non allineato al log")
+            self.fixtures = payload.get("fixtures", {}) or {}
+            self.log_bytes = payload.get("log_bytes", 0)
+            if self.log_bytes < log_size:
+                # run interrotto dopo l'append ma prima di save_index(): si rilegge solo la coda
+                start = self.log_bytes
+                self._replay(start)
+                print(f"⚠️ quote_store: {self.log_bytes - start} byte di log recuperati oltre l'indice.", flush=True)
+        except FileNotFoundError:
+            if log_size:
+                self.rebuild_index()
+        except Exception as e:
+            print(f"⚠️ Indice quote_store non valido ({e}): lo ricostruisco dal log.", flush=True)
+            self.rebuild_index()
+
+    def save_index(self):
+        payload = {
+            "version": INDEX_VERSION,
+            "log_bytes": self.log_bytes,
+            "updated_at": datetime.now().isoformat(timespec="seconds"),
+            "fixtures": self.fixtures,
+        }
+        _write_atomic(self.index_path, json.dumps(payload, ensure_ascii=False, separators=(",", ":")))
+
+    def rebuild_index(self):
+        """
+        Ricostruisce l'indice rileggendo tutto il log (recupero dopo crash o indice perso).
+        I fixture già scaduti restano fuori, come dopo expire().
+        """
+        self.close()
+        self.fixtures = {}
+        self.log_bytes = 0
+        if not self.log_path.exists():
+            return
+
+        self._replay(0)
+        self.expire()
+
+    def _replay(self, start):
+        """
+        Indicizza i punti del log da `start` a fine file. Una riga finale senza newline
+        (scrittura interrotta) viene troncata, così il prossimo append parte pulito.
+        """
+        with open(self.log_path, "r+b") as f:
+            f.seek(start)
+            offset = start
+            for raw in f:
+                length = len(raw)
+                if not raw.endswith(b"\n"):
+                    f.truncate(offset)
+                    break
+                try:
+                    rec = json.loads(raw.decode("utf-8"))
+                    self._index_point(rec, offset, length)
+                except Exception:
+                    pass
+                offset += length
+        self.log_bytes = offset
+
+    def _index_point(self, rec, offset, length):
+        fid = str(rec["fixture_id"])
+        entry = self.fixtures.get(fid)
+        if entry is None:
+            entry = {
+                "match": "",
+                "country": "",
+                "league": "",
+                "first_date": rec.get("first_date") or rec.get("date", ""),
+                "last_date": "",
+                "last_markets": None,
+                "points": [],
+            }
+            self.fixtures[fid] = entry
+
+        for key in META_KEYS:
+            entry[key] = rec.get(key) or entry.get(key, "")
+        entry["first_date"] = entry.get("first_date") or rec.get("date", "")
+        entry["last_date"] = rec.get("date") or entry.get("last_date", "")
+        entry["last_markets"] = rec.get("markets")
+        entry["points"].append([offset, length])
+        entry["points"] = entry["points"][-MAX_POINTS_PER_FIXTURE:]
+
+    # -------------------------
+    # SCRITTURA
+    # -------------------------
+    def append_point(self, fixture_id, match_name, country, league, day_date, day_num, label, markets, ts,
+                     first_date=None, force=False):
+        """
+        Appende un punto se le quote sono cambiate rispetto all'ultimo (o se force).
+        True = aggiornato, False = invariato.
+        """
+        fid = str(fixture_id)
+        entry = self.fixtures.get(fid)
+        if not force and entry is not None and entry.get("last_markets") == markets:
+            for key, value in zip(META_KEYS, (match_name, country, league)):
+                entry[key] = value or entry.get(key, "")
+            return False
+
+        rec = {
+            "fixture_id": fid,
+            "match": match_name,
+            "country": country,
+            "league": league,
+            "first_date": first_date or (entry.get("first_date") if entry else day_date),
+            "ts": ts,
+            "label": label,
+            "day": day_num,
+            "date": day_date,
+            "markets": markets,
+        }
+        line = (json.dumps(rec, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+
+        self.close()
+        with open(self.log_path, "ab") as f:
+            offset = f.tell()
+            f.write(line)
+
+        self.log_bytes = offset + len(line)
+        self._index_point(rec, offset, len(line))
+        self.appended += 1
+        return True
+
+    # -------------------------
+    # LETTURA
+    # -------------------------
+    def _read_at(self, offset, length):
+        if self.reader is None:
+            self.reader = open(self.log_path, "rb")
+        self.reader.seek(offset)
+        return json.loads(self.reader.read(length).decode("utf-8"))
+
+    def get(self, fixture_id, default=None):
+        """
+        Record nel formato di quote_history.json, letto dal log solo per questo fixture.
+        """
+        entry = self.fixtures.get(str(fixture_id))
+        if not entry:
+            return default
+
+        history = []
+        for offset, length in entry["points"]:
+            rec = self._read_at(offset, length)
+            history.append({key: rec.get(key) for key in POINT_KEYS})
+
+        return {
+            "fixture_id": str(fixture_id),
+            "match": entry.get("match", ""),
+            "country": entry.get("country", ""),
+            "league": entry.get("league", ""),
+            "first_date": entry.get("first_date", ""),
+            "history": history,
+        }
+
+    def __contains__(self, fixture_id):
+        return str(fixture_id) in self.fixtures
+
+    def __len__(self):
+        return len(self.fixtures)
+
+    def close(self):
+        if self.reader is not None:
+            self.reader.close()
+            self.reader = None
+
+    # -------------------------
+    # MANUTENZIONE
+    # -------------------------
+    def live_bytes(self):
+        return sum(length for entry in self.fixtures.values() for _, length in entry["points"])
+
+    def expire(self, today=None):
+        """
+        Rimuove dall'indice i fixture la cui data match è passata (i punti diventano spazio morto).
+        """
+        today = today or datetime.now().strftime("%Y-%m-%d")
+        expired = [fid for fid, entry in self.fixtures.items() if (entry.get("last_date") or "9999-99-99") < today]
+        for fid in expired:
+            del self.fixtures[fid]
+        return len(expired)
+
+    def needs_compaction(self):
+        if self.log_bytes < COMPACT_MIN_BYTES:
+            return False
+        dead = self.log_bytes - self.live_bytes()
+        return dead >= self.log_bytes * COMPACT_DEAD_RATIO
+
+    def compact(self):
+        """
+        Riscrive il log con i soli punti referenziati dall'indice, nello stesso ordine.
+        """
+        live = sorted(
+            (offset, length, fid)
+            for fid, entry in self.fixtures.items()
+            for offset, length in entry["points"]
+        )
+
+        tmp = self.log_path.with_name(f"{LOG_FILE}.tmp")
+        remap = {}
+        new_offset = 0
+        with open(self.log_path, "rb") as src, open(tmp, "wb") as dst:
+            for offset, length, fid in live:
+                src.seek(offset)
+                dst.write(src.read(length))
+                remap[(offset, length)] = new_offset
+                new_offset += length
+
+        self.close()
+        before = self.log_bytes
+        os.replace(tmp, self.log_path)
+
+        for entry in self.fixtures.values():
+            entry["points"] = [[remap[(offset, length)], length] for offset, length in entry["points"]]
+        self.log_bytes = new_offset
+        self.save_index()
+        print(f"🗜️ quote_store compattato: {before / 1024:.0f} KB -> {new_offset / 1024:.0f} KB", flush=True)
+
+    # -------------------------
+    # MIGRAZIONE / EXPORT
+    # -------------------------
+    def migrate_from_json(self, path):
+        """
+        Importa quote_history.json (formato monolitico) solo se lo store non esiste ancora.
+        """
+        path = Path(path)
+        if self.index_path.exists() or self.log_path.exists() or not path.exists():
+            return 0
+
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                history_db = json.load(f)
+        except Exception as e:
+            print(f"⚠️ Migrazione quote_history saltata: {e}", flush=True)
+            return 0
+
+        imported = 0
+        for fid, rec in (history_db or {}).items():
+            if not isinstance(rec, dict):
+                continue
+            for point in rec.get("history", []) or []:
+                # stessa sequenza di punti del JSON, senza deduplica
+                self.append_point(
+                    fixture_id=rec.get("fixture_id", fid),
+                    match_name=rec.get("match", ""),
+                    country=rec.get("country", ""),
+                    league=rec.get("league", ""),
+                    day_date=point.get("date", ""),
+                    day_num=point.get("day"),
+                    label=point.get("label", ""),
+                    markets=point.get("markets", {}),
+                    ts=point.get("ts"),
+                    first_date=rec.get("first_date", ""),
+                    force=True,
+                )
+            imported += 1
+
+        self.save_index()
+        print(f"📦 quote_history.json migrato nello store: {imported} fixture, {self.appended} punti.", flush=True)
+        return imported
+
+    def export_json(self, path, fixture_ids=None):
+        """
+        Esporta nel formato di quote_history.json (per il sito): {fixture_id: record}.
+        """
+        fids = list(self.fixtures.keys()) if fixture_ids is None else [str(f) for f in fixture_ids]
+        payload = {}
+        for fid in fids:
+            rec = self.get(fid)
+            if rec:
+                payload[fid] = rec
+
+        _write_atomic(Path(path), json.dumps(payload, indent=2, ensure_ascii=False))
+        return len(payload)
+
+    def stats(self):
+        points = sum(len(entry["points"]) for entry in self.fixtures.values())
+        live = self.live_bytes()
+        return {
+            "fixtures": len(self.fixtures),
+            "points": points,
+            "log_bytes": self.log_bytes,
+            "live_bytes": live,
+            "dead_bytes": self.log_bytes - live,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manutenzione quote_store")
+    parser.add_argument("--store", default=str(DEFAULT_STORE_DIR))
+    parser.add_argument("--migrate", metavar="JSON", help="importa un quote_history.json nello store vuoto")
+    parser.add_argument("--export", metavar="JSON", help="esporta lo store nel formato quote_history.json")
+    parser.add_argument("--expire", action="store_true", help="rimuove i fixture con data match passata")
+    parser.add_argument("--compact", action="store_true", help="compatta il log")
+    parser.add_argument("--rebuild-index", action="store_true", help="ricostruisce l'indice dal log")
+    args = parser.parse_args()
+
+    store = QuoteStore(args.store)
+    try:
+        if args.rebuild_index:
+            store.rebuild_index()
+            store.save_index()
+        if args.migrate:
+            store.migrate_from_json(args.migrate)
+        if args.expire:
+            print(f"🧹 Fixture scaduti: {store.expire()}", flush=True)
+            store.save_index()
+        if args.compact:
+            store.compact()
+        if args.export:
+            print(f"📤 Esportati {store.export_json(args.export)} fixture in {args.export}", flush=True)
+        print(f"📊 quote_store: {store.stats()}", flush=True)
+    finally:
+        store.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
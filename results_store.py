@@ -0,0 +1,216 @@
+import argparse
+import os
+import sqlite3
+import sys
+import threading
+from datetime import datetime
+from pathlib import Path
+
+from api_client import DEFAULT_SCAN_WORKERS, parallel_map
+from http_cache import DEFAULT_CACHE_DIR
+
+# ==========================================
+# RESULTS STORE (SQLite)
+# - risultato per fixture: status, gol HT e FT
+# - si salvano solo le partite chiuse (FT/AET/PEN): non cambiano più, niente TTL
+# - fetch a blocchi con fixtures?ids=a-b-c (al massimo MAX_IDS_PER_CALL id per chiamata),
+#   blocchi in parallelo sotto il rate limit del client API condiviso
+# - un nuovo audit interroga l'API solo per i fixture non ancora finiti
+# ARAB_RESULTS_STORE=0 disattiva lo store, altrimenti percorso del file.
+# ==========================================
+STORE_ENV = "ARAB_RESULTS_STORE"
+DEFAULT_STORE_FILE = DEFAULT_CACHE_DIR / "results.sqlite"
+FINAL_STATUSES = ("FT", "AET", "PEN")
+MAX_IDS_PER_CALL = 20
+
+
+def store_path_from_env():
+    """
+    Percorso dello store, oppure None se disattivato.
+    """
+    raw = os.getenv(STORE_ENV, "")
+    if raw == "0":
+        return None
+    return Path(raw) if raw else DEFAULT_STORE_FILE
+
+
+def _to_int(x):
+    try:
+        return int(x) if x is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_fixture_result(f):
+    """
+    Risultato compatto di un elemento response di /fixtures:
+    status_short, HT_H, HT_A, FT_H, FT_A (FT dal fulltime, altrimenti dai goals).
+    """
+    status = (f.get("fixture", {}) or {}).get("status", {}) or {}
+    score = f.get("score", {}) or {}
+    ht = score.get("halftime", {}) or {}
+    ft = score.get("fulltime", {}) or {}
+    goals = f.get("goals", {}) or {}
+
+    ft_h = _to_int(ft.get("home"))
+    ft_a = _to_int(ft.get("away"))
+    # fallback
+    if ft_h is None:
+        ft_h = _to_int(goals.get("home"))
+    if ft_a is None:
+        ft_a = _to_int(goals.get("away"))
+
+    return {
+        "status_short": status.get("short"),
+        "HT_H": _to_int(ht.get("home")),
+        "HT_A": _to_int(ht.get("away")),
+        "FT_H": ft_h,
+        "FT_A": ft_a,
+    }
+
+
+def is_final(result):
+    return bool(result) and result.get("status_short") in FINAL_STATUSES
+
+
+class ResultsStore:
+    def __init__(self, path=DEFAULT_STORE_FILE):
+        self.path = Path(path)
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.saved = 0
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.path), check_same_thread=False, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS results (
+                fixture_id INTEGER PRIMARY KEY,
+                status TEXT NOT NULL,
+                ht_home INTEGER,
+                ht_away INTEGER,
+                ft_home INTEGER,
+                ft_away INTEGER,
+                saved_at TEXT NOT NULL
+            )
+            """
+        )
+        self.conn.commit()
+
+    def get_many(self, fixture_ids):
+        """
+        {fixture_id: risultato} per i fixture già chiusi presenti nello store.
+        """
+        ids = sorted({int(fid) for fid in fixture_ids})
+        found = {}
+        with self.lock:
+            for start in range(0, len(ids), 500):
+                chunk = ids[start:start + 500]
+                rows = self.conn.execute(
+                    "SELECT fixture_id, status, ht_home, ht_away, ft_home, ft_away FROM results "
+                    f"WHERE fixture_id IN ({','.join('?' * len(chunk))})",
+                    chunk
+                ).fetchall()
+                for fid, status, ht_h, ht_a, ft_h, ft_a in rows:
+                    found[fid] = {"status_short": status, "HT_H": ht_h, "HT_A": ht_a, "FT_H": ft_h, "FT_A": ft_a}
+            self.hits += len(found)
+            self.misses += len(ids) - len(found)
+        return found
+
+    def put_many(self, results):
+        """
+        Salva i risultati definitivi ({fixture_id: risultato}); gli altri vengono ignorati.
+        """
+        saved_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        rows = [
+            (int(fid), r["status_short"], r["HT_H"], r["HT_A"], r["FT_H"], r["FT_A"], saved_at)
+            for fid, r in results.items()
+            if is_final(r)
+        ]
+        if not rows:
+            return 0
+        with self.lock, self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO results "
+                "(fixture_id, status, ht_home, ht_away, ft_home, ft_away, saved_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+        self.saved += len(rows)
+        return len(rows)
+
+    def count(self):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "saved": self.saved}
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+
+def fetch_results_batch(session, api_get, fixture_ids):
+    """
+    Una chiamata fixtures?ids= per al massimo MAX_IDS_PER_CALL fixture.
+    None se la chiamata è fallita, altrimenti {fixture_id: risultato}.
+    """
+    res = api_get(session, "fixtures", {"ids": "-".join(str(fid) for fid in fixture_ids), "timezone": "Europe/Rome"})
+    if not res:
+        return None
+    results = {}
+    for f in res.get("response", []) or []:
+        fid = _to_int((f.get("fixture", {}) or {}).get("id"))
+        if fid is not None:
+            results[fid] = parse_fixture_result(f)
+    return results
+
+
+def fetch_results(api_get, fixture_ids, store=None, workers=DEFAULT_SCAN_WORKERS, max_fetch=None, on_progress=None):
+    """
+    Risultati dei fixture richiesti: prima dallo store, poi dall'API (al massimo
+    max_fetch fixture) a blocchi di MAX_IDS_PER_CALL id, `workers` blocchi alla volta.
+    I risultati definitivi scaricati finiscono nello store.
+    on_progress(fatti, totale) dopo ogni giro di blocchi.
+    """
+    ids = list(dict.fromkeys(int(fid) for fid in fixture_ids))
+    results = store.get_many(ids) if store is not None else {}
+
+    pending = [fid for fid in ids if fid not in results]
+    if max_fetch is not None:
+        pending = pending[:max_fetch]
+    batches = [pending[i:i + MAX_IDS_PER_CALL] for i in range(0, len(pending), MAX_IDS_PER_CALL)]
+    step = max(1, int(workers))
+
+    for start in range(0, len(batches), step):
+        chunk = batches[start:start + step]
+        fetched = parallel_map(lambda sess, batch: fetch_results_batch(sess, api_get, batch), chunk, workers)
+        for found in fetched:
+            if not found:
+                continue
+            results.update(found)
+            if store is not None:
+                store.put_many(found)
+        if on_progress is not None:
+            on_progress(min(start + step, len(batches)), len(batches))
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Results store SQLite")
+    parser.add_argument("--store", default=str(DEFAULT_STORE_FILE))
+    args = parser.parse_args()
+
+    store = ResultsStore(args.store)
+    try:
+        print(f"📊 Results store: {store.count()} partite chiuse salvate", flush=True)
+    finally:
+        store.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,170 @@
+import json
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+# ==========================================
+# METRICHE DI RUN
+# - stage(nome): timer context manager, tempo e numero di passaggi per fase
+#   (fixture, quote, form squadre, scoring, store, output, GitHub...)
+# - count(nome): contatori liberi (fixture analizzati, riportati dal delta...)
+# - sorgenti: contatori cumulativi già tenuti da client API, cache e publisher;
+#   il report ne riporta solo la differenza rispetto all'inizio del run
+# - report JSON (run_report.json accanto agli output) + tabella riassuntiva su stdout
+# Con più orizzonti in parallelo i secondi di una fase sono sommati sui thread:
+# possono superare il wall time del run.
+# ==========================================
+REPORT_FILE_NAME = "run_report.json"
+
+
+def _delta(current, baseline):
+    """
+    Differenza tra due snapshot di contatori annidati (dict di numeri o di dict).
+    Le voci non numeriche (es. enabled) restano quelle attuali, gli zeri si tolgono.
+    """
+    if isinstance(current, dict):
+        baseline = baseline if isinstance(baseline, dict) else {}
+        out = {}
+        for key, value in current.items():
+            diff = _delta(value, baseline.get(key))
+            if diff not in (0, {}):
+                out[key] = diff
+        return out
+    if isinstance(current, (int, float)) and not isinstance(current, bool):
+        diff = current - (baseline if isinstance(baseline, (int, float)) else 0)
+        return round(diff, 3) if isinstance(diff, float) else diff
+    return current
+
+
+class RunMetrics:
+    def __init__(self, label):
+        self.label = label
+        self.started_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        self.t0 = time.perf_counter()
+        self.lock = threading.Lock()
+        self.stages = {}
+        self.counters = {}
+        self.sources = {}
+        self.baselines = {}
+
+    def add_source(self, name, stats_fn):
+        """
+        stats_fn() -> contatori cumulativi; lo snapshot di adesso è la base del run.
+        """
+        self.sources[name] = stats_fn
+        self.baselines[name] = stats_fn()
+
+    @contextmanager
+    def stage(self, name):
+        t_start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - t_start)
+
+    def add_time(self, name, seconds):
+        with self.lock:
+            entry = self.stages.setdefault(name, {"seconds": 0.0, "count": 0})
+            entry["seconds"] += seconds
+            entry["count"] += 1
+
+    def count(self, name, n=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def report(self, **extra):
+        with self.lock:
+            stages = {
+                name: {"seconds": round(entry["seconds"], 3), "count": entry["count"]}
+                for name, entry in self.stages.items()
+            }
+            counters = dict(self.counters)
+        report = {
+            "label": self.label,
+            "started_at": self.started_at,
+            "finished_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "wall_seconds": round(time.perf_counter() - self.t0, 3),
+            "stages": stages,
+            "counters": counters,
+        }
+        for name, stats_fn in self.sources.items():
+            report[name] = _delta(stats_fn(), self.baselines.get(name))
+        report.update(extra)
+        return report
+
+
+def load_report(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            report = json.load(f)
+        return report if isinstance(report, dict) else None
+    except Exception:
+        return None
+
+
+def print_summary(report):
+    """
+    Tabella riassuntiva: fasi ordinate per tempo, chiamate API per endpoint, cache, quota API.
+    """
+    print(f"⏱️ RUN REPORT {report.get('label', '')}: {report.get('wall_seconds', 0):.2f}s", flush=True)
+
+    stages = sorted((report.get("stages") or {}).items(), key=lambda kv: -kv[1]["seconds"])
+    if stages:
+        print(f"   {'fase':<18}{'secondi':>10}{'passaggi':>10}", flush=True)
+        for name, entry in stages:
+            print(f"   {name:<18}{entry['seconds']:>10.2f}{entry['count']:>10}", flush=True)
+
+    for name, value in (report.get("counters") or {}).items():
+        print(f"   {name:<18}{value:>10}", flush=True)
+
+    api = report.get("api") or {}
+    cache = (report.get("cache") or {}).get("by_endpoint", {})
+    labels = sorted(set(api.get("by_endpoint", {})) | set(cache))
+    if labels:
+        print(
+            f"   {'endpoint':<18}{'chiamate':>10}{'retry':>7}{'KB':>10}{'cache hit':>11}  status",
+            flush=True
+        )
+        for label in labels:
+            counts = api.get("by_endpoint", {}).get(label, {})
+            status = " ".join(f"{code}x{n}" for code, n in sorted((counts.get("status") or {}).items()))
+            print(
+                f"   {label:<18}{counts.get('calls', 0):>10}{counts.get('retries', 0):>7}"
+                f"{counts.get('bytes', 0) / 1024:>10.1f}{cache.get(label, {}).get('hits', 0):>11}  {status}",
+                flush=True
+            )
+    if "api" not in report:
+        return
+
+    print(
+        f"   totale: {api.get('calls', 0)} chiamate, {api.get('retries', 0)} retry "
+        f"({api.get('backoff_seconds', 0):.1f}s di backoff), {api.get('skipped', 0)} saltate, "
+        f"{api.get('bytes', 0) / (1024 * 1024):.2f} MB, {(report.get('cache') or {}).get('hits', 0)} hit cache",
+        flush=True
+    )
+
+    quota = report.get("api_quota") or {}
+    if quota.get("daily_remaining") is not None:
+        print(
+            f"   quota API {quota.get('day')}: {quota.get('daily_remaining')}/{quota.get('daily_limit')} "
+            f"richieste rimaste, {quota.get('minute_limit')}/minuto"
+            + (" ⚠️ sotto la riserva" if quota.get("low") else ""),
+            flush=True
+        )
+
+    github = report.get("github") or {}
+    if github.get("flushes"):
+        print(
+            f"   GitHub: {github.get('commits', 0)} commit, {github.get('files_sent', 0)} file "
+            f"in {github.get('seconds', 0):.2f}s",
+            flush=True
+        )
+
+    team_form = report.get("team_form") or {}
+    if team_form:
+        print(
+            f"   team form store: {team_form.get('hits', 0)} squadre in locale, "
+            f"{team_form.get('misses', 0)} dall'API, {team_form.get('applied', 0)} partite aggiunte",
+            flush=True
+        )
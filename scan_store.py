@@ -0,0 +1,375 @@
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import threading
+from datetime import datetime
+from pathlib import Path
+
+# ==========================================
+# SCAN STORE (SQLite)
+# - results: righe tabella (una per fixture) con colonne date/time/league/country/tag
+# - result_tags: un tag normalizzato (GOLD, BOOST, ...) per riga, indicizzato per uguaglianza
+#   (la colonna tag di results è la stringa Info intera, non indicizzata)
+# - details: dettagli match (una per fixture) con colonna date
+# - scanned: ogni fixture arrivato allo scoring (tenuto o scartato) con orario, quote e drop:
+#   base del delta refresh anche per gli scartati
+# - uno scan riscrive solo la sua data, la UI legge solo l'orizzonte selezionato
+# - seq conserva l'ordine di inserimento (stesso ordine dei vecchi dict JSON)
+# - export JSON (arab_sniper_database.json / match_details.json) come passo separato
+# ==========================================
+BASE_DIR = Path(__file__).resolve().parent
+DEFAULT_STORE_FILE = BASE_DIR / "arab_scan_store.sqlite"
+LEGACY_DB_FILE = BASE_DIR / "arab_sniper_database.json"
+LEGACY_DETAILS_FILE = BASE_DIR / "match_details.json"
+
+# tag: sottostringa del campo Info
+TAG_PATTERNS = {
+    "GOLD": "⚽⭐",
+    "BOOST": "🚀 BOOST",
+    "OVER": "⚽ OVER",
+    "PT": "🎯PT",
+    "DROP": "📉",
+    "PROBE_O": "🐟O",
+    "PROBE_G": "🐟G",
+}
+
+
+def _dumps(payload):
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":"))
+
+
+def _write_json_atomic(path, payload):
+    tmp = Path(f"{path}.tmp")
+    with open(tmp, "wb") as f:
+        f.write(json.dumps(payload, indent=4, ensure_ascii=False).encode("utf-8"))
+    os.replace(tmp, path)
+
+
+def row_country(row):
+    return str(row.get("Lega", "")).split("(")[-1].replace(")", "")
+
+
+def row_tags(row):
+    info = str(row.get("Info", "") or "")
+    return [tag for tag, pattern in TAG_PATTERNS.items() if pattern in info]
+
+
+class ScanStore:
+    def __init__(self, path=DEFAULT_STORE_FILE):
+        self.path = Path(path)
+        self.lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.path), check_same_thread=False, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS results (
+                fixture_id TEXT PRIMARY KEY,
+                date TEXT NOT NULL,
+                time TEXT NOT NULL,
+                league TEXT NOT NULL,
+                country TEXT NOT NULL,
+                tag TEXT NOT NULL,
+                seq INTEGER NOT NULL,
+                row TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_results_date ON results(date, time, seq);
+            CREATE INDEX IF NOT EXISTS idx_results_league ON results(league);
+            DROP INDEX IF EXISTS idx_results_tag;
+
+            CREATE TABLE IF NOT EXISTS result_tags (
+                fixture_id TEXT NOT NULL,
+                tag TEXT NOT NULL,
+                PRIMARY KEY (fixture_id, tag)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS idx_result_tags_tag ON result_tags(tag, fixture_id);
+
+            CREATE TABLE IF NOT EXISTS details (
+                fixture_id TEXT PRIMARY KEY,
+                date TEXT NOT NULL,
+                league TEXT NOT NULL,
+                seq INTEGER NOT NULL,
+                payload TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_details_date ON details(date, seq);
+            CREATE INDEX IF NOT EXISTS idx_details_league ON details(league);
+
+            CREATE TABLE IF NOT EXISTS scanned (
+                fixture_id TEXT PRIMARY KEY,
+                date TEXT NOT NULL,
+                time TEXT NOT NULL,
+                kept INTEGER NOT NULL,
+                drop_diff REAL,
+                markets TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_scanned_date ON scanned(date);
+            """
+        )
+        self.conn.commit()
+        self._backfill_tags()
+
+    def _backfill_tags(self):
+        """
+        Store creati prima di result_tags: tag ricavati dalle righe già salvate.
+        """
+        with self.lock, self.conn:
+            if self.conn.execute("SELECT 1 FROM result_tags LIMIT 1").fetchone():
+                return
+            rows = self.conn.execute("SELECT fixture_id, row FROM results").fetchall()
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO result_tags (fixture_id, tag) VALUES (?, ?)",
+                [(fid, tag) for fid, row in rows for tag in row_tags(json.loads(row))]
+            )
+
+    # -------------------------
+    # SCRITTURA
+    # -------------------------
+    def _next_seq(self, table):
+        return self.conn.execute(f"SELECT COALESCE(MAX(seq), 0) + 1 FROM {table}").fetchone()[0]
+
+    def replace_day(self, target_date, rows, details, scanned=None):
+        """
+        Scrive l'esito di uno scan per target_date in una sola transazione:
+        - results: via le righe della data non più presenti, upsert delle nuove
+        - details: solo upsert (come il vecchio match_details.json)
+        - scanned ({fixture_id: {"time", "kept", "drop_diff", "markets"}}): se passato,
+          sostituisce quello della data
+        Un fixture già presente mantiene la sua posizione, i nuovi vanno in coda.
+        """
+        keep_ids = [str(r["Fixture_ID"]) for r in rows]
+
+        with self.lock, self.conn:
+            existing = [
+                fid for (fid,) in self.conn.execute(
+                    "SELECT fixture_id FROM results WHERE date = ?", (target_date,)
+                )
+            ]
+            keep = set(keep_ids)
+            removed = [(fid,) for fid in existing if fid not in keep]
+            self.conn.executemany("DELETE FROM results WHERE fixture_id = ?", removed)
+            self.conn.executemany("DELETE FROM result_tags WHERE fixture_id = ?", removed)
+            self.conn.executemany("DELETE FROM result_tags WHERE fixture_id = ?", [(fid,) for fid in keep_ids])
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO result_tags (fixture_id, tag) VALUES (?, ?)",
+                [(fid, tag) for fid, row in zip(keep_ids, rows) for tag in row_tags(row)]
+            )
+
+            seq = self._next_seq("results")
+            for fid, row in zip(keep_ids, rows):
+                self.conn.execute(
+                    "INSERT INTO results (fixture_id, date, time, league, country, tag, seq, row) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT(fixture_id) DO UPDATE SET date = excluded.date, time = excluded.time, "
+                    "league = excluded.league, country = excluded.country, tag = excluded.tag, row = excluded.row",
+                    (
+                        fid,
+                        row.get("Data", ""),
+                        row.get("Ora", "99:99"),
+                        row.get("Lega", ""),
+                        row_country(row),
+                        row.get("Info", ""),
+                        seq,
+                        _dumps(row),
+                    )
+                )
+                seq += 1
+
+            # il vecchio DB veniva riordinato per (data, ora) a ogni salvataggio:
+            # seq rinumerato nello stesso ordine, così i pari merito restano dove erano
+            ordered = self.conn.execute("SELECT fixture_id FROM results ORDER BY date, time, seq").fetchall()
+            self.conn.executemany(
+                "UPDATE results SET seq = ? WHERE fixture_id = ?",
+                [(pos, fid) for pos, (fid,) in enumerate(ordered, start=1)]
+            )
+
+            seq = self._next_seq("details")
+            for fid, detail in details.items():
+                self.conn.execute(
+                    "INSERT INTO details (fixture_id, date, league, seq, payload) VALUES (?, ?, ?, ?, ?) "
+                    "ON CONFLICT(fixture_id) DO UPDATE SET date = excluded.date, league = excluded.league, "
+                    "payload = excluded.payload",
+                    (str(fid), detail.get("date", ""), detail.get("league", ""), seq, _dumps(detail))
+                )
+                seq += 1
+
+            if scanned is not None:
+                self.conn.execute("DELETE FROM scanned WHERE date = ?", (target_date,))
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO scanned (fixture_id, date, time, kept, drop_diff, markets) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    [
+                        (str(fid), target_date, entry["time"], int(bool(entry["kept"])), entry["drop_diff"],
+                         _dumps(entry["markets"]))
+                        for fid, entry in scanned.items()
+                    ]
+                )
+
+    def expire(self, today):
+        """
+        Elimina righe e dettagli con data match passata.
+        """
+        with self.lock, self.conn:
+            self.conn.execute(
+                "DELETE FROM result_tags WHERE fixture_id IN (SELECT fixture_id FROM results WHERE date < ?)",
+                (today,)
+            )
+            removed = self.conn.execute("DELETE FROM results WHERE date < ?", (today,)).rowcount
+            self.conn.execute("DELETE FROM details WHERE date < ?", (today,))
+            self.conn.execute("DELETE FROM scanned WHERE date < ?", (today,))
+        return removed
+
+    # -------------------------
+    # LETTURA
+    # -------------------------
+    def results_for_date(self, target_date):
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT row FROM results WHERE date = ? ORDER BY time, seq", (target_date,)
+            ).fetchall()
+        return [json.loads(r[0]) for r in rows]
+
+    def results_for_tag(self, tag, target_date=None):
+        """
+        Righe con il tag normalizzato (chiave di TAG_PATTERNS), opzionalmente di una sola data.
+        """
+        query = (
+            "SELECT r.row FROM result_tags t JOIN results r ON r.fixture_id = t.fixture_id "
+            "WHERE t.tag = ?"
+        )
+        params = [tag]
+        if target_date is not None:
+            query += " AND r.date = ?"
+            params.append(target_date)
+        with self.lock:
+            rows = self.conn.execute(query + " ORDER BY r.date, r.time, r.seq", params).fetchall()
+        return [json.loads(r[0]) for r in rows]
+
+    def details_for_date(self, target_date):
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT fixture_id, payload FROM details WHERE date = ? ORDER BY seq", (target_date,)
+            ).fetchall()
+        return {fid: json.loads(payload) for fid, payload in rows}
+
+    def scanned_for_date(self, target_date):
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT fixture_id, time, kept, drop_diff, markets FROM scanned WHERE date = ?", (target_date,)
+            ).fetchall()
+        return {
+            fid: {"time": time, "kept": bool(kept), "drop_diff": drop_diff, "markets": json.loads(markets)}
+            for fid, time, kept, drop_diff, markets in rows
+        }
+
+    def get_detail(self, fixture_id):
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT payload FROM details WHERE fixture_id = ?", (str(fixture_id),)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def countries(self, from_date=""):
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT DISTINCT country FROM results WHERE date >= ?", (from_date,)
+            ).fetchall()
+        return {r[0] for r in rows}
+
+    def count(self, target_date=None):
+        with self.lock:
+            if target_date is None:
+                return self.conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+            return self.conn.execute(
+                "SELECT COUNT(*) FROM results WHERE date = ?", (target_date,)
+            ).fetchone()[0]
+
+    def is_empty(self):
+        with self.lock:
+            return not any(
+                self.conn.execute(f"SELECT 1 FROM {table} LIMIT 1").fetchone()
+                for table in ("results", "details")
+            )
+
+    # -------------------------
+    # MIGRAZIONE / EXPORT
+    # -------------------------
+    def import_legacy_json(self, db_file=LEGACY_DB_FILE, details_file=LEGACY_DETAILS_FILE, today=""):
+        """
+        Importa arab_sniper_database.json e match_details.json solo se lo store è vuoto.
+        """
+        if not self.is_empty():
+            return 0
+
+        try:
+            with open(db_file, "r", encoding="utf-8") as f:
+                results = [r for r in json.load(f).get("results", []) if r.get("Data", "") >= today]
+        except Exception:
+            results = []
+
+        try:
+            with open(details_file, "r", encoding="utf-8") as f:
+                details = json.load(f).get("details", {}) or {}
+        except Exception:
+            details = {}
+
+        if not results and not details:
+            return 0
+
+        by_date = {}
+        for r in results:
+            by_date.setdefault(r.get("Data", ""), ([], {}))[0].append(r)
+        for fid, detail in details.items():
+            by_date.setdefault(detail.get("date", ""), ([], {}))[1][fid] = detail
+        for target_date, (rows, day_details) in by_date.items():
+            self.replace_day(target_date, rows, day_details)
+
+        print(f"📦 Scan store: importate {len(results)} righe e {len(details)} dettagli dai JSON.", flush=True)
+        return len(results)
+
+    def export_json(self, db_file=LEGACY_DB_FILE, details_file=LEGACY_DETAILS_FILE, updated_at=None):
+        """
+        Rigenera i JSON completi (stesso formato di prima) a partire dallo store.
+        """
+        with self.lock:
+            rows = self.conn.execute("SELECT row FROM results ORDER BY date, time, seq").fetchall()
+            details = self.conn.execute("SELECT fixture_id, payload FROM details ORDER BY seq").fetchall()
+
+        _write_json_atomic(db_file, {"results": [json.loads(r[0]) for r in rows]})
+        _write_json_atomic(details_file, {
+            "updated_at": updated_at or datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "details": {fid: json.loads(payload) for fid, payload in details},
+        })
+        return len(rows), len(details)
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scan store SQLite")
+    parser.add_argument("--store", default=str(DEFAULT_STORE_FILE))
+    parser.add_argument("--export", action="store_true", help="rigenera arab_sniper_database.json e match_details.json")
+    parser.add_argument("--db-file", default=str(LEGACY_DB_FILE))
+    parser.add_argument("--details-file", default=str(LEGACY_DETAILS_FILE))
+    parser.add_argument("--tag", choices=list(TAG_PATTERNS), help="conta le righe con questo tag")
+    args = parser.parse_args()
+
+    store = ScanStore(args.store)
+    try:
+        if args.export:
+            n_rows, n_details = store.export_json(args.db_file, args.details_file)
+            print(f"📤 Export: {n_rows} righe -> {args.db_file}, {n_details} dettagli -> {args.details_file}", flush=True)
+        print(f"📊 Scan store: {store.count()} righe", flush=True)
+        if args.tag:
+            print(f"🏷️ {args.tag}: {len(store.results_for_tag(args.tag))} righe", flush=True)
+    finally:
+        store.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,667 @@
+import argparse
+import glob
+import json
+import sys
+
+import numpy as np
+
+# ==========================================
+# SCORING ENGINE V24.1
+# - funzioni scalari: implementazione di riferimento (una partita alla volta)
+# - score_batch: stesso calcolo su N partite con array NumPy colonnari,
+#   per ri-valutare lo storico quando si ritoccano le soglie
+# ==========================================
+DEFAULT_THRESHOLDS = {
+    "pt_tag": 4.1,
+    "over_tag": 4.0,
+    "boost_min": 5.85,
+    "boost_pt_min": 4.00,
+    "boost_over_min": 4.15,
+    "boost_ht_min": 1.14,
+    "gold_min": 6.75,
+    "gold_boost_min": 5.95,
+    "gold_pt_min": 4.00,
+    "gold_over_min": 4.20,
+    "drop_tag_min": 0.05,
+    "probe_keep_max": 3.4,
+}
+
+BATCH_COLUMNS = (
+    "q1", "q2", "o25", "o05ht", "o15ht",
+    "home_avg_ht", "away_avg_ht", "home_avg_ft", "away_avg_ft",
+    "home_last_2h_zero", "away_last_2h_zero", "drop_diff",
+)
+BOOL_COLUMNS = ("home_last_2h_zero", "away_last_2h_zero")
+
+
+def _thresholds(thresholds):
+    if not thresholds:
+        return DEFAULT_THRESHOLDS
+    merged = dict(DEFAULT_THRESHOLDS)
+    merged.update(thresholds)
+    return merged
+
+
+def safe_float(x, default=0.0):
+    try:
+        if x is None:
+            return default
+        if isinstance(x, (int, float)):
+            return float(x)
+        s = str(x).strip().replace(",", ".")
+        if s in ("", "-", "None", "null"):
+            return default
+        return float(s)
+    except Exception:
+        return default
+
+# ==========================================
+# SCALARE (RIFERIMENTO)
+# ==========================================
+def round3(x):
+    return round(float(x), 3)
+
+
+def symmetry_bonus(a, b, tight=0.22, medium=0.45):
+    diff = abs(float(a) - float(b))
+    if diff <= tight:
+        return 0.8
+    if diff <= medium:
+        return 0.4
+    return 0.0
+
+
+def band_score(value, core_low, core_high, soft_low=None, soft_high=None, core_pts=1.0, soft_pts=0.45):
+    v = safe_float(value, 0.0)
+    if core_low <= v <= core_high:
+        return core_pts
+    if soft_low is not None and soft_high is not None and soft_low <= v <= soft_high:
+        return soft_pts
+    return 0.0
+
+
+def score_drop(drop_diff):
+    if drop_diff >= 0.15:
+        return 1.2
+    if drop_diff >= 0.10:
+        return 0.9
+    if drop_diff >= 0.05:
+        return 0.5
+    return 0.0
+
+
+def score_pt_signal(mk, s_h, s_a, combined_ht_avg):
+    score = 0.0
+
+    score += band_score(combined_ht_avg, 1.12, 1.70, 1.05, 1.90, core_pts=1.5, soft_pts=0.8)
+
+    if s_h["avg_ht"] >= 1.10 and s_a["avg_ht"] >= 1.10:
+        score += 1.6
+    elif (s_h["avg_ht"] >= 1.25 and s_a["avg_ht"] >= 0.95) or (s_a["avg_ht"] >= 1.25 and s_h["avg_ht"] >= 0.95):
+        score += 1.0
+
+    score += symmetry_bonus(s_h["avg_ht"], s_a["avg_ht"], tight=0.20, medium=0.40)
+
+    score += band_score(mk["o05ht"], 1.20, 1.40, 1.15, 1.48, core_pts=1.6, soft_pts=0.7)
+    score += band_score(mk["o15ht"], 2.00, 3.60, 1.80, 4.20, core_pts=0.8, soft_pts=0.3)
+
+    if s_h["last_2h_zero"] or s_a["last_2h_zero"]:
+        score += 0.8
+
+    if s_h["avg_total"] >= 1.20 and s_a["avg_total"] >= 1.20:
+        score += 0.5
+
+    return round3(score)
+
+
+def score_over_signal(mk, s_h, s_a, combined_ht_avg, fav, drop_diff):
+    score = 0.0
+
+    if s_h["avg_total"] >= 1.55 and s_a["avg_total"] >= 1.55:
+        score += 2.2
+    elif s_h["avg_total"] >= 1.45 and s_a["avg_total"] >= 1.45:
+        score += 1.4
+    elif (s_h["avg_total"] >= 1.80 and s_a["avg_total"] >= 1.20) or (s_a["avg_total"] >= 1.80 and s_h["avg_total"] >= 1.20):
+        score += 1.0
+
+    score += symmetry_bonus(s_h["avg_total"], s_a["avg_total"], tight=0.28, medium=0.50)
+
+    score += band_score(mk["o25"], 1.51, 2.37, 1.40, 2.55, core_pts=1.8, soft_pts=0.8)
+
+    if combined_ht_avg >= 1.10:
+        score += 0.7
+    if combined_ht_avg >= 1.20:
+        score += 0.3
+
+    if 1.35 <= fav <= 2.20:
+        score += 0.4
+
+    score += score_drop(drop_diff) * 0.7
+
+    return round3(score)
+
+
+def score_boost_signal(mk, s_h, s_a, pt_score, over_score, drop_diff, combined_ht_avg):
+    score = 0.0
+    score += pt_score * 0.38
+    score += over_score * 0.48
+
+    if (s_h["avg_ht"] >= 1.30 and s_a["avg_ht"] >= 1.00) or (s_a["avg_ht"] >= 1.30 and s_h["avg_ht"] >= 1.00):
+        score += 0.55
+    elif s_h["avg_ht"] >= 1.15 and s_a["avg_ht"] >= 1.15:
+        score += 0.35
+
+    if s_h["avg_total"] >= 1.65 and s_a["avg_total"] >= 1.65:
+        score += 0.55
+    elif (s_h["avg_total"] >= 1.95 and s_a["avg_total"] >= 1.35) or (s_a["avg_total"] >= 1.95 and s_h["avg_total"] >= 1.35):
+        score += 0.25
+
+    if 1.60 <= mk["o25"] <= 2.12 and 1.22 <= mk["o05ht"] <= 1.36:
+        score += 0.55
+    elif 1.55 <= mk["o25"] <= 2.20 and 1.20 <= mk["o05ht"] <= 1.38:
+        score += 0.20
+
+    if combined_ht_avg >= 1.16:
+        score += 0.35
+
+    score += score_drop(drop_diff) * 0.45
+    return round3(score)
+
+
+def score_gold_signal(mk, s_h, s_a, pt_score, over_score, boost_score, fav, drop_diff, is_gold_zone, combined_ht_avg):
+    score = 0.0
+    score += pt_score * 0.22
+    score += over_score * 0.30
+    score += boost_score * 0.34
+
+    if is_gold_zone:
+        score += 0.85
+
+    if combined_ht_avg >= 1.18 and s_h["avg_total"] >= 1.55 and s_a["avg_total"] >= 1.50:
+        score += 0.45
+
+    if 1.42 <= fav <= 1.82:
+        score += 0.35
+
+    if drop_diff >= 0.10:
+        score += 0.55
+    elif drop_diff >= 0.05:
+        score += 0.25
+
+    return round3(score)
+
+
+def build_signal_package(mk, s_h, s_a, combined_ht_avg, drop_diff=0.0, thresholds=None):
+    """
+    Punteggi, tag e flag di una partita. `drop_diff` arriva dal chiamante
+    (lo snapshot quote vive nello stato dell'app, non qui).
+    """
+    th = _thresholds(thresholds)
+    fav = min(mk["q1"], mk["q2"])
+    is_gold_zone = (1.40 <= fav <= 1.90)
+
+    pt_score = score_pt_signal(mk, s_h, s_a, combined_ht_avg)
+    over_score = score_over_signal(mk, s_h, s_a, combined_ht_avg, fav, drop_diff)
+    boost_score = score_boost_signal(mk, s_h, s_a, pt_score, over_score, drop_diff, combined_ht_avg)
+    gold_score = score_gold_signal(mk, s_h, s_a, pt_score, over_score, boost_score, fav, drop_diff, is_gold_zone, combined_ht_avg)
+
+    tags = []
+    probe_tags = []
+
+    if (fav < 1.75) and (s_h["avg_total"] >= 1.0 and s_a["avg_total"] >= 1.0):
+        probe_tags.append("🐟O")
+
+    if (2.0 <= mk["q1"] <= 3.5) and (2.0 <= mk["q2"] <= 3.5) and (s_h["avg_total"] >= 1.0 and s_a["avg_total"] >= 1.0):
+        probe_tags.append("🐟G")
+
+    if pt_score >= th["pt_tag"]:
+        tags.append("🎯PT")
+
+    if over_score >= th["over_tag"]:
+        tags.append("⚽ OVER")
+
+    boost_gate_ht = (
+        (s_h["avg_ht"] >= 1.28 and s_a["avg_ht"] >= 1.00) or
+        (s_a["avg_ht"] >= 1.28 and s_h["avg_ht"] >= 1.00) or
+        (s_h["avg_ht"] >= 1.12 and s_a["avg_ht"] >= 1.12)
+    )
+    boost_gate_ft = (
+        (s_h["avg_total"] >= 1.60 and s_a["avg_total"] >= 1.55) or
+        (s_a["avg_total"] >= 1.60 and s_h["avg_total"] >= 1.55)
+    )
+    boost_gate_market = (1.58 <= mk["o25"] <= 2.18 and 1.21 <= mk["o05ht"] <= 1.37)
+    ft_convergence = (
+        (s_h["avg_total"] >= 1.45 and s_a["avg_total"] >= 1.45)
+        or
+        (s_h["avg_total"] >= 1.80 and s_a["avg_total"] >= 1.20)
+        or
+        (s_a["avg_total"] >= 1.80 and s_h["avg_total"] >= 1.20)
+    )
+
+    if (
+        boost_score >= th["boost_min"]
+        and pt_score >= th["boost_pt_min"]
+        and over_score >= th["boost_over_min"]
+        and combined_ht_avg >= th["boost_ht_min"]
+        and boost_gate_ht
+        and boost_gate_ft
+        and boost_gate_market
+        and ft_convergence
+    ):
+        tags.append("🚀 BOOST")
+
+    gold_gate_core = (
+        (s_h["avg_total"] >= 1.55 and s_a["avg_total"] >= 1.50)
+        and (s_h["avg_ht"] >= 1.05 and s_a["avg_ht"] >= 1.05)
+        and combined_ht_avg >= 1.16
+    )
+    gold_gate_quote = (1.42 <= fav <= 1.85)
+    gold_gate_extra = (
+        drop_diff >= 0.05 or
+        (
+            s_h["avg_total"] >= 1.75 and
+            s_a["avg_total"] >= 1.65 and
+            combined_ht_avg >= 1.20
+        )
+    )
+
+    if (
+        gold_score >= th["gold_min"]
+        and boost_score >= th["gold_boost_min"]
+        and pt_score >= th["gold_pt_min"]
+        and over_score >= th["gold_over_min"]
+        and is_gold_zone
+        and gold_gate_core
+        and gold_gate_quote
+        and gold_gate_extra
+    ):
+        tags.insert(0, "⚽⭐ GOLD")
+
+    if drop_diff >= th["drop_tag_min"]:
+        tags.append(f"📉-{drop_diff:.2f}")
+
+    tags.extend(probe_tags)
+
+    primary_signal_count = sum(1 for t in tags if any(k in t for k in ["GOLD", "BOOST", "OVER", "PT"]))
+    max_score = max(pt_score, over_score, boost_score, gold_score)
+
+    return {
+        "tags": tags,
+        "scores": {
+            "pt": pt_score,
+            "over": over_score,
+            "boost": boost_score,
+            "gold": gold_score,
+            "max": round3(max_score),
+        },
+        "drop_diff": round3(drop_diff),
+        "fav_quote": round3(fav),
+        "is_gold_zone": is_gold_zone,
+        "primary_signal_count": primary_signal_count
+    }
+
+
+def should_keep_match(signal_pack, thresholds=None):
+    th = _thresholds(thresholds)
+    if signal_pack["primary_signal_count"] >= 1:
+        return True
+
+    has_probe = any(t in signal_pack["tags"] for t in ["🐟O", "🐟G"])
+    if has_probe and signal_pack["scores"]["max"] >= th["probe_keep_max"]:
+        return True
+
+    return False
+
+# ==========================================
+# BATCH (NUMPY)
+# Stesso ordine delle somme dello scalare: i float64 coincidono bit a bit.
+# ==========================================
+def _round3_array(values):
+    """
+    round(x, 3) di Python su array. k / 1000 con k intero è già il float più vicino,
+    quindi basta ripiegare su round() solo dove x * 1000 cade vicino al .5.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    scaled = values * 1000.0
+    k = np.rint(scaled)
+    out = k / 1000.0
+    for i in np.flatnonzero(np.abs(np.abs(scaled - k) - 0.5) < 1e-6):
+        out[i] = round(float(values[i]), 3)
+    return out
+
+
+def _band_array(v, core_low, core_high, soft_low, soft_high, core_pts, soft_pts):
+    core = (core_low <= v) & (v <= core_high)
+    soft = (soft_low <= v) & (v <= soft_high)
+    return np.where(core, core_pts, np.where(soft, soft_pts, 0.0))
+
+
+def _symmetry_array(a, b, tight, medium):
+    diff = np.abs(a - b)
+    return np.where(diff <= tight, 0.8, np.where(diff <= medium, 0.4, 0.0))
+
+
+def _drop_array(drop_diff):
+    return np.where(
+        drop_diff >= 0.15, 1.2,
+        np.where(drop_diff >= 0.10, 0.9, np.where(drop_diff >= 0.05, 0.5, 0.0))
+    )
+
+
+def _between(v, low, high):
+    return (low <= v) & (v <= high)
+
+
+def to_columns(rows):
+    """
+    Da lista di dict (chiavi BATCH_COLUMNS) ad array colonnari.
+    Valori mancanti: 0.0 / False, come safe_float nello scalare.
+    """
+    columns = {}
+    for name in BATCH_COLUMNS:
+        if name in BOOL_COLUMNS:
+            columns[name] = np.array([bool(r.get(name)) for r in rows], dtype=bool)
+        else:
+            columns[name] = np.array([safe_float(r.get(name), 0.0) for r in rows], dtype=np.float64)
+    return columns
+
+
+def score_batch(columns, thresholds=None):
+    """
+    Punteggi pt/over/boost/gold, gate e tag di N partite in un passaggio.
+    `columns`: dict di array lunghi N con le chiavi di BATCH_COLUMNS
+    (combined_ht_avg opzionale, altrimenti media HT casa/trasferta).
+    Restituisce array per punteggi e maschere; batch_tags() ricostruisce i tag.
+    """
+    scores = batch_scores(columns)
+    result = {k: v for k, v in scores.items() if not k.startswith("_")}
+    result.update(batch_gates(scores, thresholds))
+    return result
+
+
+def batch_scores(columns):
+    """
+    Parte di score_batch che non dipende dalle soglie: punteggi e gate fissi.
+    Le chiavi con "_" iniziale servono solo a batch_gates().
+    """
+    col = {k: np.asarray(v) for k, v in columns.items()}
+
+    q1 = col["q1"].astype(np.float64)
+    q2 = col["q2"].astype(np.float64)
+    o25 = col["o25"].astype(np.float64)
+    o05ht = col["o05ht"].astype(np.float64)
+    o15ht = col["o15ht"].astype(np.float64)
+    h_ht = col["home_avg_ht"].astype(np.float64)
+    a_ht = col["away_avg_ht"].astype(np.float64)
+    h_ft = col["home_avg_ft"].astype(np.float64)
+    a_ft = col["away_avg_ft"].astype(np.float64)
+    h_zero = col["home_last_2h_zero"].astype(bool)
+    a_zero = col["away_last_2h_zero"].astype(bool)
+    n = len(q1)
+    drop_diff = col["drop_diff"].astype(np.float64) if "drop_diff" in col else np.zeros(n)
+    combined = col["combined_ht_avg"].astype(np.float64) if "combined_ht_avg" in col else (h_ht + a_ht) / 2
+
+    fav = np.minimum(q1, q2)
+    is_gold_zone = _between(fav, 1.40, 1.90)
+    drop_pts = _drop_array(drop_diff)
+
+    # PT
+    pt = np.zeros(n)
+    pt += _band_array(combined, 1.12, 1.70, 1.05, 1.90, 1.5, 0.8)
+    pt += np.where(
+        (h_ht >= 1.10) & (a_ht >= 1.10), 1.6,
+        np.where(((h_ht >= 1.25) & (a_ht >= 0.95)) | ((a_ht >= 1.25) & (h_ht >= 0.95)), 1.0, 0.0)
+    )
+    pt += _symmetry_array(h_ht, a_ht, 0.20, 0.40)
+    pt += _band_array(o05ht, 1.20, 1.40, 1.15, 1.48, 1.6, 0.7)
+    pt += _band_array(o15ht, 2.00, 3.60, 1.80, 4.20, 0.8, 0.3)
+    pt += np.where(h_zero | a_zero, 0.8, 0.0)
+    pt += np.where((h_ft >= 1.20) & (a_ft >= 1.20), 0.5, 0.0)
+    pt = _round3_array(pt)
+
+    # OVER
+    over = np.zeros(n)
+    over += np.where(
+        (h_ft >= 1.55) & (a_ft >= 1.55), 2.2,
+        np.where(
+            (h_ft >= 1.45) & (a_ft >= 1.45), 1.4,
+            np.where(((h_ft >= 1.80) & (a_ft >= 1.20)) | ((a_ft >= 1.80) & (h_ft >= 1.20)), 1.0, 0.0)
+        )
+    )
+    over += _symmetry_array(h_ft, a_ft, 0.28, 0.50)
+    over += _band_array(o25, 1.51, 2.37, 1.40, 2.55, 1.8, 0.8)
+    over += np.where(combined >= 1.10, 0.7, 0.0)
+    over += np.where(combined >= 1.20, 0.3, 0.0)
+    over += np.where(_between(fav, 1.35, 2.20), 0.4, 0.0)
+    over += drop_pts * 0.7
+    over = _round3_array(over)
+
+    # BOOST
+    boost = np.zeros(n)
+    boost += pt * 0.38
+    boost += over * 0.48
+    boost += np.where(
+        ((h_ht >= 1.30) & (a_ht >= 1.00)) | ((a_ht >= 1.30) & (h_ht >= 1.00)), 0.55,
+        np.where((h_ht >= 1.15) & (a_ht >= 1.15), 0.35, 0.0)
+    )
+    boost += np.where(
+        (h_ft >= 1.65) & (a_ft >= 1.65), 0.55,
+        np.where(((h_ft >= 1.95) & (a_ft >= 1.35)) | ((a_ft >= 1.95) & (h_ft >= 1.35)), 0.25, 0.0)
+    )
+    boost += np.where(
+        _between(o25, 1.60, 2.12) & _between(o05ht, 1.22, 1.36), 0.55,
+        np.where(_between(o25, 1.55, 2.20) & _between(o05ht, 1.20, 1.38), 0.20, 0.0)
+    )
+    boost += np.where(combined >= 1.16, 0.35, 0.0)
+    boost += drop_pts * 0.45
+    boost = _round3_array(boost)
+
+    # GOLD
+    gold = np.zeros(n)
+    gold += pt * 0.22
+    gold += over * 0.30
+    gold += boost * 0.34
+    gold += np.where(is_gold_zone, 0.85, 0.0)
+    gold += np.where((combined >= 1.18) & (h_ft >= 1.55) & (a_ft >= 1.50), 0.45, 0.0)
+    gold += np.where(_between(fav, 1.42, 1.82), 0.35, 0.0)
+    gold += np.where(drop_diff >= 0.10, 0.55, np.where(drop_diff >= 0.05, 0.25, 0.0))
+    gold = _round3_array(gold)
+
+    # GATE FISSI (senza soglie)
+    both_ft_1 = (h_ft >= 1.0) & (a_ft >= 1.0)
+    probe_o = (fav < 1.75) & both_ft_1
+    probe_g = _between(q1, 2.0, 3.5) & _between(q2, 2.0, 3.5) & both_ft_1
+
+    boost_gate_ht = ((h_ht >= 1.28) & (a_ht >= 1.00)) | ((a_ht >= 1.28) & (h_ht >= 1.00)) | ((h_ht >= 1.12) & (a_ht >= 1.12))
+    boost_gate_ft = ((h_ft >= 1.60) & (a_ft >= 1.55)) | ((a_ft >= 1.60) & (h_ft >= 1.55))
+    boost_gate_market = _between(o25, 1.58, 2.18) & _between(o05ht, 1.21, 1.37)
+    ft_convergence = ((h_ft >= 1.45) & (a_ft >= 1.45)) | ((h_ft >= 1.80) & (a_ft >= 1.20)) | ((a_ft >= 1.80) & (h_ft >= 1.20))
+
+    gold_gate_core = (h_ft >= 1.55) & (a_ft >= 1.50) & (h_ht >= 1.05) & (a_ht >= 1.05) & (combined >= 1.16)
+    gold_gate_quote = _between(fav, 1.42, 1.85)
+    gold_gate_extra = (drop_diff >= 0.05) | ((h_ft >= 1.75) & (a_ft >= 1.65) & (combined >= 1.20))
+
+    return {
+        "pt": pt,
+        "over": over,
+        "boost": boost,
+        "gold": gold,
+        "max": _round3_array(np.maximum(np.maximum(pt, over), np.maximum(boost, gold))),
+        "drop_diff": _round3_array(drop_diff),
+        "raw_drop_diff": drop_diff,
+        "fav_quote": _round3_array(fav),
+        "is_gold_zone": is_gold_zone,
+        "probe_o": probe_o,
+        "probe_g": probe_g,
+        "_combined": combined,
+        "_boost_gate": boost_gate_ht & boost_gate_ft & boost_gate_market & ft_convergence,
+        "_gold_gate": is_gold_zone & gold_gate_core & gold_gate_quote & gold_gate_extra,
+    }
+
+
+def batch_gates(scores, thresholds=None):
+    """
+    Tag e keep dai punteggi di batch_scores(). Le soglie possono essere anche array
+    di forma (C, 1): le maschere escono (C, N), una riga per configurazione.
+    """
+    th = _thresholds(thresholds)
+    pt, over, boost, gold = scores["pt"], scores["over"], scores["boost"], scores["gold"]
+
+    tag_pt = pt >= th["pt_tag"]
+    tag_over = over >= th["over_tag"]
+    tag_boost = (
+        (boost >= th["boost_min"]) & (pt >= th["boost_pt_min"]) & (over >= th["boost_over_min"])
+        & (scores["_combined"] >= th["boost_ht_min"])
+        & scores["_boost_gate"]
+    )
+    tag_gold = (
+        (gold >= th["gold_min"]) & (boost >= th["gold_boost_min"]) & (pt >= th["gold_pt_min"])
+        & (over >= th["gold_over_min"])
+        & scores["_gold_gate"]
+    )
+    tag_drop = scores["raw_drop_diff"] >= th["drop_tag_min"]
+
+    primary_signal_count = tag_gold.astype(int) + tag_pt + tag_over + tag_boost
+    keep = (primary_signal_count >= 1) | ((scores["probe_o"] | scores["probe_g"]) & (scores["max"] >= th["probe_keep_max"]))
+
+    return {
+        "tag_gold": tag_gold,
+        "tag_pt": tag_pt,
+        "tag_over": tag_over,
+        "tag_boost": tag_boost,
+        "tag_drop": tag_drop,
+        "primary_signal_count": primary_signal_count,
+        "keep": keep,
+    }
+
+
+def batch_tags(result, i):
+    """
+    Tag della partita i nello stesso ordine di build_signal_package.
+    """
+    tags = []
+    if result["tag_gold"][i]:
+        tags.append("⚽⭐ GOLD")
+    if result["tag_pt"][i]:
+        tags.append("🎯PT")
+    if result["tag_over"][i]:
+        tags.append("⚽ OVER")
+    if result["tag_boost"][i]:
+        tags.append("🚀 BOOST")
+    if result["tag_drop"][i]:
+        tags.append(f"📉-{float(result['raw_drop_diff'][i]):.2f}")
+    if result["probe_o"][i]:
+        tags.append("🐟O")
+    if result["probe_g"][i]:
+        tags.append("🐟G")
+    return tags
+
+
+def batch_signal_package(result, i):
+    """
+    Riporta la riga i del batch nel formato dict di build_signal_package.
+    """
+    return {
+        "tags": batch_tags(result, i),
+        "scores": {
+            "pt": float(result["pt"][i]),
+            "over": float(result["over"][i]),
+            "boost": float(result["boost"][i]),
+            "gold": float(result["gold"][i]),
+            "max": float(result["max"][i]),
+        },
+        "drop_diff": float(result["drop_diff"][i]),
+        "fav_quote": float(result["fav_quote"][i]),
+        "is_gold_zone": bool(result["is_gold_zone"][i]),
+        "primary_signal_count": int(result["primary_signal_count"][i])
+    }
+
+# ==========================================
+# VERIFICA BATCH vs SCALARE SU details_day*.json
+# ==========================================
+def rows_from_details(details):
+    """
+    Input di scoring ricostruiti dai dettagli salvati (markets, averages, flags).
+    """
+    rows = []
+    for fid, d in (details or {}).items():
+        mk = d.get("markets", {}) or {}
+        av = d.get("averages", {}) or {}
+        fl = d.get("flags", {}) or {}
+        if not mk or not av:
+            continue
+        rows.append({
+            "fixture_id": str(fid),
+            "q1": mk.get("q1"),
+            "q2": mk.get("q2"),
+            "o25": mk.get("o25"),
+            "o05ht": mk.get("o05ht"),
+            "o15ht": mk.get("o15ht"),
+            "home_avg_ht": av.get("home_avg_ht"),
+            "away_avg_ht": av.get("away_avg_ht"),
+            "home_avg_ft": av.get("home_avg_ft"),
+            "away_avg_ft": av.get("away_avg_ft"),
+            "home_last_2h_zero": fl.get("home_last_2h_zero", False),
+            "away_last_2h_zero": fl.get("away_last_2h_zero", False),
+            "drop_diff": fl.get("drop_diff", 0.0),
+        })
+    return rows
+
+
+def scalar_signal_package(row, thresholds=None):
+    mk = {k: safe_float(row.get(k), 0.0) for k in ("q1", "q2", "o25", "o05ht", "o15ht")}
+    s_h = {
+        "avg_ht": safe_float(row.get("home_avg_ht"), 0.0),
+        "avg_total": safe_float(row.get("home_avg_ft"), 0.0),
+        "last_2h_zero": bool(row.get("home_last_2h_zero")),
+    }
+    s_a = {
+        "avg_ht": safe_float(row.get("away_avg_ht"), 0.0),
+        "avg_total": safe_float(row.get("away_avg_ft"), 0.0),
+        "last_2h_zero": bool(row.get("away_last_2h_zero")),
+    }
+    combined_ht_avg = (s_h["avg_ht"] + s_a["avg_ht"]) / 2
+    return build_signal_package(mk, s_h, s_a, combined_ht_avg, safe_float(row.get("drop_diff"), 0.0), thresholds)
+
+
+def verify_files(paths, thresholds=None):
+    rows = []
+    for path in paths:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                rows.extend(rows_from_details(json.load(f).get("details", {})))
+        except Exception as e:
+            print(f"⚠️ {path}: {e}", flush=True)
+
+    if not rows:
+        print("⚠️ Nessun fixture da verificare.", flush=True)
+        return 0
+
+    result = score_batch(to_columns(rows), thresholds)
+    mismatches = 0
+    for i, row in enumerate(rows):
+        expected = scalar_signal_package(row, thresholds)
+        got = batch_signal_package(result, i)
+        if got != expected or bool(result["keep"][i]) != should_keep_match(expected, thresholds):
+            mismatches += 1
+            print(f"❌ {row['fixture_id']}: scalare={expected} batch={got}", flush=True)
+
+    print(f"✅ Verifica scoring: {len(rows) - mismatches}/{len(rows)} fixture identici", flush=True)
+    return mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scoring batch NumPy vs scalare")
+    parser.add_argument("--verify", nargs="*", metavar="FILE", help="details_day*.json da confrontare (default: tutti)")
+    args = parser.parse_args()
+
+    if args.verify is None:
+        parser.print_help()
+        return 0
+
+    paths = args.verify or sorted(glob.glob("details_day*.json"))
+    return 1 if verify_files(paths) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,1312 @@
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import requests
+
+import scoring
+from scoring import should_keep_match
+from api_client import ApiClient, DEFAULT_SCAN_WORKERS, parallel_map
+from api_replay import RECORD_ENV, REPLAY_ENV, ReplayStore
+from github_publisher import GithubPublisher, serialize_payload
+from http_cache import ResponseCache, ttl_for
+from market_parser import MarketParser, consensus_summary
+from run_metrics import REPORT_FILE_NAME, RunMetrics
+from scan_store import ScanStore
+from team_form import fetch_team_form, form_last_matches, form_performance
+from team_form_store import TeamFormStore, store_path_from_env
+
+# ==========================================
+# ARAB SNIPER V24.1 - MOTORE DI SCAN
+# API, mercati, form squadre, scoring, persistenza e pubblicazione.
+# Nessuna UI e nessun I/O all'import: cache API, scan store, snapshot
+# e config si aprono al primo uso. Front-end: 3appDays.py (Streamlit)
+# e 3appDays_runner.py (workflow).
+# ==========================================
+BASE_DIR = Path(__file__).resolve().parent
+DB_FILE = str(BASE_DIR / "arab_sniper_database.json")
+SCAN_STORE_FILE = str(BASE_DIR / "arab_scan_store.sqlite")
+SNAP_FILE = str(BASE_DIR / "arab_snapshot_database.json")
+CONFIG_FILE = str(BASE_DIR / "nazioni_config.json")
+DETAILS_FILE = str(BASE_DIR / "match_details.json")
+RUN_REPORT_FILE = str(BASE_DIR / REPORT_FILE_NAME)
+
+DEFAULT_EXCLUDED = ["Thailand", "Indonesia", "India", "Kenya", "Morocco", "Rwanda", "Nigeria", "Oman", "Algeria", "UAE"]
+LEAGUE_BLACKLIST = ["u19", "u20", "youth", "women", "friendly", "carioca", "paulista", "mineiro"]
+ROLLING_SNAPSHOT_HORIZONS = [1, 2, 3, 4, 5]
+BULK_ODDS_TTL_SECONDS = 900
+BULK_ODDS_MAX_PAGES = 200
+
+# delta refresh: si ricalcolano solo i fixture con quote mosse oltre la tolleranza (o nuovi);
+# la base sono righe/dettagli tenuti e la tabella scanned dello scan store (anche gli scartati)
+DELTA_MARKET_KEYS = ["q1", "qx", "q2", "o25", "o05ht", "o15ht"]
+DELTA_MARKET_TOLERANCE = float(os.getenv("ARAB_DELTA_TOLERANCE", "0") or 0)
+
+# campi aggiunti da quote_history_updater.py a data_dayN / details_dayN
+ENRICHMENT_COLUMNS = [
+    "Q1_OPEN", "QX_OPEN", "Q2_OPEN", "O25_OPEN",
+    "Q1_CURR", "QX_CURR", "Q2_CURR", "O25_CURR",
+    "Q1_MOVE", "QX_MOVE", "Q2_MOVE", "O25_MOVE",
+    "INVERSION", "INV_FROM", "INV_TO"
+]
+ENRICHMENT_TAG_PREFIXES = ("DROP_", "O25_DROP", "INVERSION", "INV_")
+SCAN_FLAG_KEYS = ["fav_quote", "is_gold_zone", "home_last_2h_zero", "away_last_2h_zero", "drop_diff"]
+
+REMOTE_MAIN_FILE = "data.json"
+REMOTE_DAY_FILES = {
+    1: "data_day1.json",
+    2: "data_day2.json",
+    3: "data_day3.json",
+    4: "data_day4.json",
+    5: "data_day5.json",
+}
+REMOTE_DETAILS_FILES = {
+    1: "details_day1.json",
+    2: "details_day2.json",
+    3: "details_day3.json",
+    4: "details_day4.json",
+    5: "details_day5.json",
+}
+
+try:
+    from zoneinfo import ZoneInfo
+    ROME_TZ = ZoneInfo("Europe/Rome")
+except Exception:
+    ROME_TZ = None
+
+
+# ARAB_NOW (ISO, es. 2026-03-19T08:00:00) congela l'orologio per replay e benchmark
+FROZEN_NOW = os.getenv("ARAB_NOW")
+
+
+def now_rome():
+    if FROZEN_NOW:
+        frozen = datetime.fromisoformat(FROZEN_NOW)
+        if ROME_TZ and frozen.tzinfo is None:
+            frozen = frozen.replace(tzinfo=ROME_TZ)
+        return frozen.astimezone(ROME_TZ) if ROME_TZ else frozen
+    return datetime.now(ROME_TZ) if ROME_TZ else datetime.now()
+
+
+def fixture_dt_rome(fixture_obj):
+    """
+    Converte la data fixture in Europe/Rome in modo robusto.
+    Usa timestamp se disponibile, altrimenti prova con il campo date ISO.
+    """
+    try:
+        ts = fixture_obj.get("timestamp")
+        if ts:
+            dt_utc = datetime.fromtimestamp(int(ts), tz=timezone.utc)
+            return dt_utc.astimezone(ROME_TZ) if ROME_TZ else dt_utc
+    except Exception:
+        pass
+
+    try:
+        raw = str(fixture_obj.get("date", "")).strip()
+        if raw:
+            raw = raw.replace("Z", "+00:00")
+            dt = datetime.fromisoformat(raw)
+            if dt.tzinfo is None:
+                dt = dt.replace(tzinfo=timezone.utc)
+            return dt.astimezone(ROME_TZ) if ROME_TZ else dt
+    except Exception:
+        pass
+
+    return None
+
+
+# ==========================================
+# GITHUB UPDATE CORE
+# ==========================================
+GITHUB_REPO_NAME = "Arabsnipertech-bet/arabsniper"
+
+
+def get_github_token():
+    return get_secret("GITHUB_TOKEN")
+
+
+# data.json / data_dayN / details_dayN: accumulati e pubblicati in un solo commit
+GITHUB_PUBLISHER = GithubPublisher(GITHUB_REPO_NAME, get_github_token)
+
+
+def write_text_atomic(path, text):
+    """
+    Scrive su file temporaneo e rinomina: chi legge vede il file vecchio o quello nuovo, mai a metà.
+    """
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(text.encode("utf-8"))
+    os.replace(tmp, path)
+
+
+def write_json_atomic(path, payload):
+    write_text_atomic(path, serialize_payload(payload))
+
+
+def publish_output(filename, payload):
+    """
+    File di output: prima su disco (BASE_DIR), poi in coda al publisher con gli stessi byte.
+    """
+    text = serialize_payload(payload)
+    write_text_atomic(str(BASE_DIR / filename), text)
+    GITHUB_PUBLISHER.stage_text(filename, text)
+
+# ==========================================
+# STATO DEL MOTORE
+# Cache condivise tra scan e thread (prima in st.session_state).
+# ==========================================
+class EngineState:
+    def __init__(self):
+        self.config = None
+        self.team_stats_cache = {}
+        self.team_last_matches_cache = {}
+        self.team_form_cache = {}
+        self.available_countries = []
+        self.odds_memory = None
+        self.odds_index_cache = {}
+        self.market_consensus = {}
+        self.team_form_synced_on = None
+        self.run_metrics = None
+        self.last_run_report = None
+
+
+STATE = EngineState()
+
+# st.secrets (o altro mapping con .get) impostato dal front-end Streamlit
+SECRETS = None
+
+_RESOURCES = {}
+_RESOURCES_LOCK = threading.RLock()
+
+
+def get_secret(name):
+    value = os.getenv(name)
+    if value or SECRETS is None:
+        return value
+    try:
+        return SECRETS.get(name, None)
+    except Exception:
+        return None
+
+
+def _resource(name, factory):
+    with _RESOURCES_LOCK:
+        if name not in _RESOURCES:
+            _RESOURCES[name] = factory()
+        return _RESOURCES[name]
+
+
+def load_config():
+    if STATE.config is None:
+        STATE.config = {"excluded": DEFAULT_EXCLUDED}
+        if os.path.exists(CONFIG_FILE):
+            try:
+                with open(CONFIG_FILE, "r", encoding="utf-8") as f:
+                    STATE.config = json.load(f)
+            except Exception:
+                pass
+    return STATE.config
+
+
+def save_config(config):
+    STATE.config = config
+    with open(CONFIG_FILE, "w", encoding="utf-8") as f:
+        json.dump(config, f, indent=4, ensure_ascii=False)
+
+
+def _open_scan_store():
+    store = ScanStore(SCAN_STORE_FILE)
+    today = now_rome().strftime("%Y-%m-%d")
+    store.import_legacy_json(DB_FILE, DETAILS_FILE, today)
+    store.expire(today)
+    return store
+
+
+def scan_store():
+    """
+    Righe e dettagli scan: SQLite per data, la UI legge solo l'orizzonte selezionato.
+    """
+    return _resource("scan_store", _open_scan_store)
+
+
+def odds_memory():
+    """
+    Quote baseline dello snapshot rolling (per il drop), lette da SNAP_FILE al primo uso.
+    """
+    if STATE.odds_memory is None:
+        STATE.odds_memory = load_existing_snapshot_payload().get("odds", {}) or {}
+    return STATE.odds_memory
+
+
+def api_cache():
+    return _resource("api_cache", ResponseCache)
+
+
+def api_replay():
+    return _resource("api_replay", lambda: ReplayStore.from_env(REPLAY_ENV))
+
+
+def _open_api_client():
+    recorder = ReplayStore.from_env(RECORD_ENV)
+    if recorder:
+        recorder.write_manifest(now_rome().isoformat())
+    return ApiClient(get_secret("API_SPORTS_KEY"), cache=api_cache(), recorder=recorder, replay=api_replay())
+
+
+def api_client():
+    return _resource("api_client", _open_api_client)
+
+
+# 1 = scan sequenziale (debug), >1 = prefetch concorrente di quote e form squadre
+SCAN_WORKERS = DEFAULT_SCAN_WORKERS
+
+
+def api_get(session, path, params, optional=False):
+    """
+    optional=True: chiamata saltata (None) se la quota giornaliera API è quasi finita.
+    """
+    return api_client().get(session, path, params, optional=optional)
+
+# ==========================================
+# METRICHE DI RUN
+# Fasi e contatori del run in corso; chiamate API, cache e GitHub
+# come differenza dei contatori dei rispettivi oggetti.
+# ==========================================
+def _team_form_stats():
+    store = team_form_store()
+    return store.stats() if store is not None else {}
+
+
+@contextmanager
+def metrics_run(label):
+    """
+    Apre le metriche del run se chi chiama non ne ha già aperte
+    (runner, build notturna, refresh parallelo) e alla chiusura scrive run_report.json.
+    """
+    if STATE.run_metrics is not None:
+        yield STATE.run_metrics
+        return
+
+    # run più esterno: via le quote per bookmaker dei run precedenti (anche dei fixture SKIP)
+    STATE.market_consensus = {}
+    metrics = RunMetrics(label)
+    metrics.add_source("api", lambda: api_client().stats())
+    metrics.add_source("cache", lambda: api_cache().stats())
+    metrics.add_source("team_form", _team_form_stats)
+    metrics.add_source("github", GITHUB_PUBLISHER.stats)
+    STATE.run_metrics = metrics
+    try:
+        yield metrics
+    finally:
+        STATE.run_metrics = None
+        STATE.last_run_report = metrics.report(api_quota=api_client().quota_status())
+        try:
+            write_json_atomic(RUN_REPORT_FILE, STATE.last_run_report)
+        except Exception as e:
+            print(f"⚠️ Run report non salvato: {e}", flush=True)
+
+
+def run_stage(name):
+    metrics = STATE.run_metrics
+    return metrics.stage(name) if metrics is not None else nullcontext()
+
+
+def run_count(name, n=1):
+    metrics = STATE.run_metrics
+    if metrics is not None:
+        metrics.count(name, n)
+
+
+def run_add_time(name, seconds):
+    metrics = STATE.run_metrics
+    if metrics is not None:
+        metrics.add_time(name, seconds)
+
+
+def safe_float(x, default=0.0):
+    try:
+        if x is None:
+            return default
+        if isinstance(x, (int, float)):
+            return float(x)
+        s = str(x).strip().replace(",", ".")
+        if s in ("", "-", "None", "null"):
+            return default
+        return float(s)
+    except Exception:
+        return default
+
+
+def is_blacklisted_league(league_name):
+    name = str(league_name or "").lower()
+    return any(k in name for k in LEAGUE_BLACKLIST)
+
+
+# bet/valori classificati una volta e riusati su tutti i fixture della run
+MARKET_PARSER = MarketParser.from_env()
+
+
+def parse_elite_markets(odds_item, sources=None):
+    """
+    Estrae i 6 mercati elite da un singolo elemento della risposta odds
+    (stesso formato per odds?fixture= e per il feed bulk odds?date=).
+    `sources` opzionale: {slot: bookmaker} per ogni quota trovata.
+    Le quote di tutti i bookmaker, raccolte nello stesso giro, restano in
+    STATE.market_consensus per i details (azzerato a ogni nuovo run).
+    """
+    quotes = []
+    mk = MARKET_PARSER.parse(odds_item, sources, quotes)
+
+    fid = ((odds_item or {}).get("fixture") or {}).get("id")
+    if fid is not None:
+        STATE.market_consensus[str(fid)] = quotes
+    return mk
+
+
+def fixture_consensus(fid):
+    """
+    Blocco consensus (best/median/spread per mercato) del fixture per details_dayN.json.
+    Le quote del fixture escono da STATE.market_consensus una volta usate.
+    """
+    return consensus_summary(STATE.market_consensus.pop(str(fid), []))
+
+
+def extract_elite_markets(session, fid, odds_index=None):
+    """
+    Se il fixture è presente nell'indice bulk usa quello,
+    altrimenti fallback sulla chiamata singola odds?fixture=.
+    Con il feed bulk caricato il fallback è opzionale: con quota quasi finita si salta.
+    """
+    if odds_index is not None:
+        indexed = odds_index.get(str(fid))
+        if indexed is not None:
+            return indexed
+
+    res = api_get(session, "odds", {"fixture": fid}, optional=bool(odds_index))
+    if not res or not res.get("response"):
+        return None
+
+    return parse_elite_markets(res["response"][0])
+
+
+def load_bulk_odds_index(session, target_date):
+    """
+    Scarica il feed paginato odds?date=YYYY-MM-DD una sola volta
+    e restituisce l'indice {fixture_id: markets} della giornata.
+    """
+    index = {}
+    page = 1
+    total_pages = 1
+
+    while page <= min(total_pages, BULK_ODDS_MAX_PAGES):
+        params = {"date": target_date, "timezone": "Europe/Rome"}
+        if page > 1:
+            params["page"] = page
+
+        res = api_get(session, "odds", params)
+        if not res:
+            break
+
+        for item in res.get("response", []) or []:
+            fid = (item.get("fixture") or {}).get("id")
+            if fid is None:
+                continue
+            index[str(fid)] = parse_elite_markets(item)
+
+        paging = res.get("paging") or {}
+        try:
+            total_pages = int(paging.get("total") or 1)
+        except Exception:
+            total_pages = 1
+        page += 1
+
+    return index
+
+
+def get_odds_index(session, target_date):
+    """
+    Indice odds bulk per data, riusato tra snapshot e scan della stessa run
+    finché non supera BULK_ODDS_TTL_SECONDS. Le quote per bookmaker restano
+    nella voce in cache: da lì si ripopola STATE.market_consensus quando l'indice
+    si riusa in un run successivo.
+    """
+    cached = STATE.odds_index_cache.get(target_date)
+    if cached and (time.time() - cached["fetched_at"]) < BULK_ODDS_TTL_SECONDS:
+        STATE.market_consensus.update(cached["consensus"])
+        return cached["index"]
+
+    index = load_bulk_odds_index(session, target_date)
+    STATE.odds_index_cache[target_date] = {
+        "index": index,
+        "consensus": {fid: STATE.market_consensus.get(fid, []) for fid in index},
+        "fetched_at": time.time()
+    }
+    print(f"📥 Odds bulk {target_date}: {len(index)} fixture indicizzati", flush=True)
+    return index
+
+
+def save_snapshot_file(payload):
+    write_json_atomic(SNAP_FILE, payload)
+
+
+def load_existing_snapshot_payload():
+    if os.path.exists(SNAP_FILE):
+        try:
+            with open(SNAP_FILE, "r", encoding="utf-8") as f:
+                payload = json.load(f)
+                if isinstance(payload, dict):
+                    payload.setdefault("odds", {})
+                    return payload
+        except Exception:
+            pass
+
+    return {
+        "odds": {},
+        "timestamp": None,
+        "updated_at": None,
+        "coverage": "rolling_day1_day5"
+    }
+
+
+def build_rolling_multiday_snapshot(session, workers=None, dataset=None):
+    """
+    Salva la baseline quote di tutti i fixture Day1+Day2+Day3+Day4+Day5.
+    Se un fixture_id esiste già, NON lo sovrascrive:
+    così il drop resta ancorato alla prima quota vista.
+    Con `dataset` (collect_scan_dataset) non esegue alcuna chiamata API.
+    """
+    if dataset is None:
+        dataset = collect_scan_dataset(session, ROLLING_SNAPSHOT_HORIZONS, workers)
+
+    existing_payload = load_existing_snapshot_payload()
+    existing_odds = existing_payload.get("odds", {}) or {}
+
+    new_odds = dict(existing_odds)
+    active_fixture_ids = set()
+
+    for horizon in ROLLING_SNAPSHOT_HORIZONS:
+        day = dataset.get(horizon)
+        if not day:
+            continue
+
+        target_date = day["date"]
+        markets = day["markets"]
+
+        for f in day["fixtures"]:
+            fid = str(f["fixture"]["id"])
+            active_fixture_ids.add(fid)
+
+            mk = markets.get(fid)
+            if not mk or mk == "SKIP":
+                continue
+
+            if fid not in new_odds:
+                new_odds[fid] = {
+                    "q1": mk["q1"],
+                    "q2": mk["q2"],
+                    "first_seen_date": target_date,
+                    "first_seen_horizon": horizon,
+                    "first_seen_ts": now_rome().strftime("%Y-%m-%d %H:%M:%S")
+                }
+            else:
+                if isinstance(new_odds[fid], dict):
+                    new_odds[fid]["last_seen_date"] = target_date
+                    new_odds[fid]["last_seen_horizon"] = horizon
+                    new_odds[fid]["last_seen_ts"] = now_rome().strftime("%Y-%m-%d %H:%M:%S")
+
+    cleaned_odds = {}
+    for fid, data in new_odds.items():
+        if fid in active_fixture_ids:
+            cleaned_odds[fid] = data
+
+    payload = {
+        "odds": cleaned_odds,
+        "timestamp": now_rome().strftime("%H:%M"),
+        "updated_at": now_rome().strftime("%Y-%m-%d %H:%M:%S"),
+        "coverage": "rolling_day1_day5"
+    }
+
+    STATE.odds_memory = cleaned_odds
+    save_snapshot_file(payload)
+    return payload
+
+
+# fetch team form in corso: con più orizzonti in parallelo ogni squadra si scarica una volta
+TEAM_FORM_LOCK = threading.Lock()
+TEAM_FORM_INFLIGHT = {}
+
+
+TEAM_FORM_SYNC_LOCK = threading.Lock()
+
+
+def team_form_store():
+    """
+    Storico partite per squadra su SQLite (None se ARAB_TEAM_FORM_STORE=0).
+    """
+    path = store_path_from_env()
+    if path is None:
+        return None
+    return _resource("team_form_store", lambda: TeamFormStore(path))
+
+
+def utc_yesterday_today():
+    # fixtures?team= e fixtures?date= senza timezone ragionano in UTC
+    now = now_rome().astimezone(timezone.utc)
+    return (now - timedelta(days=1)).strftime("%Y-%m-%d"), now.strftime("%Y-%m-%d")
+
+
+def team_form_seed_through():
+    """
+    Ultimo giorno UTC di cui un fetch fixtures?team= appena fatto ha di sicuro tutte
+    le partite: con la cache API la risposta può avere l'età del suo TTL.
+    """
+    fetched_at = now_rome().astimezone(timezone.utc)
+    if api_cache().enabled:
+        fetched_at -= timedelta(seconds=ttl_for("fixtures", {"team": 0, "last": 0}))
+    return (fetched_at - timedelta(days=1)).strftime("%Y-%m-%d")
+
+
+def sync_team_form_store(session):
+    """
+    Una volta al giorno per processo: partite finite dei giorni completi mancanti
+    (di norma solo ieri, una chiamata) e quelle di oggi già finite, aggiunte alle
+    squadre dello store. Poi via le squadre non viste da settimane.
+    """
+    store = team_form_store()
+    if store is None:
+        return
+
+    yesterday, today = utc_yesterday_today()
+    with TEAM_FORM_SYNC_LOCK:
+        if STATE.team_form_synced_on == today:
+            return
+        STATE.team_form_synced_on = today
+
+        days = store.days_to_sync(yesterday)
+        for day in days:
+            res = api_get(session, "fixtures", {"date": day, "status": "FT"})
+            if not res:
+                break
+            store.apply_day(day, res.get("response", []) or [])
+
+        # partite di oggi già finite: solo un anticipo, si salta con quota quasi finita
+        res = api_get(session, "fixtures", {"date": today, "status": "FT"}, optional=True)
+        if res:
+            store.apply_day(today, res.get("response", []) or [], advance=False)
+
+        evicted = store.evict(today)
+        print(
+            f"👥 Team form store: {store.count(yesterday)} squadre aggiornate a {yesterday} "
+            f"({len(days)} giorni applicati, {evicted} squadre eliminate)",
+            flush=True
+        )
+
+
+def claim_team_forms(team_ids):
+    """
+    Squadre non in cache divise tra quelle prenotate da questo thread (da scaricare)
+    e gli eventi di quelle già in download da un altro thread.
+    Le squadre aggiornate nel team form store si leggono da lì, senza API.
+    """
+    store = team_form_store()
+    yesterday, today = utc_yesterday_today()
+    mine, waiting = [], []
+    with TEAM_FORM_LOCK:
+        for tid in dict.fromkeys(str(t) for t in team_ids):
+            if tid in STATE.team_form_cache:
+                continue
+            if tid not in TEAM_FORM_INFLIGHT and store is not None:
+                stored = store.get(tid, yesterday, today)
+                if stored is not None:
+                    STATE.team_form_cache[tid] = stored
+                    continue
+            event = TEAM_FORM_INFLIGHT.get(tid)
+            if event is None:
+                TEAM_FORM_INFLIGHT[tid] = threading.Event()
+                mine.append(tid)
+            else:
+                waiting.append(event)
+    return mine, waiting
+
+
+def release_team_form(tid, records):
+    if records is not None:
+        STATE.team_form_cache[tid] = records
+        store = team_form_store()
+        if store is not None:
+            store.seed(tid, records, team_form_seed_through(), utc_yesterday_today()[1])
+    with TEAM_FORM_LOCK:
+        event = TEAM_FORM_INFLIGHT.pop(tid, None)
+    if event:
+        event.set()
+
+
+def get_team_form(session, tid):
+    """
+    Record compatti delle ultime 8 partite finite: un solo fetch per squadra,
+    condiviso da get_team_performance e get_team_last_matches.
+    """
+    cache_key = str(tid)
+    if cache_key in STATE.team_form_cache:
+        return STATE.team_form_cache[cache_key]
+
+    mine, waiting = claim_team_forms([cache_key])
+    if not mine and not waiting and cache_key in STATE.team_form_cache:
+        return STATE.team_form_cache[cache_key]
+    for event in waiting:
+        event.wait()
+        if cache_key in STATE.team_form_cache:
+            return STATE.team_form_cache[cache_key]
+
+    records = None
+    try:
+        records = fetch_team_form(session, tid, api_get)
+    finally:
+        if mine:
+            release_team_form(cache_key, records)
+
+    if records is None:
+        return []
+
+    STATE.team_form_cache[cache_key] = records
+    return records
+
+
+def get_team_last_matches(session, tid):
+    cache_key = str(tid)
+    if cache_key in STATE.team_last_matches_cache:
+        return STATE.team_last_matches_cache[cache_key]
+
+    last_matches = form_last_matches(get_team_form(session, tid))
+    STATE.team_last_matches_cache[cache_key] = last_matches
+    return last_matches
+
+
+def get_team_performance(session, tid):
+    if str(tid) in STATE.team_stats_cache:
+        return STATE.team_stats_cache[str(tid)]
+
+    stats = form_performance(get_team_form(session, tid))
+    if not stats:
+        return None
+
+    STATE.team_stats_cache[str(tid)] = stats
+    return stats
+
+def prefetch_markets(fixtures, odds_index, workers):
+    """
+    Quote dei fixture assenti dal feed bulk scaricate in parallelo.
+    Restituisce {fixture_id: markets} (None = nessuna quota disponibile).
+    """
+    markets = {}
+    missing = []
+    for f in fixtures:
+        fid = str(f["fixture"]["id"])
+        if fid in odds_index:
+            markets[fid] = odds_index[fid]
+        elif fid not in markets:
+            markets[fid] = None
+            missing.append(fid)
+
+    fetched = parallel_map(lambda sess, fid: extract_elite_markets(sess, fid, odds_index), missing, workers)
+    for fid, mk in zip(missing, fetched):
+        markets[fid] = mk
+
+    return markets
+
+
+def prefetch_team_form(team_ids, workers):
+    """
+    Scarica in parallelo la form delle squadre non ancora in cache;
+    la team_form_cache viene popolata dal thread chiamante.
+    """
+    pending, _ = claim_team_forms(team_ids)
+
+    fetched = []
+    try:
+        fetched = parallel_map(lambda sess, tid: fetch_team_form(sess, tid, api_get), pending, workers)
+    finally:
+        for i, tid in enumerate(pending):
+            release_team_form(tid, fetched[i] if i < len(fetched) else None)
+
+
+def collect_scan_dataset(session, horizons=ROLLING_SNAPSHOT_HORIZONS, workers=None):
+    """
+    Fase unica di fetch: fixture NS e mercati di ogni orizzonte scaricati una volta sola.
+    Restituisce {horizon: {"date", "fixtures", "markets"}}, consumato da snapshot e scan.
+    Gli orizzonti con lista fixture non disponibile restano fuori dal dataset.
+    """
+    use_workers = workers if workers is not None else SCAN_WORKERS
+    target_dates = get_target_dates()
+    dataset = {}
+
+    for horizon in horizons:
+        target_date = target_dates[horizon - 1]
+
+        with run_stage("fixtures"):
+            res = api_get(session, "fixtures", {"date": target_date, "timezone": "Europe/Rome"})
+        if not res:
+            continue
+
+        fx_list = [
+            f for f in res.get("response", [])
+            if f["fixture"]["status"]["short"] == "NS"
+            and not is_blacklisted_league(f.get("league", {}).get("name", ""))
+        ]
+        with run_stage("odds"):
+            odds_index = get_odds_index(session, target_date)
+
+            if use_workers > 1:
+                markets = prefetch_markets(fx_list, odds_index, use_workers)
+            else:
+                markets = {}
+                for f in fx_list:
+                    fid = str(f["fixture"]["id"])
+                    if fid not in markets:
+                        markets[fid] = extract_elite_markets(session, fid, odds_index)
+                time.sleep(0.15)
+
+        dataset[horizon] = {
+            "date": target_date,
+            "fixtures": fx_list,
+            "markets": markets
+        }
+
+    return dataset
+
+# ==========================================
+# SCORING HELPERS V24.1
+# (motore di scoring in scoring.py)
+# ==========================================
+def compute_drop_diff(fid, mk):
+    memory = odds_memory()
+    if fid not in memory:
+        return 0.0
+
+    old_data = memory.get(fid, {})
+    if not isinstance(old_data, dict):
+        return 0.0
+
+    fav_is_home = mk["q1"] <= mk["q2"]
+    old_q = safe_float(old_data.get("q1") if fav_is_home else old_data.get("q2"), 0.0)
+    fav_now = min(mk["q1"], mk["q2"])
+
+    if old_q > 0 and fav_now > 0 and old_q > fav_now:
+        return round(old_q - fav_now, 3)
+    return 0.0
+
+
+def build_signal_package(fid, mk, s_h, s_a, combined_ht_avg):
+    return scoring.build_signal_package(mk, s_h, s_a, combined_ht_avg, compute_drop_diff(fid, mk))
+
+# ==========================================
+# DETAILS / DAY PAYLOAD HELPERS
+# ==========================================
+def export_scan_store_json():
+    """
+    Rigenera arab_sniper_database.json e match_details.json dallo store (passo separato dallo scan).
+    """
+    return scan_store().export_json(DB_FILE, DETAILS_FILE, now_rome().strftime("%Y-%m-%d %H:%M:%S"))
+
+
+def get_target_dates():
+    return [(now_rome().date() + timedelta(days=i)).strftime("%Y-%m-%d") for i in range(5)]
+
+
+def build_day_results(day_num):
+    return scan_store().results_for_date(get_target_dates()[day_num - 1])
+
+
+def build_day_details_payload(day_num):
+    target_date = get_target_dates()[day_num - 1]
+    details = scan_store().details_for_date(target_date)
+    return {
+        "updated_at": now_rome().strftime("%Y-%m-%d %H:%M:%S"),
+        "day": day_num,
+        "date": target_date,
+        "details": details
+    }
+
+
+def sync_day_outputs_to_github(day_num, update_main=False):
+    """
+    Scrive in locale data_dayN, details_dayN (e data.json) e li mette in coda sul publisher.
+    Fuori da un batch pubblica subito in un commit; dentro un batch
+    (build notturna) restituisce "QUEUED" e il commit parte a fine batch.
+    """
+    day_results = build_day_results(day_num)
+    details_payload = build_day_details_payload(day_num)
+
+    with run_stage("outputs"):
+        publish_output(REMOTE_DAY_FILES[day_num], day_results)
+        publish_output(REMOTE_DETAILS_FILES[day_num], details_payload)
+        if update_main:
+            publish_output(REMOTE_MAIN_FILE, day_results)
+
+    if GITHUB_PUBLISHER.batching:
+        status = "QUEUED"
+    else:
+        status = GITHUB_PUBLISHER.flush(f"Update Arab Sniper Day {day_num} Data")
+
+    status_main = status if update_main else None
+    return status_main, status, status
+
+# ==========================================
+# DELTA REFRESH
+# ==========================================
+def fixture_local_time(f):
+    fixture_local_dt = fixture_dt_rome(f["fixture"])
+    return fixture_local_dt.strftime("%H:%M") if fixture_local_dt else f["fixture"]["date"][11:16]
+
+
+def strip_history_enrichment(row, detail):
+    """
+    Riporta riga e dettaglio pubblicati allo stato dello scan, togliendo
+    i campi di quote_history_updater. flags.drop_diff viene sovrascritto
+    dall'enrich: resta None e si ricontrolla in delta_carryover.
+    """
+    scan_tags = [t for t in detail.get("tags", []) if not str(t).startswith(ENRICHMENT_TAG_PREFIXES)]
+
+    row = {k: v for k, v in row.items() if k not in ENRICHMENT_COLUMNS}
+    row["Info"] = " ".join(scan_tags)
+
+    detail = dict(detail)
+    detail["tags"] = scan_tags
+    detail["flags"] = {k: v for k, v in (detail.get("flags") or {}).items() if k in SCAN_FLAG_KEYS}
+    detail["flags"]["drop_diff"] = None
+    return row, detail
+
+
+def load_previous_day_state(day_num, target_date):
+    """
+    Righe e dettagli dell'ultimo scan della data: dallo scan store se presenti,
+    altrimenti da data_dayN.json + details_dayN.json (ripuliti dall'enrich).
+    Restituisce ({fixture_id: {"row", "detail"}}, fonte).
+    """
+    rows = scan_store().results_for_date(target_date)
+    if rows:
+        details = scan_store().details_for_date(target_date)
+        source = "scan store"
+    else:
+        source = f"{REMOTE_DAY_FILES[day_num]} + {REMOTE_DETAILS_FILES[day_num]}"
+        try:
+            with open(BASE_DIR / REMOTE_DAY_FILES[day_num], "r", encoding="utf-8") as f:
+                rows = json.load(f)
+            with open(BASE_DIR / REMOTE_DETAILS_FILES[day_num], "r", encoding="utf-8") as f:
+                details_payload = json.load(f)
+        except Exception:
+            return {}, source
+
+        if not isinstance(rows, list) or not isinstance(details_payload, dict):
+            return {}, source
+        if details_payload.get("date") != target_date:
+            return {}, source
+
+        details = details_payload.get("details", {}) or {}
+        rows = [r for r in rows if isinstance(r, dict) and r.get("Data") == target_date]
+
+    previous = {}
+    for row in rows:
+        fid = str(row.get("Fixture_ID", ""))
+        detail = details.get(fid)
+        if not isinstance(detail, dict):
+            continue
+        if source != "scan store":
+            row, detail = strip_history_enrichment(row, detail)
+        previous[fid] = {"row": row, "detail": detail}
+
+    return previous, source
+
+
+def markets_within_tolerance(old_mk, mk):
+    return all(
+        abs(safe_float(old_mk.get(key)) - safe_float(mk.get(key))) <= DELTA_MARKET_TOLERANCE
+        for key in DELTA_MARKET_KEYS
+    )
+
+
+def scanned_entry(fid, mk, ora_local, kept):
+    """
+    Voce della tabella scanned: ciò che decide se il fixture va ricalcolato al prossimo delta.
+    """
+    return {
+        "time": ora_local,
+        "kept": kept,
+        "drop_diff": scoring.round3(compute_drop_diff(fid, mk)),
+        "markets": {key: mk.get(key) for key in DELTA_MARKET_KEYS},
+    }
+
+
+def delta_rejected(scanned_prev, fid, mk, ora_local):
+    """
+    Voce scanned precedente se il fixture era stato scartato con stesso orario,
+    quote entro la tolleranza e stesso drop: resta scartato senza form né scoring.
+    """
+    prev = scanned_prev.get(fid)
+    if not prev or prev["kept"] or not mk or mk == "SKIP":
+        return None
+    if prev["time"] != ora_local or not markets_within_tolerance(prev["markets"], mk):
+        return None
+    if prev["drop_diff"] != scoring.round3(compute_drop_diff(fid, mk)):
+        return None
+    return prev
+
+
+def delta_carryover(previous, fid, mk, ora_local):
+    """
+    Riga e dettaglio precedenti se il fixture si può riportare senza ricalcolo:
+    stesso orario, quote entro la tolleranza e stesso drop rispetto allo snapshot.
+    """
+    prev = previous.get(fid)
+    if not prev or not mk or mk == "SKIP":
+        return None
+
+    if prev["row"].get("Ora") != ora_local:
+        return None
+
+    if not markets_within_tolerance(prev["detail"].get("markets", {}) or {}, mk):
+        return None
+
+    drop_diff = scoring.round3(compute_drop_diff(fid, mk))
+    old_drop = prev["detail"].get("flags", {}).get("drop_diff")
+    if old_drop is None:
+        # dettaglio da file: il drop dello scan si riconosce solo dal tag 📉
+        drop_tag = f"📉-{drop_diff:.2f}" if drop_diff >= scoring.DEFAULT_THRESHOLDS["drop_tag_min"] else None
+        old_tags = [t for t in prev["detail"].get("tags", []) if str(t).startswith("📉")]
+        if old_tags != ([drop_tag] if drop_tag else []):
+            return None
+        prev["detail"]["flags"]["drop_diff"] = drop_diff
+    elif old_drop != drop_diff:
+        return None
+
+    return prev
+
+# ==========================================
+# SCAN CORE
+# ==========================================
+def run_full_scan(horizon=1, snap=False, update_main_site=False, workers=None, dataset=None, delta=False,
+                  progress=None):
+    """
+    Scan di un orizzonte: righe e dettagli nello scan store, output del giorno
+    su disco e in coda al publisher. `progress(frazione, testo)` opzionale per la UI.
+    Restituisce l'esito con gli stati di pubblicazione (o "error").
+    Fuori da un run già misurato scrive il proprio run_report.json.
+    """
+    with metrics_run(f"scan_day{horizon}"):
+        return _scan_horizon(horizon, snap, update_main_site, workers, dataset, delta, progress)
+
+
+def _scan_horizon(horizon, snap, update_main_site, workers, dataset, delta, progress):
+    use_horizon = horizon
+    use_workers = workers if workers is not None else SCAN_WORKERS
+    target_dates = get_target_dates()
+    report = progress or (lambda fraction, text: None)
+    excluded = load_config().get("excluded", [])
+
+    with requests.Session() as s:
+        target_date = target_dates[use_horizon - 1]
+
+        # partite finite di ieri (e di oggi) nel team form store prima di leggere la form
+        with run_stage("team_form_sync"):
+            sync_team_form_store(s)
+
+        # SNAP + SCAN: un solo fetch Day1..Day5 condiviso tra snapshot e scan
+        if snap and use_horizon == 1 and dataset is None:
+            dataset = collect_scan_dataset(s, ROLLING_SNAPSHOT_HORIZONS, use_workers)
+
+        day_data = (dataset or {}).get(use_horizon)
+        if day_data:
+            day_fx = day_data["fixtures"]
+            odds_index = day_data["markets"]
+        else:
+            with run_stage("fixtures"):
+                res = api_get(s, "fixtures", {"date": target_date, "timezone": "Europe/Rome"})
+            if not res:
+                return {"horizon": use_horizon, "date": target_date, "error": "Nessuna risposta valida dall'API."}
+
+            day_fx = [
+                f for f in res.get("response", [])
+                if f["fixture"]["status"]["short"] == "NS"
+                and not is_blacklisted_league(f.get("league", {}).get("name", ""))
+            ]
+            odds_index = None
+
+        STATE.available_countries = sorted(
+            list(set(STATE.available_countries) | {fx["league"]["country"] for fx in day_fx})
+        )
+
+        if snap and use_horizon == 1:
+            report(0.0, "📌 SNAPSHOT ROLLING DAY1+DAY2+DAY3+DAY4+DAY5...")
+            with run_stage("snapshot"):
+                build_rolling_multiday_snapshot(s, workers=use_workers, dataset=dataset)
+
+        final_list = []
+        details_map = {}
+        scan_fx = [f for f in day_fx if f["league"]["country"] not in excluded]
+
+        if odds_index is None:
+            with run_stage("odds"):
+                odds_index = get_odds_index(s, target_date)
+                if use_workers > 1:
+                    odds_index = prefetch_markets(scan_fx, odds_index, use_workers)
+
+        previous = {}
+        scanned_prev = {}
+        scanned = {}
+        if delta:
+            with run_stage("delta_load"):
+                previous, delta_source = load_previous_day_state(use_horizon, target_date)
+                scanned_prev = scan_store().scanned_for_date(target_date)
+        carried = 0
+        skipped_rejected = 0
+        rescored = 0
+
+        if use_workers > 1:
+            team_ids = []
+            for f in scan_fx:
+                fid = str(f["fixture"]["id"])
+                mk = odds_index.get(fid)
+                if mk and mk != "SKIP" and mk["q1"] != 0:
+                    if previous and delta_carryover(previous, fid, mk, fixture_local_time(f)):
+                        continue
+                    if scanned_prev and delta_rejected(scanned_prev, fid, mk, fixture_local_time(f)):
+                        continue
+                    team_ids.extend([f["teams"]["home"]["id"], f["teams"]["away"]["id"]])
+            with run_stage("team_form"):
+                prefetch_team_form(team_ids, use_workers)
+
+        report(0.0, "🚀 ANALISI SEGNALI E MEDIE...")
+        # scoring: con workers=1 comprende anche i fetch sequenziali di quote e form
+        t_scoring = time.perf_counter()
+        for i, f in enumerate(day_fx):
+            report((i + 1) / len(day_fx) if day_fx else 1.0, "🚀 ANALISI SEGNALI E MEDIE...")
+
+            cnt = f["league"]["country"]
+            if cnt in excluded:
+                continue
+
+            fid = str(f["fixture"]["id"])
+            if fid in odds_index and odds_index[fid] is None:
+                continue
+            mk = extract_elite_markets(s, fid, odds_index)
+            if not mk or mk == "SKIP" or mk["q1"] == 0:
+                continue
+
+            home_team = f["teams"]["home"]
+            away_team = f["teams"]["away"]
+
+            ora_local = fixture_local_time(f)
+
+            prev = delta_carryover(previous, fid, mk, ora_local) if previous else None
+            if prev:
+                final_list.append(prev["row"])
+                # riga e score invariati, consensus dal payload appena letto
+                details_map[fid] = dict(prev["detail"])
+                details_map[fid]["consensus"] = fixture_consensus(fid)
+                scanned[fid] = scanned_entry(fid, mk, ora_local, True)
+                carried += 1
+                continue
+            rejected = delta_rejected(scanned_prev, fid, mk, ora_local) if scanned_prev else None
+            if rejected:
+                # scartato dall'ultimo scan e nulla è cambiato: la base resta quella
+                scanned[fid] = rejected
+                skipped_rejected += 1
+                continue
+            rescored += 1
+
+            s_h = get_team_performance(s, home_team["id"])
+            s_a = get_team_performance(s, away_team["id"])
+            if not s_h or not s_a:
+                continue
+
+            combined_ht_avg = (s_h["avg_ht"] + s_a["avg_ht"]) / 2
+            if combined_ht_avg < 1.03:
+                scanned[fid] = scanned_entry(fid, mk, ora_local, False)
+                continue
+
+            signal_pack = build_signal_package(fid, mk, s_h, s_a, combined_ht_avg)
+            tags = signal_pack["tags"]
+
+            if not should_keep_match(signal_pack):
+                scanned[fid] = scanned_entry(fid, mk, ora_local, False)
+                continue
+            scanned[fid] = scanned_entry(fid, mk, ora_local, True)
+
+            fav = signal_pack["fav_quote"]
+            is_gold_zone = signal_pack["is_gold_zone"]
+
+            row = {
+                "Ora": ora_local,
+                "Lega": f"{f['league']['name']} ({cnt})",
+                "Match": f"{home_team['name']} - {away_team['name']}",
+                "FAV": "✅" if is_gold_zone else "❌",
+                "1X2": f"{mk['q1']:.1f}|{mk['qx']:.1f}|{mk['q2']:.1f}",
+                "O2.5": f"{mk['o25']:.2f}",
+                "O0.5H": f"{mk['o05ht']:.2f}",
+                "O1.5H": f"{mk['o15ht']:.2f}",
+                "AVG FT": f"{s_h['avg_total']:.1f}|{s_a['avg_total']:.1f}",
+                "AVG HT": f"{s_h['avg_ht']:.1f}|{s_a['avg_ht']:.1f}",
+                "Info": " ".join(tags),
+                "Data": target_date,
+                "Fixture_ID": f["fixture"]["id"]
+            }
+            final_list.append(row)
+
+            details_map[fid] = {
+                "fixture_id": f["fixture"]["id"],
+                "date": target_date,
+                "time": ora_local,
+                "league": f["league"]["name"],
+                "country": cnt,
+                "match": f"{home_team['name']} - {away_team['name']}",
+                "home_team": home_team["name"],
+                "away_team": away_team["name"],
+                "markets": {
+                    "q1": mk["q1"],
+                    "qx": mk["qx"],
+                    "q2": mk["q2"],
+                    "o25": mk["o25"],
+                    "o05ht": mk["o05ht"],
+                    "o15ht": mk["o15ht"]
+                },
+                "consensus": fixture_consensus(fid),
+                "averages": {
+                    "home_avg_ft": round(s_h["avg_total"], 3),
+                    "away_avg_ft": round(s_a["avg_total"], 3),
+                    "home_avg_ht": round(s_h["avg_ht"], 3),
+                    "away_avg_ht": round(s_a["avg_ht"], 3),
+                    "combined_ht_avg": round(combined_ht_avg, 3)
+                },
+                "flags": {
+                    "fav_quote": round(fav, 3),
+                    "is_gold_zone": is_gold_zone,
+                    "home_last_2h_zero": s_h["last_2h_zero"],
+                    "away_last_2h_zero": s_a["last_2h_zero"],
+                    "drop_diff": signal_pack["drop_diff"]
+                },
+                "scores": signal_pack["scores"],
+                "tags": tags,
+                "home_last_8": get_team_last_matches(s, home_team["id"]),
+                "away_last_8": get_team_last_matches(s, away_team["id"])
+            }
+
+            if use_workers <= 1:
+                time.sleep(0.2)
+
+        run_add_time("scoring", time.perf_counter() - t_scoring)
+        run_count("fixtures_scanned", len(scan_fx))
+        run_count("rows_kept", len(final_list))
+        if delta:
+            run_count("delta_carried", carried)
+            run_count("delta_skipped_rejected", skipped_rejected)
+            run_count("delta_rescored", rescored)
+
+        if delta:
+            print(
+                f"♻️ DELTA Day{use_horizon}: {carried} fixture invariati riportati senza ricalcolo, "
+                f"{skipped_rejected} scartati invariati saltati, {rescored} ricalcolati "
+                f"(base: {delta_source}, {len(previous)} fixture tenuti, {len(scanned_prev)} analizzati).",
+                flush=True
+            )
+
+        with run_stage("store"):
+            scan_store().replace_day(target_date, final_list, details_map, scanned)
+
+        status_main, status_day, status_details = sync_day_outputs_to_github(
+            day_num=use_horizon,
+            update_main=update_main_site
+        )
+
+        return {
+            "horizon": use_horizon,
+            "date": target_date,
+            "rows": len(final_list),
+            "status_main": status_main,
+            "status_day": status_day,
+            "status_details": status_details,
+        }
+
+# ==========================================
+# AUTO BUILD 5 GIORNI
+# ==========================================
+def run_nightly_multiday_build():
+    print("🚀 Avvio scan notturno multi-day...")
+
+    with metrics_run("night"):
+        with GITHUB_PUBLISHER.batch("Update Arab Sniper Multi-Day Build"):
+            run_nightly_stages()
+
+        print(f"📤 Pubblicazione GitHub: {GITHUB_PUBLISHER.last_status}")
+
+        with run_stage("export"):
+            n_rows, n_details = export_scan_store_json()
+    print(f"💾 Export store: {n_rows} righe in {Path(DB_FILE).name}, {n_details} dettagli in {Path(DETAILS_FILE).name}")
+    print("✅ Build multi-day completata.")
+
+
+def run_nightly_stages():
+    print("📥 FETCH: fixture + quote Day1..Day5 (una sola volta)")
+    with requests.Session() as s:
+        dataset = collect_scan_dataset(s, ROLLING_SNAPSHOT_HORIZONS)
+
+        print("📌 SNAPSHOT rolling Day1..Day5")
+        with run_stage("snapshot"):
+            build_rolling_multiday_snapshot(s, dataset=dataset)
+
+    print("📌 DAY 1: scan + update data.json/data_day1/details_day1")
+    run_full_scan(horizon=1, snap=False, update_main_site=True, dataset=dataset)
+
+    print("📆 DAY 2: scan statico + update data_day2/details_day2")
+    run_full_scan(horizon=2, snap=False, update_main_site=False, dataset=dataset)
+
+    print("📆 DAY 3: scan statico + update data_day3/details_day3")
+    run_full_scan(horizon=3, snap=False, update_main_site=False, dataset=dataset)
+
+    print("📆 DAY 4: scan statico + update data_day4/details_day4")
+    run_full_scan(horizon=4, snap=False, update_main_site=False, dataset=dataset)
+
+    print("📆 DAY 5: scan statico + update data_day5/details_day5")
+    run_full_scan(horizon=5, snap=False, update_main_site=False, dataset=dataset)
+
+# ==========================================
+# REFRESH MULTI-DAY PARALLELO
+# ==========================================
+def run_parallel_refresh(horizons, delta=False, commit_message="Update Arab Sniper Multi-Day Refresh"):
+    """
+    Un thread per orizzonte (solo esecuzioni headless): cache team form,
+    rate limiter e scan store sono condivisi, gli output partono in un solo commit.
+    data.json segue sempre il Day 1.
+    """
+    horizons = list(horizons)
+    print(f"🚀 Refresh parallelo Day {', '.join(str(h) for h in horizons)}...", flush=True)
+    t0 = time.perf_counter()
+    errors = {}
+
+    def scan_horizon(h):
+        with run_stage(f"day{h}"):
+            t_start = time.perf_counter()
+            run_full_scan(horizon=h, snap=False, update_main_site=(h == 1), delta=delta)
+            print(f"✅ Day {h} completato in {time.perf_counter() - t_start:.1f}s", flush=True)
+
+    with metrics_run("parallel_refresh"):
+        with GITHUB_PUBLISHER.batch(commit_message):
+            with ThreadPoolExecutor(max_workers=max(1, len(horizons))) as pool:
+                futures = {h: pool.submit(scan_horizon, h) for h in horizons}
+                for h, future in futures.items():
+                    try:
+                        future.result()
+                    except Exception as e:
+                        errors[h] = e
+                        print(f"❌ Day {h}: {e}", flush=True)
+
+    print(f"📤 Pubblicazione GitHub: {GITHUB_PUBLISHER.last_status}", flush=True)
+    print(f"⏱️ Refresh parallelo completato in {time.perf_counter() - t0:.1f}s", flush=True)
+
+    if errors:
+        raise errors[min(errors)]
+
@@ -0,0 +1,115 @@
+# ==========================================
+# FORM SQUADRE: UN SOLO FETCH PER SQUADRA
+# fixtures?team=X&last=8&status=FT -> record compatti per squadra,
+# da cui derivano sia le medie sia la tabella "Ultime 8"
+# ==========================================
+FORM_LAST_N = 8
+
+
+def fetch_team_form(session, tid, api_get, last=FORM_LAST_N):
+    """
+    Restituisce la lista di record compatti della squadra,
+    oppure None se la chiamata API è fallita (così non viene messa in cache).
+    """
+    res = api_get(session, "fixtures", {"team": tid, "last": last, "status": "FT"})
+    if not res:
+        return None
+    return parse_team_form(res.get("response", []) or [], tid)
+
+
+def parse_team_form(fixtures, tid):
+    """
+    Un record per partita, orientato sulla squadra `tid`.
+    I gol restano come arrivano dall'API (anche None), i consumer decidono il default.
+    """
+    records = []
+    for f in fixtures:
+        home = f.get("teams", {}).get("home", {})
+        away = f.get("teams", {}).get("away", {})
+        goals = f.get("goals", {})
+        halftime = f.get("score", {}).get("halftime", {})
+
+        is_home = str(home.get("id")) == str(tid)
+        team_side, opp_side = (home, away) if is_home else (away, home)
+
+        gh, ga = goals.get("home", 0), goals.get("away", 0)
+        hth, hta = halftime.get("home", 0), halftime.get("away", 0)
+
+        records.append({
+            "fixture_id": f.get("fixture", {}).get("id"),
+            "date": str(f.get("fixture", {}).get("date", ""))[:10],
+            "league": f.get("league", {}).get("name", "N/D"),
+            "venue": "H" if is_home else "A",
+            "team": team_side.get("name", "N/D"),
+            "opponent": opp_side.get("name", "N/D"),
+            "ht_for": hth if is_home else hta,
+            "ht_against": hta if is_home else hth,
+            "ft_for": gh if is_home else ga,
+            "ft_against": ga if is_home else gh,
+        })
+
+    return records
+
+
+def record_score(record):
+    """
+    Riporta il record all'orientamento casa/trasferta della partita:
+    (home_name, away_name, ht_home, ht_away, ft_home, ft_away).
+    """
+    if record.get("venue") == "H":
+        return (
+            record.get("team", "N/D"), record.get("opponent", "N/D"),
+            record.get("ht_for"), record.get("ht_against"),
+            record.get("ft_for"), record.get("ft_against"),
+        )
+    return (
+        record.get("opponent", "N/D"), record.get("team", "N/D"),
+        record.get("ht_against"), record.get("ht_for"),
+        record.get("ft_against"), record.get("ft_for"),
+    )
+
+
+def form_last_matches(records):
+    """
+    Tabella "Ultime 8" nel formato di details_dayN.json.
+    """
+    last_matches = []
+    for rec in records or []:
+        home_name, away_name, hth, hta, gh, ga = record_score(rec)
+        last_matches.append({
+            "date": rec.get("date", ""),
+            "league": rec.get("league", "N/D"),
+            "match": f"{home_name} - {away_name}",
+            "ht": f"{hth}-{hta}",
+            "ft": f"{gh}-{ga}",
+            "total_ht_goals": (hth or 0) + (hta or 0),
+            "total_ft_goals": (gh or 0) + (ga or 0)
+        })
+    return last_matches
+
+
+def form_performance(records):
+    """
+    Medie HT/FT e flag ultimo secondo tempo a secco (None se nessuna partita).
+    """
+    if not records:
+        return None
+
+    act = len(records)
+    tht, gf, gs = 0, 0, 0
+
+    for rec in records:
+        tht += (rec.get("ht_for") or 0) + (rec.get("ht_against") or 0)
+        gf += rec.get("ft_for") or 0
+        gs += rec.get("ft_against") or 0
+
+    last = records[0]
+    ft_sum = (last.get("ft_for") or 0) + (last.get("ft_against") or 0)
+    ht_sum = (last.get("ht_for") or 0) + (last.get("ht_against") or 0)
+    last_2h_zero = ((ft_sum - ht_sum) == 0)
+
+    return {
+        "avg_ht": tht / act,
+        "avg_total": (gf + gs) / act,
+        "last_2h_zero": last_2h_zero
+    }
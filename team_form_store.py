@@ -0,0 +1,248 @@
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import threading
+from datetime import date, timedelta
+from pathlib import Path
+
+from http_cache import DEFAULT_CACHE_DIR
+from team_form import FORM_LAST_N, parse_team_form
+
+# ==========================================
+# TEAM FORM STORE (SQLite)
+# - per squadra: partite finite (record compatti di team_form), più recenti prima
+# - valid_through: ultimo giorno (UTC) di cui la squadra ha già tutte le partite
+# - aggiornamento incrementale: una chiamata fixtures?date=YYYY-MM-DD&status=FT
+#   per giorno, applicata alle squadre senza buchi (valid_through >= giorno - 1)
+# - squadra sconosciuta o rimasta indietro: fetch API come prima, poi seed nello store
+# - storico limitato per squadra, squadre non viste da N settimane eliminate
+# ARAB_TEAM_FORM_STORE=0 disattiva lo store, altrimenti percorso del file.
+# ==========================================
+STORE_ENV = "ARAB_TEAM_FORM_STORE"
+DEFAULT_STORE_FILE = DEFAULT_CACHE_DIR / "team_form.sqlite"
+HISTORY_CAP = 20
+EVICT_WEEKS = int(os.getenv("ARAB_TEAM_FORM_EVICT_WEEKS", "6") or 6)
+MAX_CATCHUP_DAYS = 7
+
+
+def store_path_from_env():
+    """
+    Percorso dello store, oppure None se disattivato.
+    """
+    raw = os.getenv(STORE_ENV, "")
+    if raw == "0":
+        return None
+    return Path(raw) if raw else DEFAULT_STORE_FILE
+
+
+def _day_before(day):
+    return (date.fromisoformat(day) - timedelta(days=1)).isoformat()
+
+
+def merge_records(records, new_records, cap=HISTORY_CAP):
+    """
+    Unisce i record nuovi (dedup per fixture_id), più recenti prima.
+    L'ordinamento è stabile: a parità di data resta l'ordine dell'API.
+    """
+    known = {r.get("fixture_id") for r in records}
+    merged = list(records) + [r for r in new_records if r.get("fixture_id") not in known]
+    merged = sorted(merged, key=lambda r: str(r.get("date", "")), reverse=True)
+    return merged[:cap]
+
+
+class TeamFormStore:
+    def __init__(self, path=DEFAULT_STORE_FILE):
+        self.path = Path(path)
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.applied = 0
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.path), check_same_thread=False, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        # un commit per seed: niente fsync a ogni commit (WAL, al più si rifà un fetch)
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS teams (
+                team_id TEXT PRIMARY KEY,
+                valid_through TEXT NOT NULL,
+                last_seen TEXT NOT NULL,
+                records TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_teams_valid ON teams(valid_through);
+            CREATE INDEX IF NOT EXISTS idx_teams_seen ON teams(last_seen);
+
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            );
+            """
+        )
+        self.conn.commit()
+
+    # -------------------------
+    # META
+    # -------------------------
+    def get_meta(self, key, default=None):
+        with self.lock:
+            row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def set_meta(self, key, value):
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT INTO meta (key, value) VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+                (key, str(value))
+            )
+
+    # -------------------------
+    # LETTURA / SEED
+    # -------------------------
+    def get(self, tid, yesterday, today, last=FORM_LAST_N):
+        """
+        Ultimi `last` record della squadra se lo store è aggiornato almeno a ieri,
+        altrimenti None (squadra sconosciuta o con giorni mancanti).
+        """
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT valid_through, last_seen, records FROM teams WHERE team_id = ?", (str(tid),)
+            ).fetchone()
+            if not row or row[0] < yesterday:
+                self.misses += 1
+                return None
+            if row[1] != today:
+                with self.conn:
+                    self.conn.execute("UPDATE teams SET last_seen = ? WHERE team_id = ?", (today, str(tid)))
+            self.hits += 1
+        return json.loads(row[2])[:last]
+
+    def seed(self, tid, records, valid_through, today):
+        """
+        Storico dall'API: sostituisce quello salvato, completo fino a `valid_through`
+        (ieri per una risposta fresca, prima se poteva arrivare dalla cache API).
+        """
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT INTO teams (team_id, valid_through, last_seen, records) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(team_id) DO UPDATE SET valid_through = excluded.valid_through, "
+                "last_seen = excluded.last_seen, records = excluded.records",
+                (str(tid), valid_through, today, json.dumps(records[:HISTORY_CAP], ensure_ascii=False, separators=(",", ":")))
+            )
+
+    # -------------------------
+    # AGGIORNAMENTO INCREMENTALE
+    # -------------------------
+    def apply_day(self, day, fixtures, advance=True):
+        """
+        Aggiunge le partite finite di `day` alle squadre aggiornate fino al giorno prima.
+        advance=True: il giorno è completo, quelle squadre diventano valide fino a `day`.
+        """
+        previous = _day_before(day)
+        added = 0
+
+        with self.lock, self.conn:
+            for f in fixtures:
+                if (f.get("fixture", {}).get("status", {}) or {}).get("short") != "FT":
+                    continue
+                for side in ("home", "away"):
+                    tid = str(f.get("teams", {}).get(side, {}).get("id"))
+                    row = self.conn.execute(
+                        "SELECT records FROM teams WHERE team_id = ? AND valid_through >= ?", (tid, previous)
+                    ).fetchone()
+                    if not row:
+                        continue
+                    merged = merge_records(json.loads(row[0]), parse_team_form([f], tid))
+                    self.conn.execute(
+                        "UPDATE teams SET records = ? WHERE team_id = ?",
+                        (json.dumps(merged, ensure_ascii=False, separators=(",", ":")), tid)
+                    )
+                    added += 1
+
+            if advance:
+                self.conn.execute(
+                    "UPDATE teams SET valid_through = ? WHERE valid_through >= ? AND valid_through < ?",
+                    (day, previous, day)
+                )
+                self.conn.execute(
+                    "INSERT INTO meta (key, value) VALUES ('synced_through', ?) "
+                    "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+                    (day,)
+                )
+
+        self.applied += added
+        return added
+
+    def days_to_sync(self, yesterday):
+        """
+        Giorni completi ancora da applicare (al massimo MAX_CATCHUP_DAYS, i più recenti):
+        le squadre rimaste più indietro tornano al fetch API.
+        """
+        synced = self.get_meta("synced_through")
+        if synced is None:
+            # store nuovo: le squadre entrano con il seed API, già complete fino a ieri
+            self.set_meta("synced_through", yesterday)
+            return []
+        start = date.fromisoformat(yesterday) - timedelta(days=MAX_CATCHUP_DAYS - 1)
+        start = max(start, date.fromisoformat(synced) + timedelta(days=1))
+        days = []
+        while start.isoformat() <= yesterday:
+            days.append(start.isoformat())
+            start += timedelta(days=1)
+        return days
+
+    def evict(self, today, weeks=EVICT_WEEKS):
+        cutoff = (date.fromisoformat(today) - timedelta(weeks=weeks)).isoformat()
+        with self.lock, self.conn:
+            return self.conn.execute("DELETE FROM teams WHERE last_seen < ?", (cutoff,)).rowcount
+
+    # -------------------------
+    # STATISTICHE
+    # -------------------------
+    def count(self, valid_from=None):
+        with self.lock:
+            if valid_from is None:
+                return self.conn.execute("SELECT COUNT(*) FROM teams").fetchone()[0]
+            return self.conn.execute(
+                "SELECT COUNT(*) FROM teams WHERE valid_through >= ?", (valid_from,)
+            ).fetchone()[0]
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "applied": self.applied}
+
+    def print_stats(self):
+        print(
+            f"👥 Team form store: {self.hits} squadre lette in locale, {self.misses} dall'API, "
+            f"{self.applied} partite aggiunte | {self.count()} squadre salvate",
+            flush=True
+        )
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Team form store SQLite")
+    parser.add_argument("--store", default=str(DEFAULT_STORE_FILE))
+    parser.add_argument("--evict", metavar="TODAY", help="elimina le squadre non viste da EVICT_WEEKS settimane")
+    args = parser.parse_args()
+
+    store = TeamFormStore(args.store)
+    try:
+        if args.evict:
+            print(f"🧹 Squadre eliminate: {store.evict(args.evict)}", flush=True)
+        print(
+            f"📊 Team form store: {store.count()} squadre, aggiornato fino a {store.get_meta('synced_through', 'N/D')}",
+            flush=True
+        )
+    finally:
+        store.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
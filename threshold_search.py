@@ -0,0 +1,294 @@
+import argparse
+import itertools
+import json
+import os
+import random
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from backtest import DEFAULT_ARCHIVES_DIR, MARKETS, TAGS, evaluate_arrays, load_dataset, load_results, market_vectors, snapshot_paths
+from results_store import ResultsStore, store_path_from_env
+from run_metrics import RunMetrics, print_summary
+from scoring import DEFAULT_THRESHOLDS, batch_scores
+
+# ==========================================
+# RICERCA SOGLIE (GRID / RANDOM)
+# - dataset e risultati come in backtest.py, punteggi calcolati una volta nel processo principale
+# - punteggi, gate fissi e vettori dei mercati in un'unica matrice float64 in shared memory:
+#   i worker la leggono senza copie né pickle del dataset
+# - config divise a blocchi su un ProcessPoolExecutor; ogni blocco è un batch_gates (C, N)
+# - per tag: frontiera di Pareto (segnali, hit %, ROI %) sul mercato scelto,
+#   solo config con almeno --min-bets scommesse
+#
+#   python threshold_search.py --grid
+#   python threshold_search.py --random 5000 --market O2.5 --space spazio.json --csv ricerca.csv
+# ==========================================
+# soglia: (minimo, massimo, passo) intorno ai valori di produzione
+DEFAULT_SPACE = {
+    "pt_tag": (3.7, 4.5, 0.1),
+    "over_tag": (3.6, 4.4, 0.1),
+    "boost_min": (5.5, 6.5, 0.1),
+    "gold_min": (6.4, 7.2, 0.1),
+    "probe_keep_max": (3.0, 3.8, 0.2),
+}
+DEFAULT_MIN_BETS = 20
+MAX_MASK_CELLS = 4_000_000
+
+# soglie che decidono ciascun tag (PROBE e KEEP dipendono da tutte)
+TAG_KEYS = {
+    "GOLD": ("gold_min", "gold_boost_min", "gold_pt_min", "gold_over_min"),
+    "BOOST": ("boost_min", "boost_pt_min", "boost_over_min", "boost_ht_min"),
+    "OVER": ("over_tag",),
+    "PT": ("pt_tag",),
+}
+
+SCORE_ROWS = ("pt", "over", "boost", "gold", "max", "raw_drop_diff", "_combined")
+MASK_ROWS = ("probe_o", "probe_g", "_boost_gate", "_gold_gate")
+VECTOR_KEYS = ("has", "hit", "bet", "profit")
+
+_WORKER = {}
+
+
+def space_values(space):
+    """
+    {soglia: lista di valori}: tupla (min, max, passo), dict {min, max, step} o lista esplicita.
+    """
+    values = {}
+    for key, spec in space.items():
+        if key not in DEFAULT_THRESHOLDS:
+            raise ValueError(f"soglia sconosciuta: {key}")
+        if isinstance(spec, dict):
+            spec = (spec["min"], spec["max"], spec["step"])
+        if isinstance(spec, tuple):
+            low, high, step = spec
+            values[key] = [round(float(v), 4) for v in np.arange(low, high + step / 2, step)]
+        else:
+            values[key] = [float(v) for v in spec]
+    return values
+
+
+def grid_configs(values):
+    keys = list(values)
+    return [dict(zip(keys, combo)) for combo in itertools.product(*(values[k] for k in keys))]
+
+
+def random_configs(values, n, seed=0):
+    rnd = random.Random(seed)
+    seen = set()
+    configs = []
+    total = int(np.prod([len(v) for v in values.values()]))
+    while len(configs) < min(n, total):
+        cfg = {key: rnd.choice(options) for key, options in values.items()}
+        sig = tuple(cfg.values())
+        if sig not in seen:
+            seen.add(sig)
+            configs.append(cfg)
+    return configs
+
+
+# -------------------------
+# SHARED MEMORY
+# -------------------------
+def _layout(markets):
+    return list(SCORE_ROWS) + list(MASK_ROWS) + [f"{m}|{k}" for m in markets for k in VECTOR_KEYS]
+
+
+def share_arrays(scores, vectors):
+    """
+    Copia punteggi e vettori in un blocco shared memory. Restituisce (shm, meta per i worker).
+    """
+    layout = _layout(list(vectors))
+    n = len(scores["pt"])
+    shm = shared_memory.SharedMemory(create=True, size=max(1, len(layout) * n * 8))
+    matrix = np.ndarray((len(layout), n), dtype=np.float64, buffer=shm.buf)
+    for i, name in enumerate(layout):
+        if "|" in name:
+            market, key = name.split("|")
+            matrix[i] = vectors[market][key]
+        else:
+            matrix[i] = scores[name]
+    return shm, {"name": shm.name, "shape": (len(layout), n), "layout": layout, "markets": list(vectors)}
+
+
+def _attach(meta):
+    """
+    Initializer dei worker: viste sulla matrice condivisa (i booleani si ricostruiscono una volta).
+    """
+    shm = shared_memory.SharedMemory(name=meta["name"])
+    matrix = np.ndarray(meta["shape"], dtype=np.float64, buffer=shm.buf)
+    rows = {name: matrix[i] for i, name in enumerate(meta["layout"])}
+    scores = {name: rows[name] for name in SCORE_ROWS}
+    scores.update({name: rows[name] != 0 for name in MASK_ROWS})
+    vectors = {m: {k: rows[f"{m}|{k}"] for k in VECTOR_KEYS} for m in meta["markets"]}
+    _WORKER.update({"shm": shm, "scores": scores, "vectors": vectors})
+
+
+def _evaluate_chunk(configs):
+    return evaluate_arrays(_WORKER["scores"], dict(enumerate(configs)), _WORKER["vectors"])
+
+
+def run_search(meta, configs, workers, chunk_size):
+    """
+    Valuta le config a blocchi sul pool. Restituisce una riga per (config, tag, mercato)
+    con le soglie della config in colonna.
+    """
+    chunks = [configs[i:i + chunk_size] for i in range(0, len(configs), chunk_size)]
+    collected = {}
+    with ProcessPoolExecutor(max_workers=workers, initializer=_attach, initargs=(meta,)) as pool:
+        for sums in pool.map(_evaluate_chunk, chunks):
+            for tag, by_tag in sums.items():
+                for market in meta["markets"]:
+                    acc = collected.setdefault((tag, market), {k: [] for k in ("signals", "n", "hits", "bets", "profit")})
+                    acc["signals"].append(by_tag["signals"])
+                    for key in ("n", "hits", "bets", "profit"):
+                        acc[key].append(by_tag[market][key])
+
+    thresholds = pd.DataFrame(configs)
+    frames = []
+    for (tag, market), acc in collected.items():
+        arr = {key: np.concatenate(parts) for key, parts in acc.items()}
+        with np.errstate(divide="ignore", invalid="ignore"):
+            hit_pct = np.where(arr["n"] > 0, 100.0 * arr["hits"] / arr["n"], np.nan)
+            roi_pct = np.where(arr["bets"] > 0, 100.0 * arr["profit"] / arr["bets"], np.nan)
+        frame = pd.DataFrame({
+            "config_id": np.arange(len(configs)),
+            "tag": tag,
+            "market": market,
+            "signals": arr["signals"].astype(np.int64),
+            "with_result": arr["n"].astype(np.int64),
+            "hit_pct": hit_pct.round(2),
+            "bets": arr["bets"].astype(np.int64),
+            "roi_pct": roi_pct.round(2),
+        })
+        frames.append(pd.concat([frame, thresholds], axis=1))
+    return pd.concat(frames, ignore_index=True)
+
+
+# -------------------------
+# PARETO
+# -------------------------
+def pareto_front(table, objectives=("signals", "hit_pct", "roi_pct")):
+    """
+    Righe non dominate (tutti gli obiettivi da massimizzare). Le config con lo stesso
+    risultato si riducono alla prima; in ordine decrescente ogni punto si confronta
+    solo con la frontiera già trovata (chi lo domina viene sempre prima).
+    """
+    if table.empty:
+        return table
+    unique = table.drop_duplicates(subset=list(objectives))
+    unique = unique.sort_values(list(objectives), ascending=False, kind="stable")
+    values = unique[list(objectives)].to_numpy(dtype=np.float64)
+
+    front = []
+    for i, point in enumerate(values):
+        if front:
+            best = values[front]
+            if np.any(np.all(best[:, 1:] >= point[1:], axis=1)):
+                continue
+        front.append(i)
+    return unique.iloc[front]
+
+
+def pareto_tables(results, market, min_bets, varied):
+    tables = {}
+    for tag in TAGS:
+        sub = results[(results["tag"] == tag) & (results["market"] == market) & (results["bets"] >= min_bets)]
+        sub = sub.dropna(subset=["hit_pct", "roi_pct"])
+        keys = [k for k in TAG_KEYS.get(tag, varied) if k in varied]
+        front = pareto_front(sub)
+        tables[tag] = front[["signals", "bets", "hit_pct", "roi_pct"] + keys]
+    return tables
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ricerca delle soglie di scoring (grid/random) con frontiera di Pareto per tag")
+    parser.add_argument("--archives", default=str(DEFAULT_ARCHIVES_DIR))
+    parser.add_argument("--no-live", action="store_true")
+    parser.add_argument("--from", dest="date_from")
+    parser.add_argument("--to", dest="date_to")
+    parser.add_argument("--space", help="JSON {soglia: [v1, v2, ...] | {min, max, step}}")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--grid", action="store_true", help="tutte le combinazioni (default)")
+    mode.add_argument("--random", type=int, metavar="N", help="N combinazioni casuali")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--market", default="O0.5HT", choices=list(MARKETS))
+    parser.add_argument("--min-bets", type=int, default=DEFAULT_MIN_BETS)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--csv", help="salva tutte le valutazioni (config, tag, mercato)")
+    args = parser.parse_args()
+
+    try:
+        if args.space:
+            with open(args.space, "r", encoding="utf-8") as f:
+                values = space_values(json.load(f))
+        else:
+            values = space_values(DEFAULT_SPACE)
+    except Exception as e:
+        print(f"❌ Spazio di ricerca non valido: {e}", flush=True)
+        return 1
+
+    configs = random_configs(values, args.random, args.seed) if args.random else grid_configs(values)
+    metrics = RunMetrics("threshold_search")
+
+    store_path = store_path_from_env()
+    store = ResultsStore(store_path) if store_path else None
+    try:
+        with metrics.stage("load"):
+            fixture_ids, dates, columns, info = load_dataset(
+                snapshot_paths(args.archives, not args.no_live), args.date_from, args.date_to
+            )
+        if not len(fixture_ids):
+            print("⚠️ Nessun fixture negli snapshot selezionati.", flush=True)
+            return 0
+        with metrics.stage("results"):
+            goals = load_results(fixture_ids, dates, store)
+    finally:
+        if store is not None:
+            store.close()
+
+    with metrics.stage("scores"):
+        scores = batch_scores(columns)
+        vectors = market_vectors(columns, goals)
+
+    n = len(fixture_ids)
+    chunk_size = max(1, min(256, MAX_MASK_CELLS // n))
+    print(
+        f"🔎 {len(configs)} config su {n} fixture ({dates[0]} → {dates[-1]}), "
+        f"{args.workers} processi, blocchi da {chunk_size}",
+        flush=True
+    )
+
+    shm, meta = share_arrays(scores, vectors)
+    try:
+        with metrics.stage("search"):
+            results = run_search(meta, configs, args.workers, chunk_size)
+    finally:
+        shm.close()
+        shm.unlink()
+
+    varied = [k for k, v in values.items() if len(v) > 1]
+    with metrics.stage("pareto"):
+        fronts = pareto_tables(results, args.market, args.min_bets, varied)
+    for tag, front in fronts.items():
+        if front.empty:
+            continue
+        print(f"🏷️ {tag} · {args.market} · Pareto {len(front)} config (min {args.min_bets} scommesse)", flush=True)
+        print(front.head(15).to_string(index=False), flush=True)
+
+    if args.csv:
+        with metrics.stage("csv"):
+            results.to_csv(args.csv, index=False)
+        print(f"💾 Valutazioni salvate in {args.csv}", flush=True)
+
+    metrics.count("fixtures", n)
+    metrics.count("configs", len(configs))
+    print_summary(metrics.report())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())